@@ -7,13 +7,20 @@ import fastapi
 
 # from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.middleware.gzip import GZipMiddleware
 
 from py_dnd.api.v1.api import api_router
 from py_dnd.core.config import Settings, get_settings
 from py_dnd.core.logging import init_logging
 from py_dnd.database import db_init
 from py_dnd.database.session import master_sessionmanager, replica_sessionmanager
+from py_dnd.features.auth.jwks import jwks_manager
+from py_dnd.features.auth.keycloak import keycloak_client
+from py_dnd.features.auth.token_cache import verified_token_cache
+from py_dnd.features.bulk_jobs.service import bulk_job_manager
+from py_dnd.features.core.validation import validation_pool
+from py_dnd.features.spells.catalog import spell_catalog
+from py_dnd.features.spells.facets import facet_cache
+from py_dnd.middleware.compression_middleware import CompressionMiddleware
 from py_dnd.middleware.logging_middleware import LoggingMiddleware
 
 settings: Settings = get_settings()
@@ -25,10 +32,41 @@ async def app_lifespan(_app: fastapi.FastAPI) -> AsyncGenerator:
     # Startup
     await init_logging(settings)
     await db_init.init(settings)
+    verified_token_cache.init(max_size=settings.AUTH_TOKEN_CACHE_SIZE)
+    keycloak_client.init(
+        settings.KEYCLOAK_SERVER_URL,
+        settings.KEYCLOAK_REALM_NAME,
+        settings.KEYCLOAK_CLIENT_ID,
+        settings.KEYCLOAK_ADMIN_USERNAME,
+        settings.KEYCLOAK_ADMIN_PASSWORD,
+        timeout=settings.KEYCLOAK_TIMEOUT_SECONDS,
+        max_connections=settings.KEYCLOAK_MAX_CONNECTIONS,
+        max_concurrency=settings.KEYCLOAK_MAX_CONCURRENT_REQUESTS,
+        admin_token_refresh_margin=settings.KEYCLOAK_ADMIN_TOKEN_REFRESH_MARGIN_SECONDS,
+    )
+    await jwks_manager.start(
+        keycloak_client.openid_url("certs"),
+        refresh_interval=settings.KEYCLOAK_JWKS_REFRESH_SECONDS,
+        min_refresh_interval=settings.KEYCLOAK_JWKS_MIN_REFRESH_SECONDS,
+    )
+    bulk_job_manager.start(
+        workers=settings.BULK_JOB_WORKERS,
+        max_queued=settings.BULK_JOB_MAX_QUEUED,
+        history=settings.BULK_JOB_HISTORY,
+    )
+    validation_pool.init(processes=settings.BULK_VALIDATION_PROCESSES, min_rows=settings.BULK_VALIDATION_MIN_ROWS)
+    facet_cache.init(max_size=settings.SPELL_FACETS_CACHE_SIZE, ttl=settings.SPELL_FACETS_CACHE_SECONDS)
+    if settings.SPELL_CATALOG_ENABLED:
+        await spell_catalog.start(refresh_interval=settings.SPELL_CATALOG_REFRESH_SECONDS)
 
     yield
 
     # Shutdown
+    await spell_catalog.close()
+    await bulk_job_manager.close()
+    await jwks_manager.close()
+    await keycloak_client.close()
+    validation_pool.close()
     if master_sessionmanager.engine is not None:
         await master_sessionmanager.close()
     if replica_sessionmanager.engine is not None:
@@ -90,8 +128,13 @@ def init_app(init_db: bool = True) -> fastapi.FastAPI:
         allow_headers=["*"],
     )
 
-    # see: https://www.starlette.io/middleware/#gzipmiddleware
-    server.add_middleware(GZipMiddleware, minimum_size=1000, compresslevel=9)  # default 500  # 1-9
+    # see ./middleware (zstd / br / gzip)
+    server.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+        static_paths=tuple(settings.COMPRESSION_STATIC_PATHS),
+        cache_size=settings.COMPRESSION_CACHE_SIZE,
+    )
 
     server.include_router(api_router)
 
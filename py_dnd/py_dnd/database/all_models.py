@@ -1,5 +1,6 @@
 """All the DB models in one place."""
 
+from py_dnd.features.bulk_jobs.models import BulkJob  # noqa: W0611
 from py_dnd.features.sources.models import Source  # noqa: W0611
 from py_dnd.features.spells.models import Spell  # noqa: W0611
 from py_dnd.features.user.models import User  # noqa: W0611
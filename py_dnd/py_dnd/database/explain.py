@@ -0,0 +1,44 @@
+"""SQL EXPLAIN helpers."""
+
+import json
+from typing import Any
+
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.compiler import SQLCompiler
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+
+class Explain(Executable, ClauseElement):
+    """An `EXPLAIN (FORMAT JSON)` of a statement, executed without running the statement itself."""
+
+    inherit_cache = False
+
+    def __init__(self, statement: ClauseElement):
+        """Explain.
+
+        Args:
+            statement (ClauseElement): The statement to explain.
+        """
+        self.statement = statement
+
+
+@compiles(Explain, "postgresql")
+def _compile_explain_postgresql(element: Explain, compiler: SQLCompiler, **kw: Any) -> str:
+    return f"EXPLAIN (FORMAT JSON) {compiler.process(element.statement, **kw)}"
+
+
+def get_plan_rows(plan: Any) -> int | None:
+    """Read the planner's row estimate from an `EXPLAIN (FORMAT JSON)` result.
+
+    Args:
+        plan (Any): The json plan, either already decoded or as a string.
+
+    Returns:
+        int | None: The estimated number of rows, None if the plan could not be read.
+    """
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    try:
+        return int(plan[0]["Plan"]["Plan Rows"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
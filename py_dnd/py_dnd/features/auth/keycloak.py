@@ -0,0 +1,403 @@
+"""Non-blocking Keycloak client.
+
+The synchronous `python-keycloak` client blocks the event loop for a full round trip to Keycloak. Logins, refreshes,
+logouts and user administration go through one pooled `aiohttp` session instead, with keep-alive connections,
+timeouts and a limit on the number of requests in flight. The admin token used for user administration is cached
+until shortly before it expires.
+
+Nothing is built at import: the app lifespan configures the client and the connection pool is only opened by the first
+request, so that importing the app never waits on Keycloak. The errors mirror the `python-keycloak` exceptions
+(`response_code`, `response_body`) without importing that package.
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, NamedTuple
+
+import aiohttp
+from loguru import logger
+
+
+class KeycloakError(Exception):
+    """A failed Keycloak request."""
+
+    def __init__(self, error_message: str = "", response_code: int | None = None, response_body: bytes | None = None):
+        super().__init__(error_message)
+        self.error_message = error_message
+        self.response_code = response_code
+        self.response_body = response_body
+
+    def __str__(self) -> str:
+        """Status and message of the error."""
+        if self.response_code is not None:
+            return f"{self.response_code}: {self.error_message}"
+        return self.error_message
+
+
+class KeycloakAuthenticationError(KeycloakError):
+    """Keycloak rejected the credentials (401)."""
+
+
+class KeycloakGetError(KeycloakError):
+    """A failed GET request."""
+
+
+class KeycloakPostError(KeycloakError):
+    """A failed POST request."""
+
+
+class KeycloakDeleteError(KeycloakError):
+    """A failed DELETE request."""
+
+
+class KeycloakResponse(NamedTuple):
+    """Status, headers and decoded body of a Keycloak response."""
+
+    status: int
+    headers: dict[str, str]
+    body: Any
+
+
+class AdminTokenProvider:
+    """Admin access token cached until shortly before it expires (async).
+
+    The token is refreshed in the background once it is within `refresh_margin` of expiring, callers keep using the
+    current token meanwhile. Only one refresh runs at a time, concurrent callers wait for it instead of logging in too.
+    """
+
+    def __init__(self, fetch: Callable[[], Awaitable[dict[str, Any]]], refresh_margin: float = 30) -> None:
+        self.fetch = fetch
+        self.refresh_margin = refresh_margin
+        self.access_token: str | None = None
+        self.expires_at = 0.0
+        self.generation = 0
+        self.lock = asyncio.Lock()
+        self.refreshing: asyncio.Task | None = None
+
+    async def get(self) -> str:
+        """Get a valid admin access token.
+
+        Returns:
+            str: _description_
+        """
+        now = time.monotonic()
+        if self.access_token is not None and now < self.expires_at:
+            if now >= self.expires_at - self.refresh_margin and (self.refreshing is None or self.refreshing.done()):
+                self.refreshing = asyncio.create_task(self.refresh_in_background(), name="keycloak-admin-token")
+            return self.access_token
+        return await self.refresh()
+
+    async def refresh(self) -> str:
+        """Log the admin in again, unless another caller just did.
+
+        Returns:
+            str: _description_
+        """
+        generation = self.generation
+        async with self.lock:
+            if self.generation != generation and self.access_token is not None:
+                return self.access_token
+            token = await self.fetch()
+            self.access_token = token["access_token"]
+            self.expires_at = time.monotonic() + float(token.get("expires_in", 60))
+            self.generation += 1
+            logger.debug("Refreshed the Keycloak admin token, expires in {}s", token.get("expires_in"))
+            return self.access_token
+
+    async def refresh_in_background(self) -> None:
+        """Proactive refresh, failures are retried by the next caller."""
+        try:
+            await self.refresh()
+        except Exception as e:
+            logger.error("Failed to refresh the Keycloak admin token: {}", str(e))
+
+    def invalidate(self) -> None:
+        """Forget the token, e.g. after Keycloak rejected it."""
+        self.access_token = None
+
+    async def close(self) -> None:
+        """Stop a running background refresh and forget the token."""
+        if self.refreshing is not None:
+            self.refreshing.cancel()
+            await asyncio.gather(self.refreshing, return_exceptions=True)
+        self.refreshing = None
+        self.invalidate()
+
+
+class KeycloakClient:
+    """Pooled HTTP client for the Keycloak endpoints, opened on first use (async)."""
+
+    def __init__(self) -> None:
+        self.server_url = ""
+        self.realm_name = ""
+        self.client_id = ""
+        self.admin_username = ""
+        self.admin_password = ""
+        self.timeout = 10.0
+        self.max_connections = 100
+        self.max_concurrency = 50
+        self.keepalive_timeout = 30.0
+        self.session: aiohttp.ClientSession | None = None
+        self.limiter: asyncio.Semaphore | None = None
+        self.admin_tokens = AdminTokenProvider(self.admin_token)
+
+    def init(
+        self,
+        server_url: str,
+        realm_name: str,
+        client_id: str,
+        admin_username: str,
+        admin_password: str,
+        *,
+        timeout: float = 10,
+        max_connections: int = 100,
+        max_concurrency: int = 50,
+        keepalive_timeout: float = 30,
+        admin_token_refresh_margin: float = 30,
+    ) -> None:
+        """Configure the client, the connection pool is opened by the first request.
+
+        Args:
+            server_url (str): e.g. https://sso.example.com/auth/
+            realm_name (str): The realm users log into.
+            client_id (str): The client users log in with.
+            admin_username (str): Admin of the master realm, for user administration.
+            admin_password (str): _description_
+            timeout (float, optional): Seconds before a request is abandoned. Defaults to 10.
+            max_connections (int, optional): Size of the connection pool. Defaults to 100.
+            max_concurrency (int, optional): Requests in flight, more wait for their turn. Defaults to 50.
+            keepalive_timeout (float, optional): Seconds idle connections are kept open. Defaults to 30.
+            admin_token_refresh_margin (float, optional): Seconds before its expiry the admin token is refreshed.
+                Defaults to 30.
+        """
+        self.server_url = server_url.rstrip("/")
+        self.realm_name = realm_name
+        self.client_id = client_id
+        self.admin_username = admin_username
+        self.admin_password = admin_password
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.max_concurrency = max_concurrency
+        self.keepalive_timeout = keepalive_timeout
+        self.admin_tokens.refresh_margin = admin_token_refresh_margin
+        logger.debug("KeycloakClient initialized for {} (realm {})", self.server_url, realm_name)
+
+    def get_session(self) -> tuple[aiohttp.ClientSession, asyncio.Semaphore]:
+        """Get the connection pool, opened on first use.
+
+        Raises:
+            KeycloakError: If the client is not initialized.
+
+        Returns:
+            tuple[aiohttp.ClientSession, asyncio.Semaphore]: The session and the limit of requests in flight.
+        """
+        if not self.server_url:
+            raise KeycloakError("Keycloak client is not initialized")
+        if self.session is None or self.limiter is None:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=self.keepalive_timeout),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+            self.limiter = asyncio.Semaphore(self.max_concurrency)
+            logger.debug("KeycloakClient opened its connection pool")
+        return self.session, self.limiter
+
+    async def close(self) -> None:
+        """Close the connection pool."""
+        await self.admin_tokens.close()
+        if self.session is not None:
+            await self.session.close()
+        self.session = None
+        self.limiter = None
+
+    def url(self, path: str) -> str:
+        """Full URL of a Keycloak endpoint.
+
+        Args:
+            path (str): e.g. realms/example-realm/protocol/openid-connect/token
+
+        Returns:
+            str: _description_
+        """
+        return f"{self.server_url}/{path}"
+
+    def openid_url(self, endpoint: str, realm_name: str | None = None) -> str:
+        """Full URL of an OpenID Connect endpoint of a realm.
+
+        Args:
+            endpoint (str): e.g. token, logout or certs.
+            realm_name (str | None, optional): Defaults to the users' realm.
+
+        Returns:
+            str: _description_
+        """
+        return self.url(f"realms/{realm_name or self.realm_name}/protocol/openid-connect/{endpoint}")
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        error: type[KeycloakError],
+        expected: tuple[int, ...] = (200,),
+        **kwargs: Any,
+    ) -> KeycloakResponse:
+        """Send a request to Keycloak.
+
+        Args:
+            method (str): _description_
+            url (str): _description_
+            error (type[KeycloakError]): Raised for unexpected statuses (401 raises KeycloakAuthenticationError).
+            expected (tuple[int, ...], optional): Successful statuses. Defaults to (200,).
+            **kwargs: Passed to `aiohttp.ClientSession.request`.
+
+        Raises:
+            KeycloakError: If the client is not initialized, Keycloak can't be reached or answers with an error.
+
+        Returns:
+            KeycloakResponse: _description_
+        """
+        session, limiter = self.get_session()
+        async with limiter:
+            try:
+                async with session.request(method, url, **kwargs) as resp:
+                    raw = await resp.read()
+                    body: Any = raw
+                    if raw and resp.content_type == "application/json":
+                        body = await resp.json()
+                    response = KeycloakResponse(resp.status, dict(resp.headers), body)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                raise error(f"Keycloak request failed: {e!r}") from e
+        if response.status not in expected:
+            error_class = KeycloakAuthenticationError if response.status == 401 else error
+            # like python-keycloak, the raw body is kept on the error
+            raise error_class(
+                error_message=raw.decode(errors="replace"), response_code=response.status, response_body=raw
+            )
+        return response
+
+    async def token(self, username: str, password: str) -> dict[str, Any]:
+        """Log a user in (password grant).
+
+        Args:
+            username (str): _description_
+            password (str): _description_
+
+        Returns:
+            dict[str, Any]: The access, id and refresh tokens.
+        """
+        data = {
+            "grant_type": "password",
+            "client_id": self.client_id,
+            "username": username,
+            "password": password,
+            "scope": "openid",
+        }
+        return (await self.request("POST", self.openid_url("token"), KeycloakPostError, data=data)).body
+
+    async def refresh_token(self, refresh_token: str) -> dict[str, Any]:
+        """Exchange a refresh token for new tokens.
+
+        Args:
+            refresh_token (str): _description_
+
+        Returns:
+            dict[str, Any]: The access, id and refresh tokens.
+        """
+        data = {"grant_type": "refresh_token", "client_id": self.client_id, "refresh_token": refresh_token}
+        return (await self.request("POST", self.openid_url("token"), KeycloakPostError, data=data)).body
+
+    async def logout(self, refresh_token: str) -> None:
+        """End the session of a refresh token.
+
+        Args:
+            refresh_token (str): _description_
+        """
+        data = {"client_id": self.client_id, "refresh_token": refresh_token}
+        await self.request("POST", self.openid_url("logout"), KeycloakPostError, expected=(204,), data=data)
+
+    async def admin_token(self) -> dict[str, Any]:
+        """Log the admin in to the master realm.
+
+        Returns:
+            dict[str, Any]: The token response, with the `access_token` and its `expires_in`.
+        """
+        data = {
+            "grant_type": "password",
+            "client_id": "admin-cli",
+            "username": self.admin_username,
+            "password": self.admin_password,
+        }
+        return (await self.request("POST", self.openid_url("token", "master"), KeycloakPostError, data=data)).body
+
+    async def admin_request(
+        self,
+        method: str,
+        path: str,
+        error: type[KeycloakError],
+        expected: tuple[int, ...] = (200,),
+        **kwargs: Any,
+    ) -> KeycloakResponse:
+        """Send a request to an admin endpoint with the cached admin token.
+
+        A rejected token is dropped and the request retried once with a new one.
+
+        Args:
+            method (str): _description_
+            path (str): e.g. admin/realms/example-realm/users
+            error (type[KeycloakError]): _description_
+            expected (tuple[int, ...], optional): _description_. Defaults to (200,).
+            **kwargs: Passed to `aiohttp.ClientSession.request`.
+
+        Returns:
+            KeycloakResponse: _description_
+        """
+        headers = {"Authorization": f"Bearer {await self.admin_tokens.get()}"}
+        try:
+            return await self.request(method, self.url(path), error, expected, headers=headers, **kwargs)
+        except KeycloakAuthenticationError:
+            self.admin_tokens.invalidate()
+        headers = {"Authorization": f"Bearer {await self.admin_tokens.get()}"}
+        return await self.request(method, self.url(path), error, expected, headers=headers, **kwargs)
+
+    async def create_user(self, payload: dict[str, Any]) -> str:
+        """Create a user in the users' realm.
+
+        Args:
+            payload (dict[str, Any]): Keycloak user representation.
+
+        Returns:
+            str: The id of the new user.
+        """
+        response = await self.admin_request(
+            "POST", f"admin/realms/{self.realm_name}/users", KeycloakPostError, expected=(201,), json=payload
+        )
+        # the id is only returned in the location of the new user
+        return response.headers.get("Location", "").rstrip("/").rsplit("/", 1)[-1]
+
+    async def get_users(self, query: dict[str, Any]) -> list[dict[str, Any]]:
+        """Search the users of the users' realm.
+
+        Args:
+            query (dict[str, Any]): e.g. {"username": "example", "exact": "true"}
+
+        Returns:
+            list[dict[str, Any]]: Keycloak user representations.
+        """
+        response = await self.admin_request(
+            "GET", f"admin/realms/{self.realm_name}/users", KeycloakGetError, params=query
+        )
+        return response.body
+
+    async def delete_user(self, user_id: str) -> None:
+        """Delete a user of the users' realm.
+
+        Args:
+            user_id (str): _description_
+        """
+        await self.admin_request(
+            "DELETE", f"admin/realms/{self.realm_name}/users/{user_id}", KeycloakDeleteError, expected=(204,)
+        )
+
+
+# Initialize the KeycloakClient
+keycloak_client = KeycloakClient()
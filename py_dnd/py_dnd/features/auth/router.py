@@ -4,19 +4,21 @@ from typing import Annotated, Any
 
 from fastapi import APIRouter, Cookie, Depends, Form, HTTPException, Response, status
 from fastapi.security import OAuth2PasswordRequestForm
-from keycloak import KeycloakPostError
 from loguru import logger
 from pydantic import SecretStr
 
 from py_dnd.database.db import AsyncMasterSessionDependency
 from py_dnd.features.auth import service as AuthService
+from py_dnd.features.auth.keycloak import KeycloakPostError
 from py_dnd.features.auth.schemas import (
     AuthUserToken,
     RefreshToken,
     RegisterUserInput,
     Token,
+    TokenCacheStats,
     TokenResponse,
 )
+from py_dnd.features.auth.token_cache import verified_token_cache
 from py_dnd.features.core.unit_of_work import sqlalchemy_uow
 from py_dnd.features.user.schemas import UserCreate, UserSchema
 
@@ -162,6 +164,20 @@ async def logout_user(
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)) from e
 
 
+@router.get("/token-cache", tags=["Status"])
+async def read_token_cache_stats(current_user: AuthService.UserAuth) -> TokenCacheStats:
+    """Hit and miss counters of the verified token cache, for authenticated users only.
+
+    Args:
+        current_user (AuthService.UserAuth): _description_
+
+    Returns:
+        TokenCacheStats: _description_
+    """
+    logger.info("Token cache stats read by {}", current_user.preferred_username)
+    return verified_token_cache.stats()
+
+
 @router.get("/user")
 async def get_user(current_user: AuthService.UserAuth) -> AuthUserToken:
     """Fetch the user information.
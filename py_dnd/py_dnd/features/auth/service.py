@@ -1,19 +1,21 @@
 """Module used for keycloak backend calls."""
 
 import time
-from functools import lru_cache
 from typing import Annotated
 
-import aiohttp
 from fastapi import Cookie, Depends, HTTPException, status
 from fastapi.security import OAuth2AuthorizationCodeBearer
-from keycloak import KeycloakAdmin
-from keycloak.exceptions import KeycloakAuthenticationError, KeycloakGetError
-from keycloak.keycloak_openid import KeycloakOpenID
 from loguru import logger
 
 from py_dnd.core.config import Settings, get_settings
+from py_dnd.features.auth.jwks import decode_unverified, jwks_manager
+from py_dnd.features.auth.keycloak import (
+    KeycloakAuthenticationError,
+    KeycloakGetError,
+    keycloak_client,
+)
 from py_dnd.features.auth.schemas import AuthUserToken, RegisterUserInput, Token
+from py_dnd.features.auth.token_cache import verified_token_cache
 
 settings: Settings = get_settings()
 
@@ -32,26 +34,6 @@ oauth2_scheme = OAuth2AuthorizationCodeBearer(
 #     tokenUrl="/auth/session/token",
 # )
 
-# This actually does the auth checks
-keycloak_openid = KeycloakOpenID(
-    server_url=settings.KEYCLOAK_SERVER_URL,  # https://sso.example.com/auth/
-    realm_name=settings.KEYCLOAK_REALM_NAME,  # example-realm
-    client_id=settings.KEYCLOAK_CLIENT_ID,  # backend-client-id
-    # client_secret_key=settings.KEYCLOAK_CLIENT_SECRET_KEY,  # your backend client secret
-    verify=True,
-)
-
-# Configure the Keycloak admin client
-keycloak_admin = KeycloakAdmin(
-    server_url=f"{settings.KEYCLOAK_SERVER_URL}/auth",
-    realm_name="master",  # default anyways
-    client_id="admin-cli",  # default anyways
-    username=settings.KEYCLOAK_ADMIN_USERNAME,
-    password=settings.KEYCLOAK_ADMIN_PASSWORD,
-    # user_realm_name="ttrpg",  # Target realm where users are added
-)
-
-
 # async def get_idp_public_key():
 #     return (
 #         "-----BEGIN PUBLIC KEY-----\n"
@@ -69,6 +51,9 @@ async def get_auth(
 ) -> AuthUserToken:
     """Validate the user's access token and return it decoded.
 
+    Verified tokens are cached until they expire, see `verified_token_cache`. Signatures are checked against the
+    keys of `jwks_manager`, without calling Keycloak.
+
     Args:
         access_token (str | None, optional): _description_. Defaults to Cookie(default=None).
         _ (Any, optional): _description_. Defaults to Security(oauth2_scheme2, use_cache=False).
@@ -85,16 +70,21 @@ async def get_auth(
         err_msg = "No access_token cookie found!"
         logger.error(err_msg)
         raise HTTPException(status.HTTP_401_UNAUTHORIZED, detail=err_msg)
-    # public_key = await get_idp_public_key()
+    cache_key = verified_token_cache.digest(access_token, id_token)
+    if (cached := verified_token_cache.get(cache_key)) is not None:
+        return cached
     try:
-        decoded_access_token = keycloak_openid.decode_token(access_token)
+        decoded_access_token = jwks_manager.decode(access_token)
         if "exp" not in decoded_access_token or decoded_access_token["exp"] < time.time():
             raise HTTPException(status.HTTP_401_UNAUTHORIZED, detail="Token has expired")
         # if 'aud' not in decoded_token or decoded_token['aud'] != 'expected-audience':
         #     raise HTTPException(status_code=401, detail="Invalid audience")
-        decoded_id_token = keycloak_openid.decode_token(id_token)
+        decoded_id_token = jwks_manager.decode(id_token)
 
-        return AuthUserToken(**decoded_id_token)
+        user = AuthUserToken(**decoded_id_token)
+        # valid until the first of the two tokens expires
+        verified_token_cache.put(cache_key, user, min(decoded_access_token["exp"], user.exp))
+        return user
 
     except Exception as e:
         logger.error("Uncaught error: {}", str(e))
@@ -121,7 +111,7 @@ async def get_auth_optional(
     if not id_token:
         return None
     try:
-        decoded_id_token = keycloak_openid.decode_token(id_token, validate=False)
+        decoded_id_token = decode_unverified(id_token)
         return AuthUserToken(**decoded_id_token)
     except Exception as e:
         # TODO: make 401 ?
@@ -138,28 +128,6 @@ UserAuthOptional = Annotated[AuthUserToken | None, Depends(get_auth_optional)]
 #     "-----BEGIN PUBLIC KEY-----\n" f"{keycloak_openid.public_key()}" "\n-----END PUBLIC KEY-----"
 
 
-# Fetch the public key from Keycloak
-@lru_cache
-async def get_keycloak_public_key() -> str:
-    """Get the keycloak public key.
-
-    Returns:
-        _type_: _description_
-    """
-    async with aiohttp.ClientSession() as session:
-        async with session.get(
-            f"{settings.KEYCLOAK_SERVER_URL}/auth/realms/{settings.KEYCLOAK_REALM_NAME}/protocol/openid-connect"
-        ) as resp:
-            resp.raise_for_status()
-            jwks_uri = await resp.json()["jwks_uri"]
-        async with session.get(jwks_uri) as resp:
-            resp.raise_for_status()
-            jwks = await resp.json()
-        # TODO: may want to handle multiple keys differently...
-        KEYCLOAK_PUBLIC_KEY = jwks["keys"][0]["x5c"][0]
-    return f"-----BEGIN PUBLIC KEY-----\n{KEYCLOAK_PUBLIC_KEY}\n-----END PUBLIC KEY-----"
-
-
 async def authenticate_user(username: str, password: str) -> Token:
     """Authenticate user with Keycloak backend.
 
@@ -174,7 +142,7 @@ async def authenticate_user(username: str, password: str) -> Token:
         Token: _description_
     """
     try:
-        token = keycloak_openid.token(username, password)
+        token = await keycloak_client.token(username, password)
         return Token(**token)
     except KeycloakAuthenticationError as error:
         raise HTTPException(status_code=401, detail="Invalid credentials") from error
@@ -202,7 +170,7 @@ async def authenticate_user(username: str, password: str) -> Token:
 #         try:
 #             token_info = keycloak_openid.decode_token(
 #                 token,
-#                 key=await get_keycloak_public_key(),
+#                 key=jwks_manager.key_for(token),
 #                 options={"verify_signature": True, "verify_aud": False, "exp": True},
 #             )
 #             resource_access = token_info["resource_access"]
@@ -237,7 +205,7 @@ async def authenticate_user(username: str, password: str) -> Token:
 #     try:
 #         decoded = keycloak_openid.decode_token(
 #             token,
-#             key=await get_keycloak_public_key(),
+#             key=jwks_manager.key_for(token),
 #             options={"verify_signature": True, "verify_aud": False, "exp": True},
 #         )
 #         return Token(**decoded)
@@ -258,7 +226,7 @@ async def refresh_user_token(token: str) -> Token:
         Token: _description_
     """
     try:
-        return Token(**keycloak_openid.refresh_token(token))
+        return Token(**await keycloak_client.refresh_token(token))
     except KeycloakGetError as error:
         raise HTTPException(status_code=401, detail=str(error)) from error
 
@@ -276,20 +244,13 @@ async def logout(token: str) -> None:
         _type_: _description_
     """
     try:
-        return keycloak_openid.logout(token)
+        return await keycloak_client.logout(token)
     except KeycloakGetError as error:
         raise HTTPException(status_code=401, detail=str(error)) from error
 
 
 async def create_keycloak_user(user: RegisterUserInput) -> str:
     """Create a new user in Keycloak."""
-    # token = await get_admin_token()
-    # # url = f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/users"
-    # url = f"{settings.KEYCLOAK_SERVER_URL}/admin/realms/{settings.KEYCLOAK_REALM_NAME}/users"
-    # headers = {
-    #     # "Authorization": f"Bearer {token}",
-    #     "Content-Type": "application/json"
-    # }
     user_data = {
         "username": user.username,
         "email": user.email,
@@ -300,67 +261,21 @@ async def create_keycloak_user(user: RegisterUserInput) -> str:
     }
     logger.debug("Creating user with info: {}", {**user.model_dump(exclude={"paassword"}), "paassword": "REDACTED"})
 
-    # async with aiohttp.ClientSession() as session:
-    #     async with session.get(url, json=user_data, headers=headers) as resp:
-    #         resp.raise_for_status()
-    #         status = resp.status
-    #         if status != 201:
-    #             logger.error("Failed to create user")
-    #             raise HTTPException(status_code=status, detail="Failed to create user")
-    #         return {"message": "User created successfully"}
-    new_user = keycloak_admin.create_user(user_data)
+    new_user = await keycloak_client.create_user(user_data)
     logger.debug("Created new user with id {}", new_user)
     return new_user
 
 
 async def delete_user(username: str) -> None:
     """Remove user from Keycloak."""
-    # token = await get_admin_token()
-    # # url = f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/users/{user_id}"
-    # url = f"{settings.KEYCLOAK_SERVER_URL}/admin/realms/{settings.KEYCLOAK_REALM_NAME}/users/{user_id}"
-
-    # headers = {
-    #     "Authorization": f"Bearer {token}",
-    #     "Content-Type": "application/json"
-    # }
-
-    # async with aiohttp.ClientSession() as session:
-    #     async with session.delete(url, headers=headers) as resp:
-    #         resp.raise_for_status()
-    #         status = resp.status
-    #         if status != 204:
-    #             logger.error("Failed to delete user")
-    #             raise HTTPException(status_code=status, detail="Failed to delete user")
-    #         return {"message": "User deleted successfully"}
-
-    users = keycloak_admin.get_users({"username": username})
+    users = await keycloak_client.get_users({"username": username, "exact": "true"})
     if not users:
         logger.warning("No users found with username: {}", username)
         return None
     logger.debug("Deleting first user from {}", [user["id"] for user in users])
-    keycloak_admin.delete_user(user_id=users[0]["id"])
+    await keycloak_client.delete_user(user_id=users[0]["id"])
 
 
 async def get_admin_token() -> str:
-    """Get admin token for service functions like creating users."""
-    # token_url = f"{settings.KEYCLOAK_SERVER_URL}/realms/{settings.KEYCLOAK_REALM_NAME}/protocol/openid-connect/token"
-    token_url = f"{settings.KEYCLOAK_SERVER_URL}/realms/master/protocol/openid-connect/token"
-    data = {
-        "grant_type": "password",
-        # "client_id": keycloak_openid.client_id,
-        "client_id": "admin-cli",
-        "username": settings.KEYCLOAK_ADMIN_USERNAME,
-        "password": settings.KEYCLOAK_ADMIN_PASSWORD,
-        # "client_secret": keycloak_openid.client_secret_key
-    }
-    headers = {"Content-Type": "application/x-www-form-urlencoded"}
-
-    async with aiohttp.ClientSession() as session:
-        async with session.post(token_url, data=data, headers=headers) as resp:
-            resp.raise_for_status()
-            status = resp.status
-            if status != 200:
-                logger.error("Failed to delete user")
-                raise HTTPException(status_code=status, detail="Failed to retrieve access token")
-            resp_json = await resp.json()
-            return resp_json.get("access_token")
+    """Get admin token for service functions like creating users (cached until shortly before it expires)."""
+    return await keycloak_client.admin_tokens.get()
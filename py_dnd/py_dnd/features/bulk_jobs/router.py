@@ -0,0 +1,27 @@
+"""Bulk job route definitions."""
+
+import uuid
+
+from fastapi import APIRouter, HTTPException, status
+from loguru import logger
+
+from py_dnd.features.auth.service import UserAuth
+from py_dnd.features.bulk_jobs.schemas import BulkJobSchema
+from py_dnd.features.bulk_jobs.service import bulk_job_manager
+
+router = APIRouter()
+
+
+@router.get("/{job_id}")
+async def read_bulk_job(
+    job_id: uuid.UUID,
+    current_user: UserAuth,
+) -> BulkJobSchema:
+    """Retrieve the progress of a bulk job, and its report once it finished."""
+    user = {"sub": current_user.sub, "preferred_username": current_user.preferred_username}
+    with logger.contextualize(user=user, bulk_job={"id": str(job_id)}, log_threads=True):
+        job = await bulk_job_manager.get(job_id)
+        # other users' jobs are reported as missing
+        if job is None or job.created_by != current_user.sub:
+            raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Bulk job not found")
+        return job
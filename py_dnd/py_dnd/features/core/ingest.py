@@ -0,0 +1,382 @@
+"""Streaming readers and the chunked loader for bulk upload files.
+
+Uploads are read in chunks and parsed row by row so that memory stays flat however large the file is, rows are
+then handed out in fixed-size batches to be validated and written to the database.
+"""
+
+import asyncio
+import base64
+import binascii
+import codecs
+import csv
+import hashlib
+import json
+import re
+from typing import Any, AsyncIterator, Awaitable, Callable, NamedTuple, TypeVar
+
+from fastapi import HTTPException, UploadFile, status
+from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from py_dnd.features.core.unit_of_work import SqlAlchemyUnitOfWork, sqlalchemy_uow
+from py_dnd.shared.schemas import BulkLoadResponse
+
+BULK_UPLOAD_FILE_TYPES = ["text/csv", "application/json"]
+UPLOAD_READ_SIZE = 64 * 1024
+# a CSV line ends on \n, \r\n or \r only (`str.splitlines` also breaks on form feeds, \x1c-\x1e, \x85...), a \r at
+# the end of the text may be the first half of a \r\n
+CSV_LINE_PATTERN = re.compile(r"[^\r\n]*(?:\r\n|\n|\r(?!\Z))")
+
+T = TypeVar("T")
+
+
+class UploadRow(NamedTuple):
+    """A parsed row of a bulk upload file."""
+
+    index: int
+    fields: dict[str, Any]
+
+
+# validates and writes a batch of rows, see `run_bulk_load`
+BatchHandler = Callable[[SqlAlchemyUnitOfWork, list[UploadRow]], Awaitable[None]]
+
+
+class BulkLoadCheckpoint(NamedTuple):
+    """Position of the last committed chunk of a bulk upload.
+
+    `digest` is a hash of the rows up to `rows`, a retried upload only resumes if its first rows hash the same.
+    """
+
+    rows: int
+    digest: str
+
+    def encode(self) -> str:
+        """Build an opaque, url safe checkpoint token.
+
+        Returns:
+            str: The token.
+        """
+        raw = json.dumps([self.rows, self.digest], separators=(",", ":"))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+    @classmethod
+    def decode(cls, token: str) -> "BulkLoadCheckpoint":
+        """Decode a token built by `encode`.
+
+        Args:
+            token (str): The token.
+
+        Raises:
+            HTTPException: 400 if the token is malformed.
+
+        Returns:
+            BulkLoadCheckpoint: The checkpoint.
+        """
+        try:
+            rows, digest = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+            if not isinstance(rows, int) or rows < 0 or not isinstance(digest, str):
+                raise ValueError("checkpoint is not a row count and a digest")
+            return cls(rows=rows, digest=digest)
+        except (ValueError, TypeError, binascii.Error) as e:
+            logger.debug("Invalid checkpoint {}: {}", token, e)
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid checkpoint") from e
+
+
+def update_row_digest(digest: "hashlib._Hash", row: UploadRow) -> None:
+    """Add a row to the running digest of a bulk upload.
+
+    Args:
+        digest (hashlib._Hash): The running digest.
+        row (UploadRow): The row.
+    """
+    digest.update(json.dumps(row.fields, sort_keys=True, separators=(",", ":"), default=str).encode())
+    digest.update(b"\n")
+
+
+async def iter_upload_chunks(file: UploadFile, read_size: int = UPLOAD_READ_SIZE) -> AsyncIterator[str]:
+    """Read an uploaded file as decoded text chunks.
+
+    Args:
+        file (UploadFile): The uploaded file.
+        read_size (int, optional): Bytes to read at a time. Defaults to UPLOAD_READ_SIZE.
+
+    Yields:
+        str: The next chunk of text.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    while chunk := await file.read(read_size):
+        yield decoder.decode(chunk)
+    yield decoder.decode(b"", final=True)
+
+
+def split_csv_lines(text: str) -> tuple[list[str], str]:
+    """Split text into complete CSV lines, line breaks included.
+
+    Args:
+        text (str): _description_
+
+    Returns:
+        tuple[list[str], str]: The complete lines and the rest of the text, cut off by the end of the chunk.
+    """
+    lines: list[str] = []
+    position = 0
+    while line := CSV_LINE_PATTERN.match(text, position):
+        lines.append(line.group())
+        position = line.end()
+    return lines, text[position:]
+
+
+async def iter_csv_rows(chunks: AsyncIterator[str]) -> AsyncIterator[dict[str, Any]]:
+    """Parse CSV records incrementally, the first record is the header.
+
+    A record only ends on a line break outside of quotes, so quoted cells may span several lines. Empty cells
+    are returned as None.
+
+    Args:
+        chunks (AsyncIterator[str]): The text of the file.
+
+    Yields:
+        dict[str, Any]: The next record keyed by the header.
+    """
+    header: list[str] | None = None
+    pending = ""
+    record: list[str] = []
+    # quotes in the lines of `record`, a line break after an odd number of them is inside a quoted cell
+    quotes = 0
+    async for chunk in chunks:
+        lines, pending = split_csv_lines(pending + chunk)
+        for line in lines:
+            record.append(line)
+            quotes += line.count('"')
+            if quotes % 2:
+                continue
+            values = next(csv.reader(record), [])
+            record, quotes = [], 0
+            if not values:
+                continue
+            if header is None:
+                header = values
+                continue
+            yield {key: value or None for key, value in zip(header, values)}
+    if pending or record:
+        values = next(csv.reader([*record, pending]), [])
+        if values and header is not None:
+            yield {key: value or None for key, value in zip(header, values)}
+
+
+async def iter_json_rows(chunks: AsyncIterator[str]) -> AsyncIterator[dict[str, Any]]:
+    """Parse the objects of a top level JSON array incrementally.
+
+    Args:
+        chunks (AsyncIterator[str]): The text of the file.
+
+    Raises:
+        ValueError: The document is not an array of objects.
+
+    Yields:
+        dict[str, Any]: The next object of the array.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    started = False
+    finished = False
+    async for chunk in chunks:
+        buffer = buffer[position:] + chunk
+        position = 0
+        while not finished:
+            while position < len(buffer) and (buffer[position].isspace() or (started and buffer[position] == ",")):
+                position += 1
+            if position == len(buffer):
+                break
+            if not started:
+                if buffer[position] != "[":
+                    raise ValueError("Expected a JSON array of objects")
+                started = True
+                position += 1
+                continue
+            if buffer[position] == "]":
+                finished = True
+                break
+            try:
+                value, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # the element is cut off by the end of the chunk
+                break
+            if not isinstance(value, dict):
+                raise ValueError(f"Expected a JSON object, got: {type(value).__name__}")
+            position = end
+            yield value
+    if not finished:
+        if buffer[position:].strip():
+            # surfaces the decoding error of the element that never completed
+            decoder.raw_decode(buffer, position)
+        raise ValueError("Unexpected end of JSON array")
+
+
+def check_upload_file_type(file: UploadFile) -> None:
+    """Make sure an uploaded file can be read by `iter_upload_rows`.
+
+    Args:
+        file (UploadFile): The uploaded file.
+
+    Raises:
+        HTTPException: 400 if the file type is not supported.
+    """
+    if file.content_type not in BULK_UPLOAD_FILE_TYPES:
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid document type. Expected on of: {[BULK_UPLOAD_FILE_TYPES]}, "
+            + f"Received: {file.content_type}",
+        )
+
+
+async def iter_upload_rows(file: UploadFile, read_size: int = UPLOAD_READ_SIZE) -> AsyncIterator[UploadRow]:
+    """Stream the rows of a bulk upload file, CSV or a JSON array of objects.
+
+    Args:
+        file (UploadFile): The uploaded file.
+        read_size (int, optional): Bytes to read at a time. Defaults to UPLOAD_READ_SIZE.
+
+    Raises:
+        HTTPException: The file type is not supported or the file could not be parsed.
+
+    Yields:
+        UploadRow: The next row with its index, starting at 0.
+    """
+    check_upload_file_type(file)
+    if file.content_type == "text/csv":
+        rows = iter_csv_rows(iter_upload_chunks(file, read_size))
+    else:
+        rows = iter_json_rows(iter_upload_chunks(file, read_size))
+    index = 0
+    try:
+        async for fields in rows:
+            yield UploadRow(index=index, fields=fields)
+            index += 1
+    except (ValueError, csv.Error) as e:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, detail=f"Invalid file after row {index}: {str(e)}") from e
+
+
+async def iter_batches(items: AsyncIterator[T], batch_size: int) -> AsyncIterator[list[T]]:
+    """Group an async iterator into lists of at most `batch_size` items.
+
+    Args:
+        items (AsyncIterator[T]): The items to group.
+        batch_size (int): The size of a batch.
+
+    Yields:
+        list[T]: The next batch.
+    """
+    batch: list[T] = []
+    async for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def run_bulk_load(
+    db: AsyncSession,
+    file: UploadFile,
+    response: BulkLoadResponse,
+    handle_batch: BatchHandler,
+    *,
+    batch_size: int,
+    all_or_nothing: bool = False,
+    checkpoint: str | None = None,
+    on_progress: Callable[[int], Awaitable[None]] | None = None,
+) -> BulkLoadResponse:
+    """Stream a bulk upload through `handle_batch` and commit it chunk by chunk.
+
+    By default every batch is committed on its own, rows that fail validation are reported and skipped. If a batch
+    fails to be written, or the load is cancelled, it is rolled back and the load stops (`response.stopped`). With
+    `all_or_nothing` the whole file is a single transaction that is only committed when no row had an error.
+
+    The response carries a checkpoint token for the last commit, a retried upload of the same file given that token
+    skips the rows that were already committed.
+
+    Args:
+        db (AsyncSession): A SQLAlchemy Session.
+        file (UploadFile): The uploaded file.
+        response (BulkLoadResponse): The report `handle_batch` writes to.
+        handle_batch (BatchHandler): Validates and writes a batch of rows.
+        batch_size (int): Rows per batch (and per commit).
+        all_or_nothing (bool, optional): Commit once at the end and only without errors. Defaults to False.
+        checkpoint (str | None, optional): A checkpoint from a previous attempt to resume from. Defaults to None.
+        on_progress (Callable[[int], Awaitable[None]] | None, optional): Awaited with the number of rows processed
+            after every batch. Defaults to None.
+
+    Raises:
+        HTTPException: 400 for unsupported files, 409 if the checkpoint was not made for this file.
+        asyncio.CancelledError: The load was cancelled, what was not committed is rolled back first.
+
+    Returns:
+        BulkLoadResponse: The report.
+    """
+    check_upload_file_type(file)
+    resume_from = BulkLoadCheckpoint.decode(checkpoint) if checkpoint else None
+    response.checkpoint = checkpoint
+    rows = iter_upload_rows(file)
+    digest = hashlib.sha256()
+    if resume_from and resume_from.rows:
+        skipped = 0
+        async for row in rows:
+            update_row_digest(digest, row)
+            skipped += 1
+            if skipped == resume_from.rows:
+                break
+        if skipped < resume_from.rows or digest.hexdigest() != resume_from.digest:
+            raise HTTPException(status.HTTP_409_CONFLICT, detail="Checkpoint does not match the uploaded file")
+        logger.info("Resuming bulk load after row {}", resume_from.rows - 1)
+
+    rows_done = committed_rows = resume_from.rows if resume_from else 0
+    async with sqlalchemy_uow(db, None) as uow:
+        # what was reported since the last commit, it is dropped again on rollback
+        created_mark, updated_mark = len(response.created), len(response.updated)
+
+        async def discard_uncommitted() -> None:
+            """Roll back the rows written since the last commit and drop them from the report."""
+            reported = len(response.created) > created_mark or len(response.updated) > updated_mark
+            if committed_rows < rows_done or reported:
+                await uow.rollback()
+                del response.created[created_mark:]
+                del response.updated[updated_mark:]
+                response.warnings.append(f"Rows from {committed_rows} were rolled back.")
+
+        try:
+            async for batch in iter_batches(rows, batch_size):
+                for row in batch:
+                    update_row_digest(digest, row)
+                await handle_batch(uow, batch)
+                rows_done = batch[-1].index + 1
+                if on_progress:
+                    await on_progress(rows_done)
+                if all_or_nothing:
+                    continue
+                await uow.db_session.flush()
+                await uow.commit()
+                committed_rows = rows_done
+                response.checkpoint = BulkLoadCheckpoint(rows=committed_rows, digest=digest.hexdigest()).encode()
+                created_mark, updated_mark = len(response.created), len(response.updated)
+            if all_or_nothing and not response.errors:
+                await uow.db_session.flush()
+                await uow.commit()
+                committed_rows = rows_done
+                response.checkpoint = BulkLoadCheckpoint(rows=committed_rows, digest=digest.hexdigest()).encode()
+                created_mark, updated_mark = len(response.created), len(response.updated)
+        except asyncio.CancelledError:
+            # e.g. at shutdown, the report keeps the checkpoint of the last commit to resume from
+            logger.warning("Bulk load cancelled at row {}", rows_done)
+            response.errors.append(f"rows from {committed_rows}: cancelled")
+            await discard_uncommitted()
+            raise
+        except Exception as e:
+            detail = e.detail if isinstance(e, HTTPException) else str(e)
+            logger.error("Bulk load stopped at row {}: {}", rows_done, detail)
+            response.errors.append(f"rows from {rows_done}: {detail}")
+            response.stopped = True
+        await discard_uncommitted()
+    return response
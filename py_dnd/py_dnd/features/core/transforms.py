@@ -0,0 +1,73 @@
+"""Column operations shared by the bulk loading transforms of the features.
+
+Every feature describes how the columns of its bulk loading rows are cleaned up (dropped, converted, set), the
+description is then applied to a whole batch of rows one column at a time.
+"""
+
+from typing import Any, Callable, Iterable, Mapping
+
+
+def normalize_records(
+    records: list[dict[str, Any]],
+    *,
+    drop: Iterable[str] = (),
+    convert: Mapping[str, Callable[[Any], Any]] | None = None,
+    assign: Mapping[str, Any] | None = None,
+) -> list[dict[str, Any]]:
+    """Clean up a batch of bulk loading rows in place, column by column.
+
+    Args:
+        records (list[dict[str, Any]]): The rows.
+        drop (Iterable[str], optional): Columns to remove. Defaults to ().
+        convert (Mapping[str, Callable[[Any], Any]] | None, optional): Conversion of the values of a column, rows
+            without the column are left alone. Defaults to None.
+        assign (Mapping[str, Any] | None, optional): Columns set to a constant on every row. Defaults to None.
+
+    Returns:
+        list[dict[str, Any]]: The rows.
+    """
+    for column in drop:
+        for record in records:
+            record.pop(column, None)
+    for column, converter in (convert or {}).items():
+        for record in records:
+            if column in record:
+                record[column] = converter(record[column])
+    for column, value in (assign or {}).items():
+        for record in records:
+            record[column] = value
+    return records
+
+
+def to_optional_int(value: Any) -> Any:
+    """Turn an integer written as a number or a string (e.g. "12.0") into an int, empty values into None.
+
+    Values that are not integers are kept as they are so that validation reports them.
+
+    Args:
+        value (Any): _description_
+
+    Returns:
+        Any: _description_
+    """
+    if value is None or value == "" or value != value:  # NaN
+        return None
+    if isinstance(value, int):
+        return value
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return value
+    return int(number) if number.is_integer() else value
+
+
+def to_optional_str(value: Any) -> Any:
+    """Turn a non empty value into a string.
+
+    Args:
+        value (Any): _description_
+
+    Returns:
+        Any: _description_
+    """
+    return str(value) if value else value
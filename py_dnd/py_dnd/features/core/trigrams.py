@@ -0,0 +1,105 @@
+"""In-memory trigram index, the fuzzy matching of the Postgres `pg_trgm` extension.
+
+Texts are lowercased and split into words of letters and digits, every word padded with two spaces in front and one
+behind is cut into trigrams: "Fire" -> {"  f", " fi", "fir", "ire", "re "}. The similarity of two texts is the number
+of trigrams they share over the number of distinct trigrams of both (`similarity()` in Postgres), typos and missing
+punctuation only cost a few trigrams ("firebal" is 0.7 similar to "fireball").
+
+`TrigramIndex` keeps the positions of the texts having every trigram, a search only scores the texts sharing at least
+one trigram with it.
+"""
+
+import heapq
+import re
+from collections import Counter
+from typing import Iterable
+
+# pg_trgm ignores everything but letters and digits
+TRIGRAM_WORD_PATTERN = re.compile(r"[^\W_]+")
+
+
+def trigrams(text: str) -> frozenset[str]:
+    """Trigrams of a text, like `show_trgm()` in Postgres.
+
+    Args:
+        text (str): _description_
+
+    Returns:
+        frozenset[str]: _description_
+    """
+    grams: set[str] = set()
+    for word in TRIGRAM_WORD_PATTERN.findall(text.lower()):
+        padded = f"  {word} "
+        grams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+
+def similarity(text: str, other: str) -> float:
+    """Trigram similarity of two texts, the `similarity` function of pg_trgm.
+
+    Args:
+        text (str): _description_
+        other (str): _description_
+
+    Returns:
+        float: From 0 (no trigram in common) to 1.
+    """
+    grams, other_grams = trigrams(text), trigrams(other)
+    if not grams or not other_grams:
+        return 0.0
+    shared = len(grams & other_grams)
+    return shared / (len(grams) + len(other_grams) - shared)
+
+
+class TrigramIndex:
+    """Texts indexed by trigram, searched by similarity.
+
+    Args:
+        texts (Iterable[str]): The texts, results are their positions.
+    """
+
+    def __init__(self, texts: Iterable[str]) -> None:
+        # trigram -> positions of the texts having it
+        self.postings: dict[str, list[int]] = {}
+        # number of trigrams of every text
+        self.sizes: list[int] = []
+        for position, text in enumerate(texts):
+            grams = trigrams(text)
+            self.sizes.append(len(grams))
+            for gram in grams:
+                self.postings.setdefault(gram, []).append(position)
+
+    def search(
+        self, text: str, limit: int = 10, threshold: float = 0.3, mask: int | None = None
+    ) -> list[tuple[int, float]]:
+        """The texts most similar to `text`.
+
+        Args:
+            text (str): _description_
+            limit (int, optional): At most this many results. Defaults to 10.
+            threshold (float, optional): Minimum similarity, 0.3 is the default of `pg_trgm`. Defaults to 0.3.
+            mask (int | None, optional): Bitmap of the positions that can match, None for all of them.
+                Defaults to None.
+
+        Returns:
+            list[tuple[int, float]]: Positions and similarities, the most similar (then the lowest position) first.
+        """
+        grams = trigrams(text)
+        if not grams:
+            return []
+        shared: Counter[int] = Counter()
+        for gram in grams:
+            shared.update(self.postings.get(gram, ()))
+        # a text sharing `count` trigrams is at most `count / len(grams)` similar
+        min_shared = threshold * len(grams)
+        scores = (
+            (position, count / (len(grams) + self.sizes[position] - count))
+            for position, count in shared.items()
+            if count >= min_shared
+        )
+        matches = [
+            (position, score)
+            for position, score in scores
+            if score >= threshold and (mask is None or (mask >> position) & 1)
+        ]
+        return heapq.nsmallest(limit, matches, key=lambda match: (-match[1], match[0]))
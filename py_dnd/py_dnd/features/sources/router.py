@@ -1,53 +1,61 @@
 """Sources route definitions."""
 
-import asyncio
-import datetime
-import math
 from collections.abc import Hashable
-from io import BytesIO
 
-import pandas as pd
 from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
 from loguru import logger
-from pandas.core.series import Series
 
+from py_dnd.core.config import Settings, get_settings
 from py_dnd.database.db import (
     AsyncMasterSessionDependency,
     AsyncReplicaSessionDependency,
 )
-from py_dnd.features.auth.schemas import AuthUserToken
 from py_dnd.features.auth.service import UserAuth, UserAuthOptional
+from py_dnd.features.core.ingest import UploadRow, run_bulk_load
 from py_dnd.features.core.unit_of_work import SqlAlchemyUnitOfWork, sqlalchemy_uow
+from py_dnd.features.core.validation import validation_pool
 from py_dnd.features.sources.schemas import SourceCreate, SourceQuery, SourceSchema
+from py_dnd.features.sources.service import build_source
+from py_dnd.features.sources.transforms import normalize_source_records
+from py_dnd.shared.responses import PydanticResponse
 from py_dnd.shared.schemas import BulkLoadResponse, GenericListResponse
 
 router = APIRouter()
 
 
-@router.get("/query")
+@router.get("/query", response_model=GenericListResponse[SourceSchema])
 async def query_sources(
     current_user: UserAuthOptional,
     db: AsyncReplicaSessionDependency,
     params: SourceQuery = Depends(),
-) -> GenericListResponse[SourceSchema]:
+) -> PydanticResponse:
     """Retrieve sources."""
     try:
         user = {}
         if current_user:
             user = {"sub": current_user.sub, "preferred_username": current_user.preferred_username}
-        filters = params.model_dump(exclude_none=True, exclude={"limit", "offset"})
+        filters = params.to_filters()
         with logger.contextualize(user=user, filters=filters, log_threads=True):
             logger.info("Fetching game systems")
             async with sqlalchemy_uow(db, None) as uow:
-                entities, total_entities_count = await uow.source_repo.query(
-                    params=filters, offset=params.offset, limit=params.limit
+                result = await uow.source_repo.query(
+                    params=filters,
+                    offset=params.offset,
+                    limit=params.limit,
+                    cursor=params.cursor,
+                    count_strategy=params.count_strategy,
+                    fields=params.selected_fields(),
+                )
+            return PydanticResponse(
+                GenericListResponse[result.schema](
+                    entities=result.entities,
+                    total_entities_count=result.total_count,
+                    limit=params.limit,
+                    offset=params.offset,
+                    filters=filters,
+                    next_cursor=result.next_cursor,
+                    count_strategy=result.count_strategy,
                 )
-            return GenericListResponse[SourceSchema](
-                entities=entities,
-                total_entities_count=total_entities_count,
-                limit=params.limit,
-                offset=params.offset,
-                filters=filters,
             )
     except HTTPException:
         # assume that the error was already logged
@@ -60,42 +68,39 @@ async def query_sources(
 async def upsert_and_mutate_report(
     uow: SqlAlchemyUnitOfWork,
     response: BulkLoadResponse,
-    df_entity: tuple[Hashable, Series],
-    current_user: AuthUserToken,
+    sources: list[tuple[Hashable, SourceCreate]],
+    update_existing: bool = False,
 ) -> None:
-    """Adds a source and updates a bulk loading report.
+    """Adds the sources that do not exist yet and updates a bulk loading report.
+
+    Names repeated in the file are dropped in memory, the rest is inserted in one go by `bulk_ingest` which
+    returns the names it created, every other name already existed. With `update_existing` the sources are
+    upserted instead and existing ones are overwritten when they changed.
 
     Args:
         uow (SqlAlchemyUnitOfWork): _description_
         response (BulkLoadResponse): _description_
-        df_entity (tuple[Hashable, Series]): _description_
+        sources (list[tuple[Hashable, SourceCreate]]): The valid sources with their row index.
+        update_existing (bool, optional): Update sources that already exist. Defaults to False.
     """
-    index, entity = df_entity
-    source = None
-    try:
-        if math.isnan(entity.get("publish_year")):
-            entity["publish_year"] = None
-        if entity.get("created_by"):
-            del entity["created_by"]
-        if entity.get("updated_by"):
-            del entity["updated_by"]
-        logger.info("ik -- index={}, entity=\n{}", index, entity)
-        time_now = datetime.datetime.now(tz=datetime.UTC)
-        source = SourceCreate(
-            **entity,
-            created_at=time_now,
-            created_by=current_user.sub,
-            updated_at=time_now,
-            updated_by=current_user.sub,
-        )
-        _, total_count = await uow.source_repo.query(params={"name": source.name}, limit=1)
-        if total_count > 0:
-            response.warnings.append(f"Source with name '{source.name}' already exists, skipping.")
+    unique_sources: dict[str, SourceCreate] = {}
+    for _, source in sources:
+        if source.name in unique_sources:
+            response.warnings.append(f"Source with name '{source.name}' is duplicated in the file, skipping.")
+            continue
+        unique_sources[source.name] = source
+    if update_existing:
+        result = await uow.source_repo.upsert_many(list(unique_sources.values()), conflict_cols=["name"])
+        response.created.extend(result.created)
+        response.updated.extend(result.updated)
+        response.warnings.extend(f"Source with name '{name}' is unchanged, skipping." for name in result.skipped)
+        return
+    created_names = await uow.source_repo.bulk_ingest(models_in=list(unique_sources.values()), key="name")
+    for name in unique_sources:
+        if name in created_names:
+            response.created.append(name)
         else:
-            await uow.source_repo.create(model_in=source, return_model=False)
-            response.created.append(source.name)
-    except Exception as e:
-        response.errors.append(f"row {index} [{source.name if source else entity[2]}]: {str(e)}")
+            response.warnings.append(f"Source with name '{name}' already exists, skipping.")
 
 
 @router.post("/bulk")
@@ -104,38 +109,39 @@ async def bulk_create(
     current_user: UserAuth,
     db: AsyncMasterSessionDependency,
     file: UploadFile = File(description='Files of type: ["text/csv", "application/json"]'),
+    update_existing: bool = False,
+    all_or_nothing: bool = False,
+    checkpoint: str | None = None,
+    settings: Settings = Depends(get_settings),
 ) -> BulkLoadResponse:
     """Bulk load in a list of source objects from a file.
 
-    Supports file types: [application/json]
+    The file is streamed and every batch of `BULK_LOAD_BATCH_SIZE` rows is committed on its own, unless
+    `all_or_nothing` is set. Pass the `checkpoint` of a failed load to resume the same file after its last commit.
+
+    Supports file types: [text/csv, application/json]
     """
     try:
         user = {"sub": current_user.sub, "preferred_username": current_user.preferred_username}
         with logger.contextualize(user=user, log_threads=True):
-            allowed_file_types = ["text/csv", "application/json"]
-            if file.content_type == "text/csv":
-                contents = await file.read()
-                df = pd.read_csv(BytesIO(contents))
-            elif file.content_type == "application/json":
-                contents = await file.read()
-                df = pd.read_json(BytesIO(contents))
-            else:
-                # pylint: disable=W0707 (raise-missing-from)
-                raise HTTPException(
-                    400,
-                    detail=f"Invalid document type. Expected on of: {[allowed_file_types]}, "
-                    + f"Received: {file.content_type}",
-                )
-
+            logger.info("Bulk loading sources")
             response = BulkLoadResponse(filename=file.filename)
 
-            async with sqlalchemy_uow(db, None) as uow:
-                tasks = [upsert_and_mutate_report(uow, response, entity, current_user) for entity in df.iterrows()]
-                await asyncio.gather(*tasks)
-
-                if not response.errors:
-                    await uow.db_session.flush()
-                    await uow.commit()
+            async def handle_batch(uow: SqlAlchemyUnitOfWork, batch: list[UploadRow]) -> None:
+                sources = await validation_pool.validate(
+                    response, batch, build_source, SourceCreate, current_user.sub, normalize=normalize_source_records
+                )
+                await upsert_and_mutate_report(uow, response, sources, update_existing=update_existing)
+
+            await run_bulk_load(
+                db,
+                file,
+                response,
+                handle_batch,
+                batch_size=settings.BULK_LOAD_BATCH_SIZE,
+                all_or_nothing=all_or_nothing,
+                checkpoint=checkpoint,
+            )
 
             response.update_totals()
             return response
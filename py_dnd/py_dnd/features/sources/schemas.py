@@ -97,4 +97,8 @@ class SourceQuery(QueryBase):
         str_strip_whitespace=True,
     )
 
-    name: str | None = Field(default=None, title="Names", description='Name(s) to filter on (separated by commas ",")')
+    name: str | None = Field(
+        default=None,
+        title="Names",
+        description='Name(s) to filter on (separated by commas ","), ending a name with "*" matches its prefix.',
+    )
@@ -0,0 +1,28 @@
+"""Source service."""
+
+import datetime
+from typing import Any
+
+from py_dnd.features.sources.schemas import SourceCreate
+
+
+def build_source(fields: dict[str, Any], user_sub: str) -> SourceCreate:
+    """Builds a source from a bulk loading row cleaned up by `normalize_source_records`.
+
+    Runs in the bulk validation processes (see `validation_pool`), keep it free of I/O.
+
+    Args:
+        fields (dict[str, Any]): The row.
+        user_sub (str): The id of the user loading the row.
+
+    Returns:
+        SourceCreate: The source.
+    """
+    time_now = datetime.datetime.now(tz=datetime.UTC)
+    return SourceCreate(
+        **fields,
+        created_at=time_now,
+        created_by=user_sub,
+        updated_at=time_now,
+        updated_by=user_sub,
+    )
@@ -0,0 +1,17 @@
+"""Source transforms."""
+
+from typing import Any
+
+from py_dnd.features.core.transforms import normalize_records, to_optional_int
+
+
+def normalize_source_records(records: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Clean up a batch of bulk loading source rows.
+
+    Args:
+        records (list[dict[str, Any]]): The rows.
+
+    Returns:
+        list[dict[str, Any]]: The rows ready for `build_source`.
+    """
+    return normalize_records(records, drop=["created_by", "updated_by"], convert={"publish_year": to_optional_int})
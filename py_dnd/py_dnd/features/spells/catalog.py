@@ -0,0 +1,489 @@
+"""In-memory spell catalog.
+
+Spells change rarely and are read constantly, with `SPELL_CATALOG_ENABLED` they are loaded from the replica at
+startup and `GET /spell/`, `/spell/query`, `/spell/facets` and `/spell/suggest` are answered from memory without a
+database round trip.
+
+Spells are kept in the order the database sorts their ids, the order of its pages: `ORDER BY id` follows the collation
+of the database (e.g. en_US.utf8), not the code point order of python, so the order is read from the database and
+never recomputed. They are indexed by bitmaps: python ints where bit `i`
+is set when spell `i` has a value. A filter is the union of the bitmaps of its values, filters are intersected,
+the total count is a popcount and a page is read from the lowest set bits. Names are indexed by lowercase word,
+the candidates are then checked against the same substring / prefix match as the `ILIKE` filters.
+
+The catalog is refreshed in the background from the spells whose `updated_at` moved (indexed), new spells or a change
+in the number of spells (deletions, missed rows) reload it completely.
+"""
+
+import asyncio
+import datetime
+import re
+from typing import Any, Iterable, Sequence
+
+from fastapi import HTTPException, status
+from loguru import logger
+from sqlalchemy import Select, func, select
+
+from py_dnd.database.session import replica_sessionmanager
+from py_dnd.features.core.repository import QueryResult, RepositoryBase, schema_columns
+from py_dnd.features.core.trigrams import TrigramIndex
+from py_dnd.features.spells.facets import FACET_COLUMNS
+from py_dnd.features.spells.models import Spell
+from py_dnd.features.spells.schemas import (
+    FacetCount,
+    SpellFacets,
+    SpellSchema,
+    SpellSuggestion,
+)
+from py_dnd.shared.enums import CountStrategyEnum
+from py_dnd.shared.responses import type_adapter
+
+# columns filtered through a bitmap per value
+INDEXED_COLUMNS = (
+    "source_id",
+    "level",
+    "school",
+    "is_ritual",
+    "is_concentration",
+    "has_verbal_component",
+    "has_somatic_component",
+    "has_material_component",
+)
+# rows committed after rows with a later `updated_at` (long transactions) are still picked up by the next refresh
+REFRESH_OVERLAP = datetime.timedelta(minutes=1)
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def to_bitmap(positions: Iterable[int], size: int) -> int:
+    """Build a bitmap in linear time (or-ing bits into an int one by one is quadratic).
+
+    Args:
+        positions (Iterable[int]): The set bits.
+        size (int): The number of rows.
+
+    Returns:
+        int: _description_
+    """
+    buffer = bytearray((size + 7) // 8)
+    for position in positions:
+        buffer[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(buffer, "little")
+
+
+def drop_lowest(bits: int, count: int) -> int:
+    """Clear the `count` lowest set bits of a bitmap (binary search on the popcount).
+
+    Args:
+        bits (int): _description_
+        count (int): _description_
+
+    Returns:
+        int: _description_
+    """
+    if count <= 0:
+        return bits
+    if count >= bits.bit_count():
+        return 0
+    low, high = 0, bits.bit_length()
+    while low < high:
+        middle = (low + high) // 2
+        if (bits & ((1 << middle) - 1)).bit_count() < count:
+            low = middle + 1
+        else:
+            high = middle
+    return bits & ~((1 << low) - 1)
+
+
+def lowest_positions(bits: int, limit: int | None = None) -> list[int]:
+    """Positions of the lowest set bits of a bitmap.
+
+    Args:
+        bits (int): _description_
+        limit (int | None, optional): At most this many positions, None for all of them. Defaults to None.
+
+    Returns:
+        list[int]: _description_
+    """
+    # bit i is character i of the reversed binary string
+    digits = bin(bits)[:1:-1]
+    positions = []
+    position = digits.find("1")
+    while position != -1 and (not limit or len(positions) < limit):
+        positions.append(position)
+        position = digits.find("1", position + 1)
+    return positions
+
+
+def split_values(value: Any) -> list[Any]:
+    """Values of a filter, see `RepositoryBase._get_filter_list`.
+
+    Args:
+        value (Any): A value, a list or values separated by commas.
+
+    Returns:
+        list[Any]: _description_
+    """
+    if value is None or value == "" or value == []:
+        return []
+    if isinstance(value, str) and "," in value:
+        return [v.strip() for v in value.split(",") if v.strip()]
+    return value if isinstance(value, list) else [value]
+
+
+class SpellCatalog:
+    """Spells indexed in memory (async refreshes)."""
+
+    def __init__(self) -> None:
+        self.loaded = False
+        self.spells: list[SpellSchema] = []
+        # in database order, spell i has id ids[i]
+        self.ids: list[str] = []
+        self.positions: dict[str, int] = {}
+        self.all_bits = 0
+        # column -> value -> bitmap
+        self.indexes: dict[str, dict[Any, int]] = {}
+        # lowercase name word -> bitmap
+        self.name_words: dict[str, int] = {}
+        # fuzzy name matching, built on the first suggestion
+        self.name_index: TrigramIndex | None = None
+        self.last_updated_at: datetime.datetime | None = None
+        self.refresh_interval = 60.0
+        self.refresher: asyncio.Task | None = None
+
+    async def start(self, refresh_interval: float = 60) -> None:
+        """Load the spells and start refreshing them in the background.
+
+        The database being unreachable does not stop the startup, spells are read from the database until the
+        catalog could be loaded.
+
+        Args:
+            refresh_interval (float, optional): Seconds between two refreshes. Defaults to 60.
+        """
+        self.refresh_interval = refresh_interval
+        await self.refresh()
+        self.refresher = asyncio.create_task(self.run(), name="spell-catalog-refresher")
+        logger.debug("SpellCatalog started with {} spells", len(self.spells))
+
+    async def close(self) -> None:
+        """Stop the background refreshes and serve spells from the database again."""
+        if self.refresher is not None:
+            self.refresher.cancel()
+            await asyncio.gather(self.refresher, return_exceptions=True)
+        self.refresher = None
+        self.loaded = False
+
+    async def run(self) -> None:
+        """Refresh loop."""
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            await self.refresh()
+
+    @staticmethod
+    def select_spells() -> Select:
+        """Select the columns of `SpellSchema` (see `RepositoryBase.select_schema`) in the order of the pages.
+
+        Returns:
+            Select: _description_
+        """
+        return select(*schema_columns(Spell, SpellSchema) or ()).order_by(Spell.id)
+
+    @staticmethod
+    def to_spells(rows: Sequence[Any]) -> list[SpellSchema]:
+        """Build the spells of rows selected by `select_spells`.
+
+        Args:
+            rows (Sequence[Any]): _description_
+
+        Returns:
+            list[SpellSchema]: _description_
+        """
+        keys = [model_field.key for model_field in schema_columns(Spell, SpellSchema) or ()]
+        return type_adapter(list[SpellSchema]).validate_python([dict(zip(keys, row)) for row in rows])
+
+    async def refresh(self) -> bool:
+        """Load the spells updated since the last refresh, or all of them, the catalog is kept if it fails.
+
+        Returns:
+            bool: Whether the catalog was refreshed.
+        """
+        try:
+            async with replica_sessionmanager.session() as session:
+                total = int(await session.scalar(select(func.count()).select_from(Spell)) or 0)
+                query = self.select_spells()
+                if self.loaded and self.last_updated_at is not None:
+                    query = query.where(Spell.updated_at >= self.last_updated_at - REFRESH_OVERLAP)
+                spells = self.to_spells((await session.execute(query)).all())
+                if self.loaded:
+                    known = sum(spell.id in self.positions for spell in spells)
+                    # the position of a new spell is only known to the database
+                    if known < len(spells) or len(self.spells) != total:
+                        logger.info("New spells or spell count changed to {}, reloading the spell catalog", total)
+                        spells = self.to_spells((await session.execute(self.select_spells())).all())
+                        self.build(spells)
+                        return True
+        except Exception as e:
+            logger.error("Failed to refresh the spell catalog: {}", str(e))
+            return False
+        if not self.loaded:
+            self.build(spells)
+            logger.info("Loaded {} spells in the spell catalog", len(spells))
+        else:
+            self.update(spells)
+        return True
+
+    def build(self, spells: list[SpellSchema]) -> None:
+        """Index every spell.
+
+        Args:
+            spells (list[SpellSchema]): In database order, see `select_spells`.
+        """
+        size = len(spells)
+        indexes: dict[str, dict[Any, list[int]]] = {column: {} for column in INDEXED_COLUMNS}
+        name_words: dict[str, list[int]] = {}
+        for position, spell in enumerate(spells):
+            for column in INDEXED_COLUMNS:
+                indexes[column].setdefault(getattr(spell, column), []).append(position)
+            for word in set(WORD_PATTERN.findall(spell.name.lower())):
+                name_words.setdefault(word, []).append(position)
+        self.indexes = {
+            column: {value: to_bitmap(positions, size) for value, positions in values.items()}
+            for column, values in indexes.items()
+        }
+        self.name_words = {word: to_bitmap(positions, size) for word, positions in name_words.items()}
+        self.spells = spells
+        self.ids = [spell.id for spell in spells]
+        self.positions = {spell_id: position for position, spell_id in enumerate(self.ids)}
+        self.all_bits = (1 << size) - 1
+        self.name_index = None
+        self.last_updated_at = max((spell.updated_at for spell in spells), default=None)
+        self.loaded = True
+
+    def update(self, spells: list[SpellSchema]) -> None:
+        """Apply the spells of an incremental refresh.
+
+        Args:
+            spells (list[SpellSchema]): Spells already in the catalog, new spells are loaded by a full reload.
+        """
+        changed = 0
+        for spell in spells:
+            position = self.positions[spell.id]
+            previous = self.spells[position]
+            if previous == spell:
+                continue
+            changed += 1
+            bit = 1 << position
+            for column in INDEXED_COLUMNS:
+                values = self.indexes[column]
+                old, new = getattr(previous, column), getattr(spell, column)
+                if old != new:
+                    values[old] &= ~bit
+                    values[new] = values.get(new, 0) | bit
+            old_words = set(WORD_PATTERN.findall(previous.name.lower()))
+            new_words = set(WORD_PATTERN.findall(spell.name.lower()))
+            for word in old_words - new_words:
+                self.name_words[word] &= ~bit
+            for word in new_words - old_words:
+                self.name_words[word] = self.name_words.get(word, 0) | bit
+            if previous.name != spell.name:
+                self.name_index = None
+            self.spells[position] = spell
+        self.last_updated_at = max([spell.updated_at for spell in spells], default=self.last_updated_at)
+        if changed:
+            logger.debug("Spell catalog updated {} spells", changed)
+
+    def filter_bits(self, params: dict[str, Any] | None = None, exact: bool = False) -> int | None:
+        """The bitmap of the spells matching filters, like `RepositoryBase.apply_param_filters_to_query`.
+
+        Args:
+            params (dict[str, Any] | None, optional): Filters. Defaults to None.
+            exact (bool, optional): Match names exactly. Defaults to False.
+
+        Raises:
+            HTTPException: 400 if a value does not fit the column type.
+
+        Returns:
+            int | None: None if a filter is not indexed and the database has to answer.
+        """
+        bits = self.all_bits
+        for key, value in (params or {}).items():
+            key = str(key).split(".")[-1]
+            values = split_values(value)
+            if not values:
+                continue
+            if key == "name":
+                bits &= self.name_bits([str(v) for v in values], bits, exact=exact)
+                continue
+            if key not in self.indexes:
+                return None
+            model_field = getattr(Spell, key)
+            try:
+                typed = {RepositoryBase._coerce_filter_value(model_field, v) for v in values}
+            except (ValueError, TypeError, KeyError) as e:
+                logger.debug("Invalid {} filter {}: {}", key, value, e)
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid {key}") from e
+            matches = 0
+            for typed_value in typed:
+                matches |= self.indexes[key].get(typed_value, 0)
+            bits &= matches
+        return bits
+
+    def name_bits(self, values: list[str], candidates: int, exact: bool = False) -> int:
+        """The bitmap of the spells whose name matches one of the values, like the `ILIKE` filters.
+
+        Args:
+            values (list[str]): Substrings, prefixes when they end with `*`, or names with `exact`.
+            candidates (int): The spells matching the other filters.
+            exact (bool, optional): Match names exactly. Defaults to False.
+
+        Returns:
+            int: _description_
+        """
+        matches = 0
+        for value in values:
+            prefix = not exact and value.endswith("*")
+            needle = value if exact else value.rstrip("*").lower()
+            bits = candidates
+            # every word of the value is (part of) a word of the name
+            for word in WORD_PATTERN.findall(needle.lower()):
+                word_bits = 0
+                for name_word, name_word_bits in self.name_words.items():
+                    if word in name_word:
+                        word_bits |= name_word_bits
+                bits &= word_bits
+            if not exact and not prefix and WORD_PATTERN.fullmatch(needle):
+                # a single word found in a word of the name is found in the name
+                matches |= bits
+                continue
+            for position in lowest_positions(bits):
+                name = self.spells[position].name
+                if exact:
+                    found = name == needle
+                elif prefix:
+                    found = name.lower().startswith(needle)
+                else:
+                    found = needle in name.lower()
+                if found:
+                    matches |= 1 << position
+        return matches
+
+    def facets(self, params: dict[str, Any] | None = None) -> SpellFacets | None:
+        """Count the spells matching filters per value of every facet (see `FACET_COLUMNS`).
+
+        Args:
+            params (dict[str, Any] | None, optional): Filters. Defaults to None.
+
+        Returns:
+            SpellFacets | None: None if the catalog is not loaded or can't answer.
+        """
+        if not self.loaded:
+            return None
+        bits = self.filter_bits(params)
+        if bits is None:
+            return None
+        facets: dict[str, list[FacetCount]] = {}
+        for column in FACET_COLUMNS:
+            counts = ((value, (bits & value_bits).bit_count()) for value, value_bits in self.indexes[column].items())
+            facets[column] = [
+                FacetCount(value=value, count=count) for value, count in sorted(counts, key=lambda c: c[0]) if count
+            ]
+        return SpellFacets(total_entities_count=bits.bit_count(), filters=params, facets=facets)
+
+    def suggest(
+        self, text: str, limit: int = 10, source_id: str | None = None, threshold: float = 0.3
+    ) -> list[SpellSuggestion] | None:
+        """The spells with the names most similar to `text` (trigram similarity, see `TrigramIndex`).
+
+        Args:
+            text (str): A (partial, misspelled) name.
+            limit (int, optional): At most this many spells. Defaults to 10.
+            source_id (str | None, optional): Only spells of this source. Defaults to None.
+            threshold (float, optional): Minimum similarity. Defaults to 0.3.
+
+        Returns:
+            list[SpellSuggestion] | None: None if the catalog is not loaded.
+        """
+        if not self.loaded:
+            return None
+        if self.name_index is None:
+            self.name_index = TrigramIndex(spell.name for spell in self.spells)
+        mask = None if source_id is None else self.indexes["source_id"].get(source_id, 0)
+        return [
+            SpellSuggestion(
+                id=self.spells[position].id,
+                name=self.spells[position].name,
+                source_id=self.spells[position].source_id,
+                score=round(score, 4),
+            )
+            for position, score in self.name_index.search(text, limit=limit, threshold=threshold, mask=mask)
+        ]
+
+    def query(
+        self,
+        repository: RepositoryBase,
+        params: dict[str, Any] | None = None,
+        *,
+        order_by: Any | None = None,
+        limit: int | None = 100,
+        offset: int | None = 0,
+        cursor: str | None = None,
+        exact: bool = False,
+        count_strategy: CountStrategyEnum | None = None,
+        fields: frozenset[str] | None = None,
+    ) -> QueryResult[SpellSchema] | None:
+        """Answer `RepositoryBase.query` from memory, the pages, counts and cursors are the same.
+
+        Args:
+            repository (RepositoryBase): The spell repository, for the cursors and the sparse fieldsets.
+            params (dict[str, Any] | None, optional): Filters. Defaults to None.
+            order_by (Any | None, optional): Only the default (id) order is indexed. Defaults to None.
+            limit (int | None, optional): _description_. Defaults to 100.
+            offset (int | None, optional): _description_. Defaults to 0.
+            cursor (str | None, optional): _description_. Defaults to None.
+            exact (bool, optional): Match names exactly. Defaults to False.
+            count_strategy (CountStrategyEnum | None, optional): Counts are always exact (counting bits is cheap),
+                except for NONE. Defaults to None.
+            fields (frozenset[str] | None, optional): Fields of the schema to return. Defaults to None.
+
+        Returns:
+            QueryResult[SpellSchema] | None: None if the catalog is not loaded or can't answer.
+        """
+        if not self.loaded or (order_by is not None and order_by.key != "id"):
+            return None
+        # the cursor of the next page is read from the last entity
+        schema = repository.fields_schema(None if fields is None else fields | {"id"})
+        bits = self.filter_bits(params, exact=exact)
+        if bits is None:
+            return None
+        total_count: int | None = bits.bit_count()
+        if cursor:
+            (after,) = repository.decode_cursor(cursor)
+            position = self.positions.get(after)
+            if position is None:
+                # a spell deleted since, or not loaded yet: only the database can place it
+                return None
+            bits &= ~((1 << (position + 1)) - 1)
+        elif offset:
+            bits = drop_lowest(bits, offset)
+        spells = [self.spells[position] for position in lowest_positions(bits, limit)]
+        entities: list[Any] = spells
+        if schema is not SpellSchema:
+            entities = type_adapter(list[schema]).validate_python(spells, from_attributes=True)
+        if not (limit or offset or cursor):
+            count_strategy = CountStrategyEnum.EXACT
+        elif count_strategy == CountStrategyEnum.NONE:
+            total_count = None
+        else:
+            count_strategy = CountStrategyEnum.EXACT
+        next_cursor = None
+        if limit and len(spells) == limit:
+            next_cursor = repository.encode_cursor(spells[-1])
+        return QueryResult(
+            entities=entities,
+            total_count=total_count,
+            next_cursor=next_cursor,
+            count_strategy=count_strategy,
+            schema=schema,
+        )
+
+
+spell_catalog = SpellCatalog()
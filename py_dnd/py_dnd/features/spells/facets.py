@@ -0,0 +1,94 @@
+"""Spell facet counts cached by filters.
+
+The spell browser asks for the same facet counts over and over (the chips of the filters it shows), the counts of
+a set of filters are kept by digest of the filters for `ttl` seconds.
+"""
+
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, NamedTuple
+
+from loguru import logger
+
+from py_dnd.features.spells.schemas import SpellFacets
+
+# columns counted per value by `/spell/facets`
+FACET_COLUMNS = ("level", "school", "is_ritual", "is_concentration")
+
+
+def filters_digest(filters: dict[str, Any]) -> bytes:
+    """Digest of a set of filters, the same filters in any order have the same digest.
+
+    Args:
+        filters (dict[str, Any]): See `SpellQuery.to_filters`.
+
+    Returns:
+        bytes: _description_
+    """
+    raw = json.dumps(filters, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(raw.encode(), digest_size=16).digest()
+
+
+class CachedFacets(NamedTuple):
+    """Facet counts and when they are counted again."""
+
+    facets: SpellFacets
+    expires_at: float
+
+
+class FacetCache:
+    """Bounded LRU cache from filters digest to the facet counts."""
+
+    def __init__(self, max_size: int = 256, ttl: float = 60) -> None:
+        self.entries: OrderedDict[bytes, CachedFacets] = OrderedDict()
+        self.max_size = max_size
+        self.ttl = ttl
+
+    def init(self, max_size: int, ttl: float) -> None:
+        """Resize the cache, 0 disables it.
+
+        Args:
+            max_size (int): Maximum number of filter sets kept.
+            ttl (float): Seconds the counts of a filter set are reused.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries.clear()
+        logger.debug("FacetCache initialized with max_size={} ttl={}", max_size, ttl)
+
+    def get(self, key: bytes) -> SpellFacets | None:
+        """Get the counts of a filter set.
+
+        Args:
+            key (bytes): See `filters_digest`.
+
+        Returns:
+            SpellFacets | None: None if they are not cached or expired.
+        """
+        cached = self.entries.get(key)
+        if cached is None:
+            return None
+        if cached.expires_at <= time.monotonic():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return cached.facets
+
+    def put(self, key: bytes, facets: SpellFacets) -> None:
+        """Keep the counts of a filter set.
+
+        Args:
+            key (bytes): See `filters_digest`.
+            facets (SpellFacets): _description_
+        """
+        if self.max_size <= 0 or self.ttl <= 0:
+            return
+        self.entries[key] = CachedFacets(facets, time.monotonic() + self.ttl)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+
+facet_cache = FacetCache()
@@ -2,7 +2,8 @@
 
 from typing import Any
 
-from sqlalchemy import ForeignKey, UniqueConstraint
+from sqlalchemy import Computed, ForeignKey, Index, UniqueConstraint
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from py_dnd import shared
@@ -10,6 +11,16 @@ from py_dnd.database.base_class import DndSchemaBase
 from py_dnd.features.sources.models import Source
 from py_dnd.shared.models import MixinBookeeping
 
+SEARCH_CONFIG = "english"
+"""Text search configuration of `Spell.search_vector` and of the search queries."""
+
+# name ranks above description, above at_higher_levels
+SEARCH_VECTOR = (
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(name, '')), 'A')"
+    + f" || setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(description, '')), 'B')"
+    + f" || setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(at_higher_levels, '')), 'C')"
+)
+
 
 class Spell(MixinBookeeping, DndSchemaBase):
     """SQLAlchemy spell model."""
@@ -46,7 +57,21 @@ class Spell(MixinBookeeping, DndSchemaBase):
     difficulty_class_type: Mapped[str | None] = mapped_column(default=None, nullable=True)
     stat_blocks: Mapped[dict[str, Any] | None] = mapped_column(default=None)
     is_homebrew: Mapped[bool] = mapped_column(default=True, nullable=False)
+    # full text search document, generated by postgres and never loaded with the spell
+    search_vector: Mapped[Any] = mapped_column(TSVECTOR, Computed(SEARCH_VECTOR, persisted=True), deferred=True)
     # relationships
     source = relationship(Source)
     # constraints
-    UniqueConstraint("source_id", "name", name="ux_spell")
+    __table_args__: tuple | dict = (
+        UniqueConstraint("source_id", "name", name="ux_spell"),
+        # pg_trgm indexes for the `ILIKE '%...%'` filters
+        Index("ix_dnd_spell_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+        Index(
+            "ix_dnd_spell_description_trgm",
+            "description",
+            postgresql_using="gin",
+            postgresql_ops={"description": "gin_trgm_ops"},
+        ),
+        Index("ix_dnd_spell_search_vector", "search_vector", postgresql_using="gin"),
+        DndSchemaBase.__table_args__,  # this dict has to be last
+    )
@@ -2,17 +2,29 @@
 
 from __future__ import annotations
 
+from typing import Any
+
 import loguru
+from sqlalchemy import Result, Select, func, literal, select, tuple_
+from sqlalchemy.dialects.postgresql import REGCONFIG
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import InstrumentedAttribute
 
-from py_dnd.features.core.repository import RepositoryBase
-from py_dnd.features.spells.models import Spell
+from py_dnd.database.exceptions import handle_sqlalchemy_errors_decorator
+from py_dnd.features.core.repository import QueryResult, RepositoryBase, schema_columns
+from py_dnd.features.spells.catalog import spell_catalog
+from py_dnd.features.spells.facets import FACET_COLUMNS
+from py_dnd.features.spells.models import SEARCH_CONFIG, Spell
 from py_dnd.features.spells.schemas import (
+    FacetCount,
     SpellCreate,
+    SpellFacets,
     SpellSchema,
     SpellSchemaBase,
+    SpellSuggestion,
     SpellUpdate,
 )
+from py_dnd.shared.enums import CountStrategyEnum
 
 
 class SpellRepository(RepositoryBase[Spell, SpellSchema, SpellSchemaBase, SpellCreate, SpellUpdate]):
@@ -26,6 +38,197 @@ class SpellRepository(RepositoryBase[Spell, SpellSchema, SpellSchemaBase, SpellC
         super().__init__(session=session, model=Spell, schema=SpellSchema, schema_base=SpellSchemaBase)
         self.logger.trace("{} created!", self.__class__.__name__)
 
+    async def read_multi(
+        self,
+        *,
+        offset: int = 0,
+        limit: int = 100,
+        cursor: str | None = None,
+    ) -> list[SpellSchema]:
+        """Get multiple spells, from the spell catalog when it is loaded (see `RepositoryBase.read_multi`).
+
+        Args:
+            offset (int, optional): _description_. Defaults to 0.
+            limit (int, optional): _description_. Defaults to 100.
+            cursor (str | None, optional): Keyset cursor from `encode_cursor`, replaces `offset`. Defaults to None.
+
+        Returns:
+            list[SpellSchema]: _description_
+        """
+        result = spell_catalog.query(
+            self, offset=offset, limit=limit, cursor=cursor, count_strategy=CountStrategyEnum.NONE
+        )
+        if result is not None:
+            return result.entities
+        return await super().read_multi(offset=offset, limit=limit, cursor=cursor)
+
+    async def query(
+        self,
+        params: dict[str, list[Any] | str | None],
+        *,
+        order_by: InstrumentedAttribute | None = None,
+        limit: int | None = 100,
+        offset: int | None = 0,
+        cursor: str | None = None,
+        exact: bool = False,
+        count_strategy: CountStrategyEnum | None = None,
+        fields: frozenset[str] | None = None,
+    ) -> QueryResult[SpellSchema]:
+        """Query spells, from the spell catalog when it is loaded and indexes the filters (see `RepositoryBase.query`).
+
+        Args:
+            params (dict[str, list[Any] | str | None]): A dict of fields from Spell to query.
+            order_by (InstrumentedAttribute, None, optional): Model column for SQL 'ORDER BY'. Defaults to None.
+            limit (int | None, optional): SQL 'LIMIT'. Defaults to 100.
+            offset (int | None, optional): SQL 'OFFSET'. Defaults to 0.
+            cursor (str | None, optional): A `next_cursor` from a previous page. Defaults to None.
+            exact (bool, optional): Match names exactly. Defaults to False.
+            count_strategy (CountStrategyEnum | None, optional): How to get the total count, None for EXACT
+                (ESTIMATE with a cursor). Defaults to None.
+            fields (frozenset[str] | None, optional): Fields of the schema to return, None for all of them.
+                Defaults to None.
+
+        Returns:
+            QueryResult[SpellSchema]: The entities, the total_count, the cursor of the next page and the schema.
+        """
+        kwargs: dict[str, Any] = {
+            "order_by": order_by,
+            "limit": limit,
+            "offset": offset,
+            "cursor": cursor,
+            "exact": exact,
+            "count_strategy": count_strategy,
+            "fields": fields,
+        }
+        result = spell_catalog.query(self, params, **kwargs)
+        if result is not None:
+            return result
+        return await super().query(params, **kwargs)
+
+    @handle_sqlalchemy_errors_decorator
+    async def facets(self, params: dict[str, Any] | None = None) -> SpellFacets:
+        """Count the spells matching filters per value of every facet (see `FACET_COLUMNS`).
+
+        From the spell catalog when it is loaded, otherwise in a single `GROUP BY GROUPING SETS` query: one set per
+        facet column plus the empty set for the total, `GROUPING()` tells which set a row counts.
+
+        Args:
+            params (dict[str, Any] | None, optional): Filters, see `query`. Defaults to None.
+
+        Returns:
+            SpellFacets: _description_
+        """
+        facets = spell_catalog.facets(params)
+        if facets is not None:
+            return facets
+        columns = [getattr(Spell, column) for column in FACET_COLUMNS]
+        query: Select = select(*columns, func.grouping(*columns).label("grouping"), func.count().label("spell_count"))
+        if params:
+            query = self.apply_param_filters_to_query(query=query, params=params)
+        query = query.group_by(func.grouping_sets(*columns, tuple_()))
+        result: Result = await self.session.execute(query)
+        total_count = 0
+        counts: dict[str, list[FacetCount]] = {column: [] for column in FACET_COLUMNS}
+        # the bit of a column is 0 in the rows grouped by it, the first column is the most significant bit
+        all_bits = (1 << len(columns)) - 1
+        for row in result.all():
+            if row.grouping == all_bits:
+                total_count = row.spell_count
+                continue
+            index = len(columns) - (all_bits ^ row.grouping).bit_length()
+            counts[FACET_COLUMNS[index]].append(FacetCount(value=row[index], count=row.spell_count))
+        for values in counts.values():
+            values.sort(key=lambda facet_count: facet_count.value)
+        return SpellFacets(total_entities_count=total_count, filters=params, facets=counts)
+
+    @handle_sqlalchemy_errors_decorator
+    async def suggest(self, text: str, *, limit: int = 10, source_id: str | None = None) -> list[SpellSuggestion]:
+        """The spells with the names most similar to `text`, for typeaheads and for linking names to spells.
+
+        Trigram similarity of `pg_trgm`: from the spell catalog when it is loaded, otherwise with the `%` operator
+        (trigram GIN index, similarity of at least `pg_trgm.similarity_threshold`, 0.3 by default) ordered by
+        `similarity()`. Both give the same scores.
+
+        Args:
+            text (str): A (partial, misspelled) name, e.g. "firebal".
+            limit (int, optional): At most this many spells. Defaults to 10.
+            source_id (str | None, optional): Only spells of this source. Defaults to None.
+
+        Returns:
+            list[SpellSuggestion]: The most similar first.
+        """
+        suggestions = spell_catalog.suggest(text, limit=limit, source_id=source_id)
+        if suggestions is not None:
+            return suggestions
+        score = func.similarity(Spell.name, text)
+        query = select(Spell.id, Spell.name, Spell.source_id, score.label("score")).where(Spell.name.op("%")(text))
+        if source_id is not None:
+            query = query.where(Spell.source_id == source_id)
+        result: Result = await self.session.execute(query.order_by(score.desc(), Spell.id).limit(limit))
+        return [
+            SpellSuggestion(id=row.id, name=row.name, source_id=row.source_id, score=round(row.score, 4))
+            for row in result.all()
+        ]
+
+    @handle_sqlalchemy_errors_decorator
+    async def search(
+        self,
+        text: str,
+        params: dict[str, Any] | None = None,
+        *,
+        limit: int | None = 100,
+        offset: int | None = 0,
+        count_strategy: CountStrategyEnum = CountStrategyEnum.EXACT,
+        fields: frozenset[str] | None = None,
+    ) -> QueryResult[SpellSchema]:
+        """Full text search of spells, the best matches first.
+
+        `text` is parsed by `websearch_to_tsquery` (never a syntax error) and matched against the generated
+        `search_vector` column (GIN index), the matches are ordered by `ts_rank_cd` then `id`. The filters of
+        `params` are applied like in `query`.
+
+        Args:
+            text (str): The search, e.g. `fire -cold "saving throw"`.
+            params (dict[str, Any] | None, optional): Filters, see `query`. Defaults to None.
+            limit (int | None, optional): SQL 'LIMIT'. Defaults to 100.
+            offset (int | None, optional): SQL 'OFFSET'. Defaults to 0.
+            count_strategy (CountStrategyEnum, optional): How to get the total count. Defaults to EXACT.
+            fields (frozenset[str] | None, optional): Fields of the schema to return, None for all of them.
+                Defaults to None.
+
+        Returns:
+            QueryResult[SpellSchema]: The entities, the total_count and the schema (no cursor).
+        """
+        total_count: int | None = None
+        schema = self.fields_schema(fields)
+        tsquery = func.websearch_to_tsquery(literal(SEARCH_CONFIG, type_=REGCONFIG), text)
+        query: Select = self.select_schema(schema).where(Spell.search_vector.bool_op("@@")(tsquery))
+        if params:
+            query = self.apply_param_filters_to_query(query=query, params=params)
+        filtered_query = query
+        if count_strategy == CountStrategyEnum.ESTIMATE:
+            total_count = await self.estimate_count(filtered_query)
+            if total_count is None:
+                count_strategy = CountStrategyEnum.EXACT
+        with_count_window = count_strategy == CountStrategyEnum.EXACT
+        if with_count_window:
+            query = query.add_columns(func.count().over().label("total_count"))
+        query = query.order_by(func.ts_rank_cd(Spell.search_vector, tsquery).desc(), Spell.id)
+        if offset:
+            query = query.offset(offset)
+        if limit:
+            query = query.limit(limit)
+        result: Result = await self.session.execute(query)
+        rows = result.all()
+        if schema_columns(self.model, schema) is not None:
+            entities = self.rows_to_schemas(rows, schema)
+        else:
+            entities = self.to_schemas([row[0] for row in rows], schema)
+        if with_count_window:
+            # the window has nothing to count on when the page is past the last match
+            total_count = int(rows[0].total_count) if rows else await self.count(filtered_query)
+        return QueryResult(entities=entities, total_count=total_count, count_strategy=count_strategy, schema=schema)
+
 
 # def get_spell_repository(session: AsyncSession) -> SpellRepository:
 #     # This function will return an instance of the SpellRepository class
@@ -1,42 +1,52 @@
 """Spell route definitions."""
 
-import asyncio
 import datetime
-import math
 import uuid
 from collections.abc import Hashable
-from io import BytesIO
 
-import pandas as pd
 from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
 from loguru import logger
-from pandas.core.series import Series
 
+from py_dnd.core.config import Settings, get_settings
 from py_dnd.database.db import (
     AsyncMasterSessionDependency,
     AsyncReplicaSessionDependency,
 )
-from py_dnd.features.auth.schemas import AuthUserToken
 from py_dnd.features.auth.service import UserAuth, UserAuthOptional
+from py_dnd.features.bulk_jobs.schemas import BulkJobSchema
+from py_dnd.features.bulk_jobs.service import bulk_job_manager
+from py_dnd.features.core.ingest import BatchHandler, UploadRow
 from py_dnd.features.core.unit_of_work import SqlAlchemyUnitOfWork, sqlalchemy_uow
+from py_dnd.features.core.validation import validation_pool
+from py_dnd.features.spells.facets import facet_cache, filters_digest
 from py_dnd.features.spells.schemas import (
     SpellCreate,
     SpellCreateInput,
+    SpellFacets,
     SpellQuery,
     SpellSchema,
+    SpellSearchQuery,
+    SpellSuggestion,
+    SpellSuggestQuery,
 )
+from py_dnd.features.spells.service import build_spell
+from py_dnd.features.spells.transforms import normalize_spell_records
+from py_dnd.shared.responses import PydanticResponse
 from py_dnd.shared.schemas import BulkLoadResponse, GenericListResponse
 
 router = APIRouter()
 
+# unique key of a spell (`ux_spell`), bulk loads detect existing and duplicated spells with it
+SPELL_KEY = ["source_id", "name"]
 
-@router.get("/")
+
+@router.get("/", response_model=list[SpellSchema])
 async def read_spells(
     current_user: UserAuthOptional,
     db: AsyncReplicaSessionDependency,
     offset: int = 0,
     limit: int = 100,
-) -> list[SpellSchema]:
+) -> PydanticResponse:
     """Retrieve spells."""
     try:
         user = {}
@@ -46,7 +56,7 @@ async def read_spells(
             logger.info("Fetching spells")
             async with sqlalchemy_uow(db, None) as uow:
                 entities = await uow.spell_repo.read_multi(offset=offset, limit=limit)
-            return entities
+            return PydanticResponse(entities, list[SpellSchema])
     except HTTPException:
         # assume that the error was already logged
         raise
@@ -55,12 +65,12 @@ async def read_spells(
         raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, "Internal Error") from e
 
 
-@router.get("/query")
+@router.get("/query", response_model=GenericListResponse[SpellSchema])
 async def query_spells(
     current_user: UserAuthOptional,
     db: AsyncReplicaSessionDependency,
     params: SpellQuery = Depends(),
-) -> GenericListResponse[SpellSchema]:
+) -> PydanticResponse:
     """Retrieve spells."""
     try:
         user = {}
@@ -69,17 +79,125 @@ async def query_spells(
         with logger.contextualize(user=user, params=params.model_dump(exclude_none=True), log_threads=True):
             logger.info("Querying spellls")
             # user_logger = logger.bind(user_id=random.randint(0,99), user_username=random_name)
-            filters = params.model_dump(exclude_none=True, exclude={"limit", "offset"})
+            filters = params.to_filters()
+            async with sqlalchemy_uow(db, None) as uow:
+                result = await uow.spell_repo.query(
+                    params=filters,
+                    offset=params.offset,
+                    limit=params.limit,
+                    cursor=params.cursor,
+                    count_strategy=params.count_strategy,
+                    fields=params.selected_fields(),
+                )
+            return PydanticResponse(
+                GenericListResponse[result.schema](
+                    entities=result.entities,
+                    total_entities_count=result.total_count,
+                    limit=params.limit,
+                    offset=params.offset,
+                    filters=filters,
+                    next_cursor=result.next_cursor,
+                    count_strategy=result.count_strategy,
+                )
+            )
+    except HTTPException:
+        # assume that the error was already logged
+        raise
+    except Exception as e:
+        logger.error("Uncaught error: {}", str(e))
+        raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, "Internal Error") from e
+
+
+@router.get("/facets", response_model=SpellFacets)
+async def read_spell_facets(
+    current_user: UserAuthOptional,
+    db: AsyncReplicaSessionDependency,
+    params: SpellQuery = Depends(),
+) -> PydanticResponse:
+    """Count spells per level, school, ritual and concentration for filters (pagination is ignored).
+
+    Counts are cached by filters for `SPELL_FACETS_CACHE_SECONDS`.
+    """
+    try:
+        user = {}
+        if current_user:
+            user = {"sub": current_user.sub, "preferred_username": current_user.preferred_username}
+        with logger.contextualize(user=user, params=params.model_dump(exclude_none=True), log_threads=True):
+            logger.info("Counting spell facets")
+            filters = params.to_filters()
+            key = filters_digest(filters)
+            facets = facet_cache.get(key)
+            if facets is None:
+                async with sqlalchemy_uow(db, None) as uow:
+                    facets = await uow.spell_repo.facets(filters)
+                facet_cache.put(key, facets)
+            return PydanticResponse(facets, headers={"Cache-Control": f"max-age={int(facet_cache.ttl)}"})
+    except HTTPException:
+        # assume that the error was already logged
+        raise
+    except Exception as e:
+        logger.error("Uncaught error: {}", str(e))
+        raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, "Internal Error") from e
+
+
+@router.get("/suggest", response_model=list[SpellSuggestion])
+async def suggest_spells(
+    current_user: UserAuthOptional,
+    db: AsyncReplicaSessionDependency,
+    params: SpellSuggestQuery = Depends(),
+) -> PydanticResponse:
+    """Spells with a name similar to a (partial, misspelled) name, the most similar first (typeahead)."""
+    try:
+        user = {}
+        if current_user:
+            user = {"sub": current_user.sub, "preferred_username": current_user.preferred_username}
+        with logger.contextualize(user=user, params=params.model_dump(exclude_none=True), log_threads=True):
+            logger.info("Suggesting spells")
             async with sqlalchemy_uow(db, None) as uow:
-                entities, total_entities_count = await uow.spell_repo.query(
-                    params=filters, offset=params.offset, limit=params.limit
+                suggestions = await uow.spell_repo.suggest(params.q, limit=params.limit, source_id=params.source_id)
+            return PydanticResponse(suggestions, list[SpellSuggestion])
+    except HTTPException:
+        # assume that the error was already logged
+        raise
+    except Exception as e:
+        logger.error("Uncaught error: {}", str(e))
+        raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, "Internal Error") from e
+
+
+@router.get("/search", response_model=GenericListResponse[SpellSchema])
+async def search_spells(
+    current_user: UserAuthOptional,
+    db: AsyncReplicaSessionDependency,
+    params: SpellSearchQuery = Depends(),
+) -> PydanticResponse:
+    """Full text search of spells (name, description and at higher levels), the best matches first."""
+    try:
+        user = {}
+        if current_user:
+            user = {"sub": current_user.sub, "preferred_username": current_user.preferred_username}
+        with logger.contextualize(user=user, params=params.model_dump(exclude_none=True), log_threads=True):
+            logger.info("Searching spells")
+            if params.cursor:
+                raise HTTPException(status.HTTP_400_BAD_REQUEST, "Search results are paginated with offset")
+            filters = params.to_filters()
+            async with sqlalchemy_uow(db, None) as uow:
+                result = await uow.spell_repo.search(
+                    params.q,
+                    filters,
+                    limit=params.limit,
+                    offset=params.offset,
+                    count_strategy=params.count_strategy,
+                    fields=params.selected_fields(),
+                )
+            return PydanticResponse(
+                GenericListResponse[result.schema](
+                    entities=result.entities,
+                    total_entities_count=result.total_count,
+                    limit=params.limit,
+                    offset=params.offset,
+                    filters=filters,
+                    count_strategy=result.count_strategy,
                 )
-            return GenericListResponse[SpellSchema](
-                entities=entities,
-                total_entities_count=total_entities_count,
-                limit=params.limit,
-                offset=params.offset,
-                filters=filters,
             )
     except HTTPException:
         # assume that the error was already logged
@@ -92,54 +210,42 @@ async def query_spells(
 async def upsert_and_mutate_report(
     uow: SqlAlchemyUnitOfWork,
     response: BulkLoadResponse,
-    df_entity: tuple[Hashable, Series],
-    name_index: int,
-    current_user: AuthUserToken,
+    entities: list[tuple[Hashable, SpellCreate]],
+    update_existing: bool = False,
 ) -> None:
-    """Adds a spell and updates a bulk loading report.
+    """Adds the spells that do not exist yet and updates a bulk loading report.
+
+    Spells repeated in the file (same source and name, the unique key of a spell) are dropped in memory, the rest
+    is inserted in one go by `bulk_ingest` which returns the keys it created, every other key already existed. With
+    `update_existing` the spells are upserted instead and existing ones are overwritten when they changed.
 
     Args:
         uow (SqlAlchemyUnitOfWork): _description_
         response (BulkLoadResponse): _description_
-        df_entity (tuple[Hashable, Series]): _description_
+        entities (list[tuple[Hashable, SpellCreate]]): The valid spells with their row index.
+        update_existing (bool, optional): Update spells that already exist. Defaults to False.
     """
-    index, json_entity = df_entity
-    entity: SpellSchema | None = None
-    try:
-        if not json_entity.get("source_page") or math.isnan(json_entity.get("source_page")):
-            json_entity["source_page"] = None
-        if not json_entity.get("difficulty_class_saving_throw_override") or math.isnan(
-            json_entity.get("difficulty_class_saving_throw_override")
-        ):
-            json_entity["difficulty_class_saving_throw_override"] = None
-        else:
-            json_entity["difficulty_class_saving_throw_override"] = int(
-                json_entity.get("difficulty_class_saving_throw_override")
+    unique_entities: dict[tuple[str, str], SpellCreate] = {}
+    for _, entity in entities:
+        spell_key = (entity.source_id, entity.name)
+        if spell_key in unique_entities:
+            response.warnings.append(
+                f"Spell with name '{entity.name}' of source '{entity.source_id}' is duplicated in the file, skipping."
             )
-        if json_entity.get("difficulty_class_saving_throw"):
-            json_entity["difficulty_class_saving_throw"] = str(json_entity["difficulty_class_saving_throw"])
-        # TODO: stat_blocks should be handled as a json object (list of stat blocks)
-        json_entity["stat_blocks"] = None
-        time_now = datetime.datetime.now(tz=datetime.UTC)
-        if json_entity.get("created_by"):
-            del json_entity["created_by"]
-        if json_entity.get("updated_by"):
-            del json_entity["updated_by"]
-        entity = SpellCreate(
-            **json_entity,
-            created_at=time_now,
-            created_by=current_user.sub,
-            updated_at=time_now,
-            updated_by=current_user.sub,
-        )
-        _, total_count = await uow.spell_repo.query(params={"name": entity.name}, limit=1, exact=True)
-        if total_count > 0:
-            response.warnings.append(f"Spell with name '{entity.name}' already exists, skipping.")
+            continue
+        unique_entities[spell_key] = entity
+    if update_existing:
+        result = await uow.spell_repo.upsert_many(list(unique_entities.values()), conflict_cols=SPELL_KEY)
+        response.created.extend(name for _, name in result.created)
+        response.updated.extend(name for _, name in result.updated)
+        response.warnings.extend(f"Spell with name '{name}' is unchanged, skipping." for _, name in result.skipped)
+        return
+    created_keys = await uow.spell_repo.bulk_ingest(models_in=list(unique_entities.values()), key=SPELL_KEY)
+    for source_id, name in unique_entities:
+        if (source_id, name) in created_keys:
+            response.created.append(name)
         else:
-            await uow.spell_repo.create(model_in=entity, return_model=False)
-            response.created.append(entity.name)
-    except Exception as e:
-        response.errors.append(f"row {index} [{entity.name if entity else json_entity.iloc[name_index]}]: {str(e)}")
+            response.warnings.append(f"Spell with name '{name}' of source '{source_id}' already exists, skipping.")
 
 
 @router.post("/")
@@ -174,51 +280,47 @@ async def create_spell(
         raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, "Internal Error") from e
 
 
-@router.post("/bulk")
+@router.post("/bulk", status_code=status.HTTP_202_ACCEPTED)
 async def bulk_create(
     current_user: UserAuth,
     *,
-    db: AsyncMasterSessionDependency,
     file: UploadFile = File(description='Files of type: ["text/csv", "application/json"]'),
-) -> BulkLoadResponse:
-    """Bulk load in a list of spell objects from a file.
+    update_existing: bool = False,
+    all_or_nothing: bool = False,
+    checkpoint: str | None = None,
+    settings: Settings = Depends(get_settings),
+) -> BulkJobSchema:
+    """Queue a bulk load of a list of spell objects from a file.
 
-    Supports file types: [application/json]
+    The file is loaded in the background, poll `GET /bulk-jobs/{id}` for the progress and the final report.
+    It is streamed and every batch of `BULK_LOAD_BATCH_SIZE` rows is committed on its own, unless
+    `all_or_nothing` is set. Pass the `checkpoint` of a failed load to resume the same file after its last commit.
+
+    Supports file types: [text/csv, application/json]
     """
     try:
         user = {"sub": current_user.sub, "preferred_username": current_user.preferred_username}
         with logger.contextualize(user=user, filename=file.filename, log_threads=True):
-            logger.info("Bulk loading spells")
-            allowed_file_types = ["text/csv", "application/json"]
-            if file.content_type == "text/csv":
-                contents = await file.read()
-                df = pd.read_csv(BytesIO(contents))
-            elif file.content_type == "application/json":
-                contents = await file.read()
-                df = pd.read_json(BytesIO(contents))
-            else:
-                # pylint: disable=W0707 (raise-missing-from)
-                raise HTTPException(
-                    400,
-                    detail=f"Invalid document type. Expected on of: {[allowed_file_types]}, "
-                    + f"Received: {file.content_type}",
-                )
+            logger.info("Queueing spell bulk load")
 
-            response = BulkLoadResponse(filename=file.filename)
+            def make_batch_handler(response: BulkLoadResponse) -> BatchHandler:
+                async def handle_batch(uow: SqlAlchemyUnitOfWork, batch: list[UploadRow]) -> None:
+                    entities = await validation_pool.validate(
+                        response, batch, build_spell, SpellCreate, current_user.sub, normalize=normalize_spell_records
+                    )
+                    await upsert_and_mutate_report(uow, response, entities, update_existing=update_existing)
 
-            async with sqlalchemy_uow(db, None) as uow:
-                tasks = [
-                    upsert_and_mutate_report(uow, response, entity, [*df.keys()].index("name"), current_user)
-                    for entity in df.iterrows()
-                ]
-                await asyncio.gather(*tasks)
-
-                if not response.errors:
-                    await uow.db_session.flush()
-                    await uow.commit()
-
-            response.update_totals()
-            return response
+                return handle_batch
+
+            return await bulk_job_manager.submit(
+                file,
+                kind="spell",
+                created_by=current_user.sub,
+                make_batch_handler=make_batch_handler,
+                batch_size=settings.BULK_LOAD_BATCH_SIZE,
+                all_or_nothing=all_or_nothing,
+                checkpoint=checkpoint,
+            )
     except HTTPException:
         # assume that the error was already logged
         raise
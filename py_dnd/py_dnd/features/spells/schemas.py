@@ -2,7 +2,7 @@
 
 from typing import Any
 
-from pydantic import AliasChoices, BaseModel, ConfigDict, Field, StrictInt
+from pydantic import AliasChoices, BaseModel, ConfigDict, Field, StrictBool, StrictInt
 
 from py_dnd.shared import enums as shared_enums
 from py_dnd.shared.schemas import (
@@ -337,4 +337,84 @@ class SpellQuery(QueryBase):
         str_strip_whitespace=True,
     )
 
-    name: str | None = Field(default=None, title="Names", description='Name(s) to filter on (separated by commas ",")')
+    name: str | None = Field(
+        default=None,
+        title="Names",
+        description='Name(s) to filter on (separated by commas ","), ending a name with "*" matches its prefix.',
+    )
+    level: str | None = Field(
+        default=None,
+        title="Levels",
+        description='Level(s) to filter on (separated by commas ","), 0 for cantrips.',
+    )
+    school: str | None = Field(
+        default=None,
+        title="Schools",
+        description='School(s) of magic to filter on (separated by commas ",").',
+    )
+    is_ritual: bool | None = Field(default=None, title="Is Ritual", description="Only (or no) ritual spells.")
+    is_concentration: bool | None = Field(
+        default=None, title="Is Concentration", description="Only (or no) concentration spells."
+    )
+
+
+class SpellSearchQuery(SpellQuery):
+    """Allowed fields for searching spells, results are ranked so pages are fetched with `offset` (no cursor)."""
+
+    q: str = Field(
+        min_length=1,
+        title="Search",
+        description='Words to search the name, description and at higher levels of spells for, supports "quoted '
+        + 'phrases", `or` and `-word` to exclude a word.',
+    )
+
+    def to_filters(self) -> dict[str, Any]:
+        """Dump the spell filters, leaving out the search and the pagination options.
+
+        Returns:
+            dict[str, Any]: The filters that are set.
+        """
+        return self.model_dump(exclude_none=True, exclude={*QueryBase.model_fields, "q"})
+
+
+class FacetCount(BaseModel):
+    """Number of spells with a facet value."""
+
+    value: StrictBool | int | str = Field(title="Value")
+    count: int = Field(title="Count", description="How many spells match the filters and have this value.")
+
+
+class SpellFacets(BaseModel):
+    """Spell counts per value of every facet, for the current filters."""
+
+    total_entities_count: int = Field(default=0, title="Total Count", description="How many spells match the filters.")
+    filters: dict | None = Field(default=None, title="Filters", description="Filters used when counting.")
+    facets: dict[str, list[FacetCount]] = Field(
+        default_factory=dict,
+        title="Facets",
+        description="Counts per value of `level`, `school`, `is_ritual` and `is_concentration`, values without "
+        + "spells are left out.",
+    )
+
+
+class SpellSuggestQuery(BaseModel):
+    """Allowed fields for suggesting spells by name."""
+
+    model_config = ConfigDict(
+        extra="forbid",
+        validate_assignment=True,
+        str_strip_whitespace=True,
+    )
+
+    q: str = Field(min_length=1, title="Name", description="The (partial, misspelled) name of a spell.")
+    limit: int = Field(default=10, ge=1, le=50, title="Limit")
+    source_id: str | None = Field(default=None, title="Source ID", description="Only suggest spells of this source.")
+
+
+class SpellSuggestion(BaseModel):
+    """A spell whose name is similar to a searched name."""
+
+    id: str = Field(title="ID")
+    name: str = Field(title="Name")
+    source_id: str = Field(title="Source ID")
+    score: float = Field(title="Score", description="Trigram similarity of the names, from 0 to 1.")
@@ -1 +1,28 @@
 """Spell service."""
+
+import datetime
+from typing import Any
+
+from py_dnd.features.spells.schemas import SpellCreate
+
+
+def build_spell(fields: dict[str, Any], user_sub: str) -> SpellCreate:
+    """Builds a spell from a bulk loading row cleaned up by `normalize_spell_records`.
+
+    Runs in the bulk validation processes (see `validation_pool`), keep it free of I/O.
+
+    Args:
+        fields (dict[str, Any]): The row.
+        user_sub (str): The id of the user loading the row.
+
+    Returns:
+        SpellCreate: The spell.
+    """
+    time_now = datetime.datetime.now(tz=datetime.UTC)
+    return SpellCreate(
+        **fields,
+        created_at=time_now,
+        created_by=user_sub,
+        updated_at=time_now,
+        updated_by=user_sub,
+    )
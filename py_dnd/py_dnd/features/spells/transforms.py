@@ -1 +1,31 @@
 """Spell traansforms."""
+
+from typing import Any
+
+from py_dnd.features.core.transforms import (
+    normalize_records,
+    to_optional_int,
+    to_optional_str,
+)
+
+
+def normalize_spell_records(records: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Clean up a batch of bulk loading spell rows.
+
+    Args:
+        records (list[dict[str, Any]]): The rows.
+
+    Returns:
+        list[dict[str, Any]]: The rows ready for `build_spell`.
+    """
+    return normalize_records(
+        records,
+        drop=["created_by", "updated_by"],
+        convert={
+            "source_page": to_optional_int,
+            "difficulty_class_saving_throw_override": to_optional_int,
+            "difficulty_class_saving_throw": to_optional_str,
+        },
+        # TODO: stat_blocks should be handled as a json object (list of stat blocks)
+        assign={"stat_blocks": None},
+    )
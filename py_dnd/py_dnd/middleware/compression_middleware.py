@@ -0,0 +1,279 @@
+"""Middleware that compresses responses with the best encoding the client accepts.
+
+The encoding is negotiated from `Accept-Encoding` (zstd, then br, then gzip) and the level picked from the content
+type of the response: JSON and text get a mid level that keeps most of the size gain of the maximum level for a
+fraction of its CPU, already compressed types are sent as they are. Brotli and zstd are only offered when the
+`brotli` and `zstandard` packages are installed (both are dependencies of the project).
+
+Responses of the paths listed as static (e.g. `/openapi.json`) requested without a query string are compressed once,
+the compressed body is cached by content digest and reused for as long as the response does not change.
+"""
+
+import hashlib
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, NamedTuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+
+class Codec(NamedTuple):
+    """A content encoding."""
+
+    name: str
+    compress: Callable[[bytes, int], bytes]
+    # streaming compressor: returns (compress chunk, flush) functions
+    compressor: Callable[[int], tuple[Callable[[bytes], bytes], Callable[[], bytes]]]
+
+
+def gzip_compressor(level: int) -> tuple[Callable[[bytes], bytes], Callable[[], bytes]]:
+    """Streaming gzip compressor."""
+    compressobj = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return compressobj.compress, compressobj.flush
+
+
+CODECS: dict[str, Codec] = {
+    "gzip": Codec("gzip", lambda body, level: zlib.compress(body, level, wbits=31), gzip_compressor),
+}
+if brotli is not None:
+
+    def brotli_compressor(level: int) -> tuple[Callable[[bytes], bytes], Callable[[], bytes]]:
+        """Streaming brotli compressor."""
+        compressor = brotli.Compressor(quality=level)
+        return compressor.process, compressor.finish
+
+    CODECS["br"] = Codec("br", lambda body, level: brotli.compress(body, quality=level), brotli_compressor)
+if zstandard is not None:
+
+    def zstd_compressor(level: int) -> tuple[Callable[[bytes], bytes], Callable[[], bytes]]:
+        """Streaming zstd compressor."""
+        compressobj = zstandard.ZstdCompressor(level=level).compressobj()
+        return compressobj.compress, compressobj.flush
+
+    CODECS["zstd"] = Codec(
+        "zstd", lambda body, level: zstandard.ZstdCompressor(level=level).compress(body), zstd_compressor
+    )
+
+# server preference when the client accepts several encodings equally
+ENCODING_PREFERENCE = ("zstd", "br", "gzip")
+
+# content type prefix -> level per encoding, the first matching prefix wins.
+# e.g. the spell list (650KB of JSON): gzip 5 is 4% bigger than gzip 9 for half of its CPU
+COMPRESSION_LEVELS: tuple[tuple[str, dict[str, int] | None], ...] = (
+    ("text/event-stream", None),
+    ("image/svg+xml", {"zstd": 6, "br": 5, "gzip": 6}),
+    ("image/", None),
+    ("audio/", None),
+    ("video/", None),
+    ("font/woff", None),
+    ("application/zip", None),
+    ("application/gzip", None),
+    ("application/x-gzip", None),
+    ("application/zstd", None),
+    ("application/json", {"zstd": 3, "br": 4, "gzip": 5}),
+    ("text/", {"zstd": 3, "br": 4, "gzip": 5}),
+    ("application/javascript", {"zstd": 3, "br": 4, "gzip": 5}),
+    ("application/xml", {"zstd": 3, "br": 4, "gzip": 5}),
+)
+DEFAULT_LEVELS = {"zstd": 1, "br": 1, "gzip": 1}
+# static responses are compressed once, spend more CPU on them
+STATIC_LEVELS = {"zstd": 12, "br": 9, "gzip": 9}
+
+
+def negotiate_encoding(accept_encoding: str, available: dict[str, Codec] = CODECS) -> str | None:
+    """Pick the encoding of a response from the `Accept-Encoding` header.
+
+    Args:
+        accept_encoding (str): e.g. "gzip, deflate, br;q=0.9"
+        available (dict[str, Codec], optional): Supported encodings. Defaults to CODECS.
+
+    Returns:
+        str | None: The encoding, None to send the response as it is.
+    """
+    weights: dict[str, float] = {}
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.strip().partition(";")
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name.strip()] = weight
+    wildcard = weights.get("*", 0.0)
+    candidates = [(weights.get(name, wildcard), -rank, name) for rank, name in enumerate(ENCODING_PREFERENCE)]
+    weight, _, name = max((c for c in candidates if c[2] in available), default=(0.0, 0, None))
+    return name if weight > 0 else None
+
+
+def compression_levels(content_type: str) -> dict[str, int] | None:
+    """Levels per encoding for a content type.
+
+    Args:
+        content_type (str): _description_
+
+    Returns:
+        dict[str, int] | None: None if the content type is not worth compressing.
+    """
+    content_type = content_type.lower()
+    for prefix, levels in COMPRESSION_LEVELS:
+        if content_type.startswith(prefix):
+            return levels
+    return DEFAULT_LEVELS
+
+
+class CompressionMiddleware:
+    """Compress responses with the encoding negotiated with the client.
+
+    Args:
+        app (ASGIApp): _description_
+        minimum_size (int, optional): Smaller responses are not compressed. Defaults to 1000.
+        static_paths (tuple[str, ...], optional): Paths whose compressed responses are cached. Defaults to ().
+        cache_size (int, optional): Number of compressed static responses kept. Defaults to 32.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1000,
+        static_paths: tuple[str, ...] = (),
+        cache_size: int = 32,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.static_paths = frozenset(static_paths)
+        self.cache_size = cache_size
+        # (path, encoding, body digest) -> compressed body
+        self.cache: OrderedDict[tuple[str, str, bytes], bytes] = OrderedDict()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Handle a request.
+
+        Args:
+            scope (Scope): _description_
+            receive (Receive): _description_
+            send (Send): _description_
+        """
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("Accept-Encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        # a query string makes a variant (page, filters...), it is compressed like any other response
+        static = scope["path"] in self.static_paths and not scope.get("query_string")
+        cache_path = scope["path"] if static else None
+        responder = CompressionResponder(self, CODECS[encoding], cache_path, send)
+        await self.app(scope, receive, responder.send)
+
+    def cached_compress(self, path: str, codec: Codec, body: bytes) -> bytes:
+        """Compress a static response, or reuse the result for the same body.
+
+        Args:
+            path (str): _description_
+            codec (Codec): _description_
+            body (bytes): _description_
+
+        Returns:
+            bytes: _description_
+        """
+        key = (path, codec.name, hashlib.blake2b(body, digest_size=16).digest())
+        compressed = self.cache.get(key)
+        if compressed is None:
+            compressed = codec.compress(body, STATIC_LEVELS[codec.name])
+            self.cache[key] = compressed
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        self.cache.move_to_end(key)
+        return compressed
+
+
+class CompressionResponder:
+    """Compress the response of one request."""
+
+    def __init__(self, middleware: CompressionMiddleware, codec: Codec, cache_path: str | None, send: Send) -> None:
+        self.middleware = middleware
+        self.codec = codec
+        # path of a static response, its compressed body is cached
+        self.cache_path = cache_path
+        self.downstream = send
+        self.start_message: Message | None = None
+        self.streaming: tuple[Callable[[bytes], bytes], Callable[[], bytes]] | None = None
+        self.passthrough = False
+
+    async def send(self, message: Message) -> None:
+        """Wrap `send`, the start message is held until the first body chunk decides on the compression.
+
+        Args:
+            message (Message): _description_
+        """
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.downstream(message)
+            return
+        if self.streaming is not None:
+            compress, flush = self.streaming
+            more_body = message.get("more_body", False)
+            message["body"] = compress(message.get("body", b"")) + (b"" if more_body else flush())
+            await self.downstream(message)
+            return
+        await self.first_body(message)
+
+    async def first_body(self, message: Message) -> None:
+        """Decide how the response is sent from its headers and first body chunk.
+
+        Args:
+            message (Message): _description_
+
+        Raises:
+            RuntimeError: If the app sends a body before starting the response.
+        """
+        if self.start_message is None:
+            raise RuntimeError("http.response.body sent before http.response.start")
+        start_message: dict[str, Any] = self.start_message
+        headers = MutableHeaders(raw=start_message["headers"])
+        body: bytes = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        levels = compression_levels(headers.get("Content-Type", ""))
+
+        if (
+            "Content-Encoding" in headers
+            or levels is None
+            or (len(body) < self.middleware.minimum_size and not more_body)
+        ):
+            self.passthrough = True
+            await self.downstream(start_message)
+            await self.downstream(message)
+            return
+
+        headers.add_vary_header("Accept-Encoding")
+        headers["Content-Encoding"] = self.codec.name
+        if more_body:
+            # streaming response: compress chunk by chunk, the length is unknown
+            del headers["Content-Length"]
+            self.streaming = self.codec.compressor(levels[self.codec.name])
+            message["body"] = self.streaming[0](body)
+        else:
+            if self.cache_path is not None:
+                compressed = self.middleware.cached_compress(self.cache_path, self.codec, body)
+            else:
+                compressed = self.codec.compress(body, levels[self.codec.name])
+            headers["Content-Length"] = str(len(compressed))
+            message["body"] = compressed
+        await self.downstream(start_message)
+        await self.downstream(message)
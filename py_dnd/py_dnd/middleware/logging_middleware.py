@@ -2,54 +2,66 @@
 
 import time
 import uuid
-from typing import Awaitable, Callable
 
 from loguru import logger
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-from starlette.responses import Response
+from starlette.datastructures import URL, Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 
-class LoggingMiddleware(BaseHTTPMiddleware):
+class LoggingMiddleware:
     """Middleware that adds request_id to logging, request, and response.
 
+    Plain ASGI middleware: the request runs in the same task as the middleware (so the logging context reaches it)
+    and responses are streamed through untouched, only the start message gets the `X-Request-ID` header.
+
     Args:
-        BaseHTTPMiddleware (_type_): _description_
+        app (ASGIApp): _description_
     """
 
-    async def dispatch(self, request: Request, call_next: Callable[[Request], Awaitable[Response]]) -> Response:
-        """Middleware dispatch.
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
 
-        Args:
-            request (Request): _description_
-            call_next (Callable[[Request], Awaitable[Response]]): _description_
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Handle a request.
 
-        Returns:
-            Response: _description_
+        Args:
+            scope (Scope): _description_
+            receive (Receive): _description_
+            send (Send): _description_
         """
-        request_id = request.headers.get("X-Request-ID")
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = Headers(scope=scope).get("X-Request-ID")
         if not request_id:
             request_id = str(uuid.uuid4())
+        status_code = 500
+
+        async def send_with_request_id(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                MutableHeaders(scope=message).append("X-Request-ID", request_id)
+            await send(message)
 
         # Add context to all loggers in all views
         with logger.contextualize(request_id=request_id):
             start_time = time.perf_counter()
-            logger.trace("Start handling request: {} {}", request.method, request.url)
-            request.state.request_id = request_id
+            logger.opt(lazy=True).trace(
+                "Start handling request: {} {}", lambda: scope["method"], lambda: URL(scope=scope)
+            )
+            # read by `request.state.request_id`
+            scope.setdefault("state", {})["request_id"] = request_id
 
-            response: Response = await call_next(request)
+            await self.app(scope, receive, send_with_request_id)
 
             process_time = time.perf_counter() - start_time
 
-            logger.trace(
+            logger.opt(lazy=True).trace(
                 "Completed handling request: {} {} Status: {} Elapsed time: {} seconds",
-                request.method,
-                request.url,
-                response.status_code,
-                process_time,
+                lambda: scope["method"],
+                lambda: URL(scope=scope),
+                lambda: status_code,
+                lambda: process_time,
             )
-
-            response.headers.append("X-Request-ID", request_id)
-            # response[] = request_id
-
-            return response
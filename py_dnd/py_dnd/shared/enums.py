@@ -70,3 +70,21 @@ class AbilityScoreEnum(str, Enum):
     INT = "int"
     WIS = "wis"
     CHA = "cha"
+
+
+class CountStrategyEnum(str, Enum):
+    """How the total count of a paginated query is computed."""
+
+    EXACT = "exact"
+    ESTIMATE = "estimate"
+    NONE = "none"
+
+
+class BulkJobStatusEnum(str, Enum):
+    """Bulk load job states."""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
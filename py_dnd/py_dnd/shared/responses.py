@@ -0,0 +1,83 @@
+"""Shared response classes.
+
+FastAPI validates a returned value against the response model and runs it through `jsonable_encoder` before
+rendering it: for a page of spells that is three passes over every (long) description. Routes that already build
+their response schemas return a `PydanticResponse` instead, the schemas are serialized to JSON bytes in one pass by
+pydantic-core and the response model is only used for the OpenAPI docs.
+"""
+
+import functools
+from typing import Any
+
+import orjson
+from pydantic import BaseModel, TypeAdapter
+from starlette.background import BackgroundTask
+from starlette.responses import JSONResponse, Response
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with orjson, default response class of the API."""
+
+    def render(self, content: Any) -> bytes:
+        """Render the content.
+
+        Args:
+            content (Any): Already JSON compatible content (see `jsonable_encoder`).
+
+        Returns:
+            bytes: _description_
+        """
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+@functools.lru_cache(maxsize=128)
+def type_adapter(schema: Any) -> TypeAdapter:
+    """Build (once) the adapter of a type, building its serializer takes milliseconds.
+
+    Args:
+        schema (Any): e.g. list[SpellSchema]
+
+    Returns:
+        TypeAdapter: _description_
+    """
+    return TypeAdapter(schema)
+
+
+class PydanticResponse(Response):
+    """JSON response of pydantic schemas, serialized without being validated again.
+
+    Args:
+        content (Any): A schema, or e.g. a list of schemas along with its `schema`.
+        schema (Any, optional): The type of `content`, defaults to the type of a `BaseModel` content.
+        status_code (int, optional): Defaults to 200.
+        headers (dict[str, str] | None, optional): Defaults to None.
+        background (BackgroundTask | None, optional): Defaults to None.
+    """
+
+    media_type = "application/json"
+
+    def __init__(
+        self,
+        content: Any,
+        schema: Any = None,
+        status_code: int = 200,
+        headers: dict[str, str] | None = None,
+        background: BackgroundTask | None = None,
+    ) -> None:
+        self.schema = schema
+        super().__init__(content, status_code=status_code, headers=headers, background=background)
+
+    def render(self, content: Any) -> bytes:
+        """Serialize the content with the pydantic-core serializer of its schema.
+
+        Args:
+            content (Any): _description_
+
+        Returns:
+            bytes: _description_
+        """
+        if self.schema is None and isinstance(content, BaseModel):
+            return content.__pydantic_serializer__.to_json(content, by_alias=True)
+        return type_adapter(self.schema if self.schema is not None else type(content)).dump_json(
+            content, by_alias=True
+        )
@@ -0,0 +1,145 @@
+"""Benchmark of the response serialization of a page of spells.
+
+Calls the ASGI app directly (no server, no HTTP client) and compares a route returning its schemas to FastAPI
+(response model validation, `jsonable_encoder` then `json.dumps`) with one returning a `PydanticResponse`.
+
+Usage:
+    python -m tests.bench_serialization --spells 1000 --requests 50
+"""
+
+import argparse
+import asyncio
+import datetime
+import time
+
+from fastapi import FastAPI
+from starlette.types import ASGIApp, Message
+
+from py_dnd.features.spells.schemas import SpellSchema
+from py_dnd.shared import enums as shared_enums
+from py_dnd.shared.responses import FastJSONResponse, PydanticResponse
+from py_dnd.shared.schemas import GenericListResponse
+
+DESCRIPTION = (
+    "<p>A bright streak flashes from your pointing finger to a point you choose within range and then blossoms "
+    "with a low roar into an explosion of flame. Each creature in a 20-foot-radius sphere centered on that point "
+    "must make a Dexterity saving throw. A target takes 8d6 fire damage on a failed save, or half as much damage "
+    "on a successful one.</p>"
+) * 4
+
+
+def build_spells(count: int) -> list[SpellSchema]:
+    """Spells with descriptions of a realistic length."""
+    now = datetime.datetime.now(tz=datetime.UTC)
+    return [
+        SpellSchema(
+            id=f"spell-{i}",
+            source_id="player's handbook",
+            name=f"fireball {i}",
+            dnd_version="5e",
+            dnd_version_year=2014,
+            source_page=241,
+            level=shared_enums.SpellLevelEnum.THIRD,
+            school=shared_enums.SpellSchoolEnum.EVOCATION,
+            casting_time="1 action",
+            range="150 feet",
+            has_verbal_component=True,
+            has_somatic_component=True,
+            has_material_component=True,
+            materials="a tiny ball of bat guano and sulfur",
+            duration="instantaneous",
+            description=DESCRIPTION,
+            has_saving_throw=True,
+            damage_type="fire",
+            at_higher_levels="The damage increases by 1d6 for each slot level above 3rd.",
+            difficulty_class_type="dexterity",
+            created_at=now,
+            created_by="bench",
+            updated_at=now,
+            updated_by="bench",
+        )
+        for i in range(count)
+    ]
+
+
+def build_app(spells: list[SpellSchema]) -> ASGIApp:
+    """App serving the same page through FastAPI and through `PydanticResponse`."""
+    app = FastAPI(default_response_class=FastJSONResponse)
+
+    @app.get("/default")
+    async def read_default() -> list[SpellSchema]:
+        return spells
+
+    @app.get("/prebuilt", response_model=list[SpellSchema])
+    async def read_prebuilt() -> PydanticResponse:
+        return PydanticResponse(spells, list[SpellSchema])
+
+    @app.get("/query/default")
+    async def query_default() -> GenericListResponse[SpellSchema]:
+        return GenericListResponse[SpellSchema](entities=spells, limit=len(spells))
+
+    @app.get("/query/prebuilt", response_model=GenericListResponse[SpellSchema])
+    async def query_prebuilt() -> PydanticResponse:
+        return PydanticResponse(GenericListResponse[SpellSchema](entities=spells, limit=len(spells)))
+
+    return app
+
+
+async def call(app: ASGIApp, path: str) -> bytes:
+    """Send one GET through the app and return the body."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"testserver")],
+        "client": ("127.0.0.1", 1234),
+        "server": ("testserver", 80),
+    }
+    body = bytearray()
+
+    async def receive() -> Message:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: Message) -> None:
+        if message["type"] == "http.response.body":
+            body.extend(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return bytes(body)
+
+
+async def bench(app: ASGIApp, path: str, requests: int) -> tuple[float, int]:
+    """Milliseconds per request and response size."""
+    body = await call(app, path)
+    started = time.perf_counter()
+    for _ in range(requests):
+        await call(app, path)
+    return (time.perf_counter() - started) / requests * 1e3, len(body)
+
+
+async def main(spells: int, requests: int) -> None:
+    """Run the benchmark."""
+    app = build_app(build_spells(spells))
+    for kind in ("", "/query"):
+        default_ms, default_size = await bench(app, f"{kind}/default", requests)
+        prebuilt_ms, prebuilt_size = await bench(app, f"{kind}/prebuilt", requests)
+        name = kind.strip("/") or "list"
+        print(f"{name + ' FastAPI':<24} {default_ms:>8.2f} ms/request  {default_size} bytes")
+        print(
+            f"{name + ' PydanticResponse':<24} {prebuilt_ms:>8.2f} ms/request  {prebuilt_size} bytes"
+            + f"  saved {default_ms - prebuilt_ms:.2f} ms/request"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--spells", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.spells, args.requests))
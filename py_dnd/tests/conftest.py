@@ -0,0 +1,53 @@
+"""Shared fixtures: an in-memory SQLite database with the dnd tables."""
+
+from typing import AsyncIterator
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.pool import StaticPool
+
+import py_dnd.database.all_models  # noqa: F401
+from py_dnd.database.base_class import DndSchemaBase
+from py_dnd.shared.enums import DbSchemaEnum
+
+
+@compiles(TSVECTOR, "sqlite")
+def compile_tsvector(type_: TSVECTOR, compiler: object, **kwargs: object) -> str:
+    """SQLite has no tsvector, the generated search document is stored as text."""
+    return "TEXT"
+
+
+@pytest.fixture
+def anyio_backend() -> str:
+    """Run the async tests on asyncio."""
+    return "asyncio"
+
+
+@pytest.fixture
+async def engine() -> AsyncIterator[AsyncEngine]:
+    """An empty database with every table, the dnd schema is the main SQLite schema."""
+    engine = create_async_engine(
+        "sqlite+aiosqlite://",
+        poolclass=StaticPool,
+        execution_options={"schema_translate_map": {DbSchemaEnum.DND.value: None}},
+    )
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def add_search_functions(dbapi_connection: object, _: object) -> None:
+        # the text search functions of `Spell.search_vector`, the document is the raw text
+        dbapi_connection.create_function("to_tsvector", 2, lambda config, text: text, deterministic=True)
+        dbapi_connection.create_function("setweight", 2, lambda vector, weight: vector, deterministic=True)
+
+    async with engine.begin() as connection:
+        await connection.run_sync(DndSchemaBase.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+def session_maker(engine: AsyncEngine) -> async_sessionmaker:
+    """Sessions of the test database."""
+    return async_sessionmaker(engine, expire_on_commit=False)
@@ -0,0 +1,55 @@
+"""Builders of test entities."""
+
+import datetime
+from typing import Any
+
+from py_dnd.features.sources.schemas import SourceCreate
+from py_dnd.features.spells.schemas import SpellCreate
+from py_dnd.shared.enums import SpellLevelEnum, SpellSchoolEnum
+
+NOW = datetime.datetime(2024, 1, 1, tzinfo=datetime.UTC)
+BOOKKEEPING = {"created_at": NOW, "created_by": "test", "updated_at": NOW, "updated_by": "test"}
+
+
+def make_source(source_id: str, **fields: Any) -> SourceCreate:
+    """A source, `fields` override the defaults."""
+    return SourceCreate(
+        **{
+            "id": source_id,
+            "name": f"Source {source_id}",
+            "name_short": source_id.upper(),
+            "dnd_version": "5e",
+            "dnd_version_year": 2014,
+            **BOOKKEEPING,
+            **fields,
+        }
+    )
+
+
+def make_spell(spell_id: str, name: str, source_id: str = "phb", **fields: Any) -> SpellCreate:
+    """A spell, `fields` override the defaults."""
+    return SpellCreate(
+        **{
+            "id": spell_id,
+            "source_id": source_id,
+            "name": name,
+            "dnd_version": "5e",
+            "dnd_version_year": 2014,
+            "level": SpellLevelEnum.THIRD,
+            "school": SpellSchoolEnum.EVOCATION,
+            "is_ritual": False,
+            "casting_time": "1 action",
+            "range": "150 feet",
+            "has_verbal_component": True,
+            "has_somatic_component": True,
+            "has_material_component": False,
+            "has_spell_cost": False,
+            "are_materials_consumed": False,
+            "duration": "instantaneous",
+            "is_concentration": False,
+            "description": f"The {name} spell.",
+            "has_saving_throw": False,
+            **BOOKKEEPING,
+            **fields,
+        }
+    )
@@ -0,0 +1,207 @@
+"""Bulk jobs finish as succeeded only when the whole file was loaded, cancelled ones keep their last checkpoint."""
+
+import asyncio
+import io
+import uuid
+from typing import Callable
+
+import pytest
+from fastapi import UploadFile
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from starlette.datastructures import Headers
+
+from py_dnd.database.session import master_sessionmanager
+from py_dnd.features.bulk_jobs.schemas import BulkJobSchema
+from py_dnd.features.bulk_jobs.service import BulkJobManager
+from py_dnd.features.core.ingest import BatchHandler, BulkLoadCheckpoint, UploadRow
+from py_dnd.features.core.unit_of_work import SqlAlchemyUnitOfWork
+from py_dnd.shared.enums import BulkJobStatusEnum
+from py_dnd.shared.schemas import BulkLoadResponse
+
+pytestmark = pytest.mark.anyio
+
+CSV = "name\n" + "".join(f"Spell {i}\n" for i in range(10))
+
+
+def upload() -> UploadFile:
+    """A CSV upload of 10 rows."""
+    return UploadFile(
+        file=io.BytesIO(CSV.encode()), filename="spells.csv", headers=Headers({"content-type": "text/csv"})
+    )
+
+
+@pytest.fixture
+async def manager(session_maker: async_sessionmaker, monkeypatch: pytest.MonkeyPatch) -> BulkJobManager:
+    """A bulk job manager with one worker on the test database."""
+    monkeypatch.setattr(master_sessionmanager, "session_maker", session_maker)
+    manager = BulkJobManager()
+    manager.start(workers=1, max_queued=5)
+    return manager
+
+
+def stalling_handler(stalled: asyncio.Event) -> Callable[[BulkLoadResponse], BatchHandler]:
+    """Report the first batch, then wait forever on the second one."""
+
+    def make_batch_handler(response: BulkLoadResponse) -> BatchHandler:
+        async def handle_batch(uow: SqlAlchemyUnitOfWork, batch: list[UploadRow]) -> None:
+            response.created.extend(row.fields["name"] for row in batch)
+            if batch[0].index:
+                stalled.set()
+                await asyncio.Event().wait()
+
+        return handle_batch
+
+    return make_batch_handler
+
+
+async def test_running_job_is_cancelled_with_its_checkpoint(manager: BulkJobManager) -> None:
+    """The committed batches stay reported and the checkpoint of the last commit is on the job."""
+    stalled = asyncio.Event()
+    job = await manager.submit(
+        upload(), kind="spell", created_by="test", make_batch_handler=stalling_handler(stalled), batch_size=4
+    )
+    await asyncio.wait_for(stalled.wait(), 5)
+    await manager.close()
+
+    assert job.status == BulkJobStatusEnum.CANCELLED
+    assert job.finished_at is not None
+    assert job.error == "Cancelled, retry the upload with the checkpoint of the result to resume it"
+    assert job.result is not None
+    assert job.result.created == ["Spell 0", "Spell 1", "Spell 2", "Spell 3"]
+    assert BulkLoadCheckpoint.decode(job.result.checkpoint).rows == 4
+    assert job.result.warnings == ["Rows from 4 were rolled back."]
+
+
+async def test_queued_jobs_are_cancelled_and_closed(manager: BulkJobManager) -> None:
+    """Jobs still waiting for a worker are cancelled and their spooled uploads closed."""
+    stalled = asyncio.Event()
+    running = await manager.submit(
+        upload(), kind="spell", created_by="test", make_batch_handler=stalling_handler(stalled), batch_size=4
+    )
+    await asyncio.wait_for(stalled.wait(), 5)
+    queued = [
+        await manager.submit(
+            upload(), kind="spell", created_by="test", make_batch_handler=stalling_handler(stalled), batch_size=4
+        )
+        for _ in range(2)
+    ]
+    spooled = [item.upload for item in list(manager.queue._queue)]
+    await manager.close()
+
+    assert running.status == BulkJobStatusEnum.CANCELLED
+    for job in queued:
+        assert job.status == BulkJobStatusEnum.CANCELLED
+        assert job.error == "Cancelled before it started"
+        assert job.started_at is None and job.finished_at is not None
+    assert all(spooled_upload.file.closed for spooled_upload in spooled)
+    assert manager.queue is None
+
+
+def failing_handler(response: BulkLoadResponse) -> BatchHandler:
+    """Report the first batch, fail to write the second one."""
+
+    async def handle_batch(uow: SqlAlchemyUnitOfWork, batch: list[UploadRow]) -> None:
+        response.created.extend(row.fields["name"] for row in batch)
+        if batch[0].index:
+            raise RuntimeError("connection lost")
+
+    return handle_batch
+
+
+def row_error_handler(response: BulkLoadResponse) -> BatchHandler:
+    """Report the last row of every batch as invalid."""
+
+    async def handle_batch(uow: SqlAlchemyUnitOfWork, batch: list[UploadRow]) -> None:
+        response.created.extend(row.fields["name"] for row in batch[:-1])
+        response.errors.append(f"row {batch[-1].index}: invalid")
+
+    return handle_batch
+
+
+async def wait_finished(job: BulkJobSchema) -> None:
+    """Wait for a job to leave the queue and the workers."""
+    while job.finished_at is None:
+        await asyncio.sleep(0.01)
+
+
+async def test_load_stopped_on_an_error_fails(manager: BulkJobManager) -> None:
+    """A load that stopped halfway is not a success, the job keeps the checkpoint of its last commit."""
+    job = await manager.submit(
+        upload(), kind="spell", created_by="test", make_batch_handler=failing_handler, batch_size=4
+    )
+    await asyncio.wait_for(wait_finished(job), 5)
+    await manager.close()
+
+    assert job.status == BulkJobStatusEnum.FAILED
+    assert job.error == "Stopped on an error, retry the upload with the checkpoint of the result to resume it"
+    assert job.result is not None and job.result.stopped
+    assert job.result.created == ["Spell 0", "Spell 1", "Spell 2", "Spell 3"]
+    assert job.result.errors == ["rows from 4: connection lost"]
+    assert job.result.warnings == ["Rows from 4 were rolled back."]
+    assert BulkLoadCheckpoint.decode(job.result.checkpoint).rows == 4
+
+
+@pytest.mark.parametrize(
+    "all_or_nothing, status, error",
+    [
+        (False, BulkJobStatusEnum.SUCCEEDED, None),
+        (True, BulkJobStatusEnum.FAILED, "Rows have errors, nothing was committed"),
+    ],
+)
+async def test_row_errors(
+    manager: BulkJobManager, all_or_nothing: bool, status: BulkJobStatusEnum, error: str | None
+) -> None:
+    """Invalid rows are skipped, unless the load is all or nothing: nothing is committed and the job fails."""
+    job = await manager.submit(
+        upload(),
+        kind="spell",
+        created_by="test",
+        make_batch_handler=row_error_handler,
+        batch_size=4,
+        all_or_nothing=all_or_nothing,
+    )
+    await asyncio.wait_for(wait_finished(job), 5)
+    await manager.close()
+
+    assert (job.status, job.error) == (status, error)
+    assert job.result is not None and not job.result.stopped
+    assert len(job.result.errors) == 3
+
+
+async def test_job_is_read_from_the_database(manager: BulkJobManager) -> None:
+    """Jobs are polled from the database, any process of the API reports the same state."""
+    job = await manager.submit(
+        upload(), kind="spell", created_by="test", make_batch_handler=row_error_handler, batch_size=4
+    )
+    await asyncio.wait_for(manager.queue.join(), 5)
+    await manager.close()
+
+    saved = await BulkJobManager().get(job.id)
+    assert saved is not None
+    assert (saved.status, saved.error, saved.created_by, saved.filename) == (
+        BulkJobStatusEnum.SUCCEEDED,
+        None,
+        "test",
+        "spells.csv",
+    )
+    assert (saved.rows_processed, saved.bytes_processed) == (10, job.bytes_total)
+    assert saved.result == job.result
+    assert await BulkJobManager().get(uuid.uuid4()) is None
+
+
+async def test_finished_jobs_beyond_the_history_are_deleted(manager: BulkJobManager) -> None:
+    """Only the last `history` finished jobs are kept, the queued and running ones are never deleted."""
+    manager.history = 1
+    jobs = []
+    for _ in range(3):
+        jobs.append(
+            await manager.submit(
+                upload(), kind="spell", created_by="test", make_batch_handler=row_error_handler, batch_size=4
+            )
+        )
+        await asyncio.wait_for(manager.queue.join(), 5)
+    await manager.close()
+
+    assert [await manager.get(job.id) is not None for job in jobs] == [False, True, True]
+    await manager.prune()
+    assert [await manager.get(job.id) is not None for job in jobs] == [False, False, True]
@@ -0,0 +1,65 @@
+"""Importing the app must stay cheap: no Keycloak client, no network and a bounded import time."""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+# generous enough for slow CI machines, the app imports in well under 2s on a laptop
+IMPORT_TIME_BUDGET_SECONDS = 5.0
+
+PROBE = """
+import socket
+import sys
+import time
+
+
+def no_network(*args, **kwargs):
+    raise AssertionError("network access while importing the app")
+
+
+socket.socket.connect = no_network
+socket.create_connection = no_network
+
+started = time.perf_counter()
+import py_dnd.main  # noqa: E402
+
+print("elapsed", time.perf_counter() - started)
+print("keycloak", *sorted(name for name in sys.modules if name == "keycloak" or name.startswith("keycloak.")))
+"""
+
+
+def import_app() -> tuple[float, list[str]]:
+    """Import the app in a fresh interpreter, with Keycloak unreachable."""
+    env = {
+        **os.environ,
+        "KEYCLOAK_SERVER_URL": "http://127.0.0.1:9/",
+        "KEYCLOAK_REALM_NAME": "test",
+        "KEYCLOAK_CLIENT_ID": "test",
+        "KEYCLOAK_ADMIN_USERNAME": "test",
+        "KEYCLOAK_ADMIN_PASSWORD": "test",
+    }
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=Path(__file__).parent.parent,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=60,
+        check=False,
+    )
+    assert result.returncode == 0, result.stderr
+    report = {line.split()[0]: line.split()[1:] for line in result.stdout.splitlines() if line.strip()}
+    return float(report["elapsed"][0]), report["keycloak"]
+
+
+def test_import_does_not_build_keycloak_clients() -> None:
+    """The Keycloak clients are built by the app lifespan, not at import."""
+    _, keycloak_modules = import_app()
+    assert keycloak_modules == []
+
+
+def test_import_time_budget() -> None:
+    """Importing the app stays within its time budget."""
+    elapsed, _ = import_app()
+    assert elapsed < IMPORT_TIME_BUDGET_SECONDS
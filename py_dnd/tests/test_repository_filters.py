@@ -0,0 +1,126 @@
+"""Query string filters of `RepositoryBase`, compiled to the SQL of Postgres."""
+
+from typing import Any
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+import py_dnd.database.all_models  # noqa: F401
+from py_dnd.features.spells.repository import SpellRepository
+from py_dnd.shared.enums import SpellLevelEnum, SpellSchoolEnum
+
+
+@pytest.fixture
+def repository() -> SpellRepository:
+    """Filters are built without a session."""
+    return SpellRepository(None)
+
+
+def compile_filters(repository: SpellRepository, key: str, value: Any, exact: bool = False) -> list[tuple[str, dict]]:
+    """The SQL and the parameters of the filters of one query string param."""
+    compiled = [
+        predicate.compile(dialect=postgresql.dialect())
+        for predicate in repository._get_filter_list(key=key, value=value, exact=exact)
+    ]
+    return [(str(predicate), predicate.params) for predicate in compiled]
+
+
+@pytest.mark.parametrize(
+    "value, pattern",
+    [
+        ("fire", "%fire%"),
+        ("Fire Bolt", "%Fire Bolt%"),
+        # a trailing `*` is a prefix match
+        ("fire*", "fire%"),
+        ("fire**", "fire%"),
+        ("fi*re", "%fi*re%"),
+        # LIKE wildcards and the escape character are matched literally
+        ("50%", "%50\\%%"),
+        ("snake_case", "%snake\\_case%"),
+        ("back\\slash*", "back\\\\slash%"),
+    ],
+)
+def test_text_filter_is_ilike(repository: SpellRepository, value: str, pattern: str) -> None:
+    """One text value is a single `ILIKE`, a substring match unless it ends with `*`."""
+    assert compile_filters(repository, "name", value) == [("dnd.spell.name ILIKE %(name_1)s", {"name_1": pattern})]
+
+
+@pytest.mark.parametrize("value", ["fire, shield*,", ["fire", "shield*"]])
+def test_text_filter_values_are_ilike_any(repository: SpellRepository, value: str | list[str]) -> None:
+    """Several text values are one `ILIKE ANY(array)`, not a chain of `OR`s."""
+    assert compile_filters(repository, "name", value) == [
+        ("dnd.spell.name ILIKE ANY (%(name_patterns_1)s::VARCHAR[])", {"name_patterns_1": ["%fire%", "shield%"]})
+    ]
+
+
+def test_exact_text_filter(repository: SpellRepository) -> None:
+    """Exact text values are compared with `=`, `*` is not a wildcard."""
+    assert compile_filters(repository, "name", "fire*", exact=True) == [
+        ("dnd.spell.name = %(name_1)s", {"name_1": "fire*"})
+    ]
+    assert compile_filters(repository, "name", "fire,shield", exact=True) == [
+        ("dnd.spell.name = ANY (%(name_values_1)s::VARCHAR[])", {"name_values_1": ["fire", "shield"]})
+    ]
+
+
+@pytest.mark.parametrize(
+    "key, value, expected",
+    [
+        ("level", "3", ("dnd.spell.level = %(level_1)s", {"level_1": SpellLevelEnum.THIRD})),
+        ("level", "cantrip", ("dnd.spell.level = %(level_1)s", {"level_1": SpellLevelEnum.CANTRIP})),
+        ("level", SpellLevelEnum.NINTH, ("dnd.spell.level = %(level_1)s", {"level_1": SpellLevelEnum.NINTH})),
+        (
+            "level",
+            "0,first,9",
+            (
+                "dnd.spell.level IN (__[POSTCOMPILE_level_1])",
+                {"level_1": [SpellLevelEnum.CANTRIP, SpellLevelEnum.FIRST, SpellLevelEnum.NINTH]},
+            ),
+        ),
+        ("school", "ILLUSION", ("dnd.spell.school = %(school_1)s", {"school_1": SpellSchoolEnum.ILLUSION})),
+        ("school", "Evocation", ("dnd.spell.school = %(school_1)s", {"school_1": SpellSchoolEnum.EVOCATION})),
+        ("is_ritual", True, ("dnd.spell.is_ritual = true", {})),
+        ("is_ritual", "FALSE", ("dnd.spell.is_ritual = false", {})),
+        # `False` is a filter, not a missing value
+        ("is_ritual", False, ("dnd.spell.is_ritual = false", {})),
+    ],
+)
+def test_typed_filters_are_coerced(repository: SpellRepository, key: str, value: Any, expected: tuple) -> None:
+    """Enum values (or names, in any case) and booleans are compared with `=` / `IN` to typed values."""
+    assert compile_filters(repository, key, value) == [expected]
+
+
+@pytest.mark.parametrize(
+    "key, value", [("level", "10"), ("level", "tenth"), ("school", "necro"), ("is_ritual", "yes")]
+)
+def test_invalid_filter_is_400(repository: SpellRepository, key: str, value: str) -> None:
+    """A value that does not fit the column type is a bad request, not a server error."""
+    with pytest.raises(HTTPException) as exc_info:
+        repository._get_filter_list(key=key, value=value)
+    assert exc_info.value.status_code == 400
+    assert exc_info.value.detail == f"Invalid {key}"
+
+
+@pytest.mark.parametrize("value", [None, "", [], ","])
+def test_empty_filter_is_ignored(repository: SpellRepository, value: Any) -> None:
+    """Missing values filter nothing."""
+    assert repository._get_filter_list(key="name", value=value) == []
+
+
+def test_apply_param_filters_to_query(repository: SpellRepository) -> None:
+    """The filters of every param are combined with `AND`."""
+    query = repository.apply_param_filters_to_query(
+        select(repository.model.id), {"name": "fire*,bolt", "level": "1,2", "is_ritual": False}
+    )
+    compiled = query.compile(dialect=postgresql.dialect())
+    assert str(compiled).split("WHERE ")[1] == (
+        "dnd.spell.name ILIKE ANY (%(name_patterns_1)s::VARCHAR[])"
+        " AND dnd.spell.level IN (__[POSTCOMPILE_level_1])"
+        " AND dnd.spell.is_ritual = false"
+    )
+    assert compiled.params == {
+        "name_patterns_1": ["fire%", "%bolt%"],
+        "level_1": [SpellLevelEnum.FIRST, SpellLevelEnum.SECOND],
+    }
@@ -0,0 +1,68 @@
+"""Keyset pagination of `RepositoryBase.query`: default count strategy and sort columns."""
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from tests.factories import make_source, make_spell
+
+from py_dnd.features.core.repository import RepositoryBase
+from py_dnd.features.sources.models import Source
+from py_dnd.features.spells.models import Spell
+from py_dnd.features.spells.repository import SpellRepository
+from py_dnd.shared.enums import CountStrategyEnum
+
+pytestmark = pytest.mark.anyio
+
+ESTIMATE = 1000
+
+
+@pytest.fixture
+async def spells(session_maker: async_sessionmaker, monkeypatch: pytest.MonkeyPatch) -> None:
+    """25 spells, the planner estimates 1000 rows."""
+    async with session_maker() as session:
+        session.add(Source(**make_source("phb").model_dump()))
+        session.add_all(Spell(**make_spell(f"spell-{i:02}", f"Spell {i % 7} {i}").model_dump()) for i in range(25))
+        await session.commit()
+
+    async def estimate_count(self: RepositoryBase, query: object, filtered: bool = True) -> int:
+        return ESTIMATE
+
+    monkeypatch.setattr(RepositoryBase, "estimate_count", estimate_count)
+
+
+async def test_cursor_pages_estimate_the_count(session_maker: async_sessionmaker, spells: None) -> None:
+    """The first page counts exactly, the pages after a cursor are estimated unless asked otherwise."""
+    async with session_maker() as session:
+        repository = SpellRepository(session)
+        first = await RepositoryBase.query(repository, {}, limit=10)
+        assert (first.count_strategy, first.total_count) == (CountStrategyEnum.EXACT, 25)
+
+        second = await RepositoryBase.query(repository, {}, limit=10, cursor=first.next_cursor)
+        assert (second.count_strategy, second.total_count) == (CountStrategyEnum.ESTIMATE, ESTIMATE)
+
+        exact = await RepositoryBase.query(
+            repository, {}, limit=10, cursor=first.next_cursor, count_strategy=CountStrategyEnum.EXACT
+        )
+        assert (exact.count_strategy, exact.total_count) == (CountStrategyEnum.EXACT, 25)
+        assert exact.entities == second.entities
+
+
+async def test_pages_sorted_on_a_column(session_maker: async_sessionmaker, spells: None) -> None:
+    """Following the cursors of pages sorted on a non null column returns every row once, in order."""
+    async with session_maker() as session:
+        repository = SpellRepository(session)
+        names: list[str] = []
+        cursor = None
+        while True:
+            page = await RepositoryBase.query(repository, {}, order_by=Spell.name, limit=4, cursor=cursor)
+            names.extend(spell.name for spell in page.entities)
+            cursor = page.next_cursor
+            if not cursor:
+                break
+    assert names == sorted(f"Spell {i % 7} {i}" for i in range(25))
+
+
+async def test_nullable_sort_column_is_rejected(session_maker: async_sessionmaker, spells: None) -> None:
+    """NULLs are never after a cursor, pages can't be sorted on a nullable column."""
+    async with session_maker() as session:
+        with pytest.raises(ValueError, match="nullable column source_page"):
+            await RepositoryBase.query(SpellRepository(session), {}, order_by=Spell.source_page, limit=10)
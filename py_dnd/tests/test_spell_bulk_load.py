@@ -0,0 +1,101 @@
+"""Bulk spell loads detect existing and duplicated spells on their unique key, (source_id, name)."""
+
+from typing import Any
+from unittest.mock import MagicMock
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from tests.factories import make_source, make_spell
+
+from py_dnd.features.core.unit_of_work import sqlalchemy_uow
+from py_dnd.features.sources.models import Source
+from py_dnd.features.spells.models import Spell
+from py_dnd.features.spells.repository import SpellRepository
+from py_dnd.features.spells.router import SPELL_KEY, upsert_and_mutate_report
+from py_dnd.shared.schemas import BulkLoadResponse
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def fireball(session_maker: async_sessionmaker) -> None:
+    """Two sources, Fireball already exists in the first one."""
+    async with session_maker() as session:
+        session.add_all(Source(**make_source(source_id).model_dump()) for source_id in ("phb", "xge"))
+        session.add(Spell(**make_spell("fireball-phb", "Fireball", "phb").model_dump()))
+        await session.commit()
+
+
+async def test_same_name_in_another_source_is_created(session_maker: async_sessionmaker, fireball: None) -> None:
+    """Only the spells whose source and name both exist are skipped."""
+    spells = [
+        make_spell("fireball-phb-2", "Fireball", "phb"),
+        make_spell("fireball-xge", "Fireball", "xge"),
+        make_spell("shield-xge", "Shield", "xge"),
+    ]
+    response = BulkLoadResponse(filename="spells.csv")
+    async with session_maker() as session:
+        async with sqlalchemy_uow(session, None) as uow:
+            await upsert_and_mutate_report(uow, response, list(enumerate(spells)))
+            await uow.commit()
+
+    assert sorted(response.created) == ["Fireball", "Shield"]
+    assert response.warnings == ["Spell with name 'Fireball' of source 'phb' already exists, skipping."]
+    async with session_maker() as session:
+        rows = (await session.execute(select(Spell.source_id, Spell.name, Spell.id).order_by(Spell.id))).all()
+    assert [tuple(row) for row in rows] == [
+        ("phb", "Fireball", "fireball-phb"),
+        ("xge", "Fireball", "fireball-xge"),
+        ("xge", "Shield", "shield-xge"),
+    ]
+
+
+async def test_duplicates_in_the_file_are_keyed_by_source(session_maker: async_sessionmaker, fireball: None) -> None:
+    """A name repeated in the file is only a duplicate within the same source, the first row wins."""
+    spells = [
+        make_spell("shield-phb", "Shield", "phb"),
+        make_spell("shield-xge", "Shield", "xge"),
+        make_spell("shield-phb-2", "Shield", "phb"),
+    ]
+    response = BulkLoadResponse(filename="spells.csv")
+    async with session_maker() as session:
+        async with sqlalchemy_uow(session, None) as uow:
+            await upsert_and_mutate_report(uow, response, list(enumerate(spells)))
+            await uow.commit()
+
+    assert response.created == ["Shield", "Shield"]
+    assert response.warnings == ["Spell with name 'Shield' of source 'phb' is duplicated in the file, skipping."]
+    async with session_maker() as session:
+        ids = (await session.scalars(select(Spell.id).where(Spell.name == "Shield").order_by(Spell.id))).all()
+    assert ids == ["shield-phb", "shield-xge"]
+
+
+class RecordingSession:
+    """Records the executed statements instead of running them, no row comes back."""
+
+    def __init__(self) -> None:
+        self.statements: list[Any] = []
+
+    async def execute(self, statement: Any) -> MagicMock:
+        self.statements.append(statement)
+        result = MagicMock()
+        result.mappings.return_value.all.return_value = []
+        return result
+
+
+async def test_upsert_compares_json_as_jsonb() -> None:
+    """Postgres has no equality operator for `json`, changed `stat_blocks` are detected as `jsonb`."""
+    session = RecordingSession()
+    spell = make_spell("fireball-phb", "Fireball", stat_blocks=[{"name": "Fire Elemental", "hit_points": 102}])
+    result = await SpellRepository(session).upsert_many([spell], conflict_cols=SPELL_KEY)
+
+    assert result.skipped == [("phb", "Fireball")]
+    (statement,) = session.statements
+    compiled = statement.compile(dialect=postgresql.dialect())
+    where = str(compiled).split("ON CONFLICT")[1]
+    assert "CAST(dnd.spell.stat_blocks AS JSONB) IS DISTINCT FROM CAST(excluded.stat_blocks AS JSONB)" in where
+    assert "dnd.spell.description IS DISTINCT FROM excluded.description" in where
+    assert "dnd.spell.stat_blocks IS DISTINCT FROM" not in where
+    assert [{"name": "Fire Elemental", "hit_points": 102}] in compiled.params.values()
@@ -0,0 +1,130 @@
+"""The spell catalog answers like the database: same pages, counts and cursors, in the order of the database.
+
+The spell ids are declared `COLLATE NOCASE` so that the database orders them differently from python, like the
+en_US.utf8 collation of Postgres does: "_gamma-1" < "alpha-1" < "Beta-1" for the database, "Beta-1" < "_gamma-1" <
+"alpha-1" for `sorted`.
+"""
+
+from typing import Any, AsyncIterator
+
+import pytest
+from sqlalchemy import String
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from tests.factories import make_source, make_spell
+
+from py_dnd.database.session import replica_sessionmanager
+from py_dnd.features.core.repository import RepositoryBase
+from py_dnd.features.sources.models import Source
+from py_dnd.features.spells.catalog import spell_catalog
+from py_dnd.features.spells.models import Spell
+from py_dnd.features.spells.repository import SpellRepository
+from py_dnd.shared.enums import CountStrategyEnum, SpellLevelEnum, SpellSchoolEnum
+
+pytestmark = pytest.mark.anyio
+
+ID_PREFIXES = ["alpha", "Beta", "_gamma", "delta", "Epsilon", "zeta.", "Eta-", "theta"]
+NAMES = ["Fire Bolt", "Fireball", "Shield", "Cure Wounds", "Magic Missile", "Acid Arrow", "Wish"]
+LEVELS = list(SpellLevelEnum)
+SCHOOLS = list(SpellSchoolEnum)
+FILTERS: list[dict[str, Any]] = [
+    {},
+    {"name": "fire"},
+    {"name": "FIRE BALL"},
+    {"name": "fire*"},
+    {"level": "3"},
+    {"level": "0,cantrip,9"},
+    {"school": "evocation,ILLUSION"},
+    {"is_ritual": False},
+    {"is_ritual": True, "is_concentration": True},
+    {"name": "ac", "level": "1,2,3", "school": "evocation"},
+    {"name": "nothing matches"},
+]
+PAGES: list[dict[str, Any]] = [
+    {"limit": 10},
+    {"limit": 7, "offset": 13},
+    {"limit": None, "offset": None},
+    {"limit": 25, "count_strategy": CountStrategyEnum.NONE},
+    {"limit": 5, "fields": frozenset({"name"})},
+]
+
+
+@pytest.fixture(autouse=True)
+def nocase_spell_ids(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Order the spell ids with a collation that is not the code point order."""
+    monkeypatch.setattr(Spell.__table__.c.id, "type", String(collation="NOCASE"))
+
+
+@pytest.fixture
+async def catalog(session_maker: async_sessionmaker, monkeypatch: pytest.MonkeyPatch) -> AsyncIterator[None]:
+    """Load 120 spells in the database and in the catalog."""
+    async with session_maker() as session:
+        session.add_all(Source(**make_source(source_id).model_dump()) for source_id in ("phb", "xge"))
+        for i in range(120):
+            spell = make_spell(
+                f"{ID_PREFIXES[i % len(ID_PREFIXES)]}-{i}",
+                f"{NAMES[i % len(NAMES)]} {i}",
+                source_id="phb" if i % 3 else "xge",
+                level=LEVELS[i % len(LEVELS)],
+                school=SCHOOLS[i % len(SCHOOLS)],
+                is_ritual=i % 4 == 0,
+                is_concentration=i % 5 < 2,
+            )
+            session.add(Spell(**spell.model_dump()))
+        await session.commit()
+    monkeypatch.setattr(replica_sessionmanager, "session_maker", session_maker)
+    assert await spell_catalog.refresh()
+    yield
+    await spell_catalog.close()
+
+
+async def test_catalog_is_in_database_order(session_maker: async_sessionmaker, catalog: None) -> None:
+    """The catalog keeps the order of the database, which is not the order of python."""
+    async with session_maker() as session:
+        database_ids = [spell.id for spell in await RepositoryBase.read_multi(SpellRepository(session), limit=None)]
+    assert spell_catalog.ids == database_ids
+    assert spell_catalog.ids != sorted(database_ids)
+
+
+@pytest.mark.parametrize("page", PAGES)
+@pytest.mark.parametrize("filters", FILTERS)
+async def test_query_parity(
+    session_maker: async_sessionmaker, catalog: None, filters: dict[str, Any], page: dict[str, Any]
+) -> None:
+    """Pages, counts and cursors of the catalog are those of the database, cursors are exchanged between both."""
+    async with session_maker() as session:
+        repository = SpellRepository(session)
+        from_catalog = spell_catalog.query(repository, dict(filters), **page)
+        from_database = await RepositoryBase.query(repository, dict(filters), **page)
+        assert from_catalog is not None
+        assert from_catalog == from_database
+
+        # follow the cursors to the last page, alternating between the catalog and the database
+        cursor = from_database.next_cursor
+        pages = 0
+        while cursor:
+            next_page = {**page, "offset": None, "cursor": cursor}
+            from_catalog = spell_catalog.query(repository, dict(filters), **next_page)
+            from_database = await RepositoryBase.query(repository, dict(filters), **next_page)
+            assert from_catalog == from_database
+            cursor = (from_catalog if pages % 2 else from_database).next_cursor
+            pages += 1
+
+
+@pytest.mark.parametrize("page", [{"limit": 10}, {"limit": 9, "offset": 17}])
+async def test_read_multi_parity(session_maker: async_sessionmaker, catalog: None, page: dict[str, Any]) -> None:
+    """The unfiltered list is paginated like the database."""
+    async with session_maker() as session:
+        repository = SpellRepository(session)
+        assert await repository.read_multi(**page) == await RepositoryBase.read_multi(repository, **page)
+
+
+async def test_unknown_cursor_falls_back_to_the_database(session_maker: async_sessionmaker, catalog: None) -> None:
+    """A cursor on a spell the catalog does not have (deleted, not loaded yet) is answered by the database."""
+    async with session_maker() as session:
+        repository = SpellRepository(session)
+        cursor = repository.encode_cursor(make_spell("Beta-0.5", "Deleted"))
+        assert spell_catalog.query(repository, {}, limit=10, cursor=cursor) is None
+        result = await repository.query({}, limit=10, cursor=cursor)
+    assert [spell.id for spell in result.entities] == spell_catalog.ids[
+        spell_catalog.positions["Beta-1"] : spell_catalog.positions["Beta-1"] + 10
+    ]
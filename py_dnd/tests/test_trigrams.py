@@ -0,0 +1,69 @@
+"""Trigrams and similarities of `TrigramIndex`, compared to the values of `pg_trgm` in Postgres."""
+
+import pytest
+
+from py_dnd.features.core.trigrams import TrigramIndex, similarity, trigrams
+
+NAMES = ["Fireball", "Fire Bolt", "Delayed Blast Fireball", "Shield", "Shield of Faith", "Melf's Minute Meteors"]
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        # examples of the pg_trgm documentation
+        ("cat", {"  c", " ca", "cat", "at "}),
+        ("foo|bar", {"  f", " fo", "foo", "oo ", "  b", " ba", "bar", "ar "}),
+        # SELECT show_trgm('Fire_Bolt!');
+        ("Fire_Bolt!", {"  f", " fi", "fir", "ire", "re ", "  b", " bo", "bol", "olt", "lt "}),
+        ("", set()),
+        ("' - !", set()),
+    ],
+)
+def test_trigrams(text: str, expected: set[str]) -> None:
+    """Words of letters and digits, lowercased and padded like `show_trgm()`."""
+    assert trigrams(text) == expected
+
+
+@pytest.mark.parametrize(
+    "text, other, expected",
+    [
+        # SELECT similarity(text, other);
+        ("word", "two words", 0.36363637),
+        ("firebal", "fireball", 0.7),
+        ("melfs minute meteor", "melf's minute meteors", 0.6363636),
+        ("toll the dad", "toll the dead", 0.6666667),
+        ("wall of stone", "wall of sand", 0.5),
+        ("Fire Bolt", "fire-bolt", 1.0),
+        ("fireball", "shield", 0.0),
+        ("", "fireball", 0.0),
+    ],
+)
+def test_similarity(text: str, other: str, expected: float) -> None:
+    """Shared trigrams over the distinct trigrams of both texts, like `similarity()`."""
+    assert similarity(text, other) == pytest.approx(expected, abs=1e-6)
+    assert similarity(other, text) == similarity(text, other)
+
+
+def test_search() -> None:
+    """Results are the positions at least `threshold` similar, the most similar then the first position first."""
+    index = TrigramIndex(NAMES)
+    assert index.search("firebal") == [(0, pytest.approx(0.7))]
+    assert index.search("firebal", threshold=0.2) == [
+        (0, pytest.approx(0.7)),
+        (2, pytest.approx(7 / 24)),
+        (1, pytest.approx(4 / 14)),
+    ]
+    assert index.search("shield") == [(3, 1.0), (4, 0.4375)]
+    assert index.search("shield", limit=1) == [(3, 1.0)]
+    assert index.search("shield", threshold=0.6) == [(3, 1.0)]
+    assert index.search("melfs minute meteor") == [(5, pytest.approx(0.6363636))]
+    assert index.search("!") == []
+    assert index.search("wish") == []
+
+
+def test_search_mask() -> None:
+    """Only the positions in the mask match, ties are ordered by position."""
+    index = TrigramIndex(NAMES + NAMES)
+    assert index.search("shield", limit=3) == [(3, 1.0), (9, 1.0), (4, 0.4375)]
+    mask = sum(1 << position for position in range(len(NAMES), 2 * len(NAMES)))
+    assert index.search("shield", mask=mask) == [(9, 1.0), (10, 0.4375)]
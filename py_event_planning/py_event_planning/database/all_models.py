@@ -1,5 +1,6 @@
 """All the DB models in one place."""
 
+from py_event_planning.features.bulk_jobs.models import BulkJob  # noqa: W0611
 from py_event_planning.features.game_session.models import GameSession  # noqa: W0611
 from py_event_planning.features.game_system.models import GameSystem  # noqa: W0611
 from py_event_planning.features.jt_user_game_session.models import (  # noqa: W0611
@@ -0,0 +1,185 @@
+"""Keycloak signing keys (JWKS) kept in memory.
+
+The keys are loaded at startup, indexed by key id (`kid`) and refreshed in the background, on an interval or as soon
+as a token signed by an unknown key shows up. Verifying a token never waits on Keycloak.
+"""
+
+import asyncio
+import base64
+import json
+import time
+from typing import Any
+
+import aiohttp
+from jwcrypto import jwk, jwt
+from loguru import logger
+
+
+class UnknownSigningKeyError(Exception):
+    """The token is signed by a key that is not (yet) known."""
+
+
+def read_segment(token: str, index: int) -> dict[str, Any]:
+    """Read the header (0) or the claims (1) of a JWT without verifying it.
+
+    Args:
+        token (str): _description_
+        index (int): _description_
+
+    Raises:
+        ValueError: If the token is malformed.
+
+    Returns:
+        dict[str, Any]: _description_
+    """
+    try:
+        segment = token.split(".")[index]
+        return json.loads(base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4)))
+    except Exception as e:
+        raise ValueError("Malformed token") from e
+
+
+def token_kid(token: str) -> str | None:
+    """Read the key id out of the header of a JWT without verifying it.
+
+    Args:
+        token (str): _description_
+
+    Returns:
+        str | None: _description_
+    """
+    return read_segment(token, 0).get("kid")
+
+
+def decode_unverified(token: str) -> dict[str, Any]:
+    """Read the claims of a JWT without verifying it.
+
+    Args:
+        token (str): _description_
+
+    Returns:
+        dict[str, Any]: _description_
+    """
+    return read_segment(token, 1)
+
+
+class JwksManager:
+    """Realm signing keys indexed by key id (async)."""
+
+    def __init__(self) -> None:
+        self.keys: dict[str, jwk.JWK] = {}
+        self.certs_url: str | None = None
+        self.refresh_interval = 3600.0
+        self.min_refresh_interval = 30.0
+        self.last_refresh = 0.0
+        self.session: aiohttp.ClientSession | None = None
+        self.refresher: asyncio.Task | None = None
+        self.refreshing: asyncio.Task | None = None
+
+    async def start(self, certs_url: str, refresh_interval: float = 3600, min_refresh_interval: float = 30) -> None:
+        """Load the keys and start refreshing them in the background.
+
+        Keycloak being unreachable does not stop the startup, the keys are retried every `min_refresh_interval`.
+
+        Args:
+            certs_url (str): The realm's `.../protocol/openid-connect/certs` endpoint.
+            refresh_interval (float, optional): Seconds between two refreshes. Defaults to 3600.
+            min_refresh_interval (float, optional): Minimum seconds between two refreshes triggered by unknown keys.
+                Defaults to 30.
+        """
+        self.certs_url = certs_url
+        self.refresh_interval = refresh_interval
+        self.min_refresh_interval = min_refresh_interval
+        self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10))
+        await self.refresh()
+        self.refresher = asyncio.create_task(self.run(), name="jwks-refresher")
+        logger.debug("JwksManager started with keys {}", list(self.keys))
+
+    async def close(self) -> None:
+        """Stop the background refreshes."""
+        for task in (self.refresher, self.refreshing):
+            if task is not None:
+                task.cancel()
+        await asyncio.gather(*(t for t in (self.refresher, self.refreshing) if t is not None), return_exceptions=True)
+        self.refresher = self.refreshing = None
+        if self.session is not None:
+            await self.session.close()
+        self.session = None
+
+    async def refresh(self) -> bool:
+        """Fetch the realm's keys, the current keys are kept if Keycloak can't be reached.
+
+        Returns:
+            bool: Whether the keys were refreshed.
+        """
+        if self.session is None or self.certs_url is None:
+            return False
+        self.last_refresh = time.monotonic()
+        try:
+            async with self.session.get(self.certs_url) as resp:
+                resp.raise_for_status()
+                jwks = await resp.json()
+            keys = {key["kid"]: jwk.JWK(**key) for key in jwks["keys"] if key.get("use", "sig") == "sig"}
+        except Exception as e:
+            logger.error("Failed to refresh the Keycloak signing keys: {}", str(e))
+            return False
+        if keys.keys() != self.keys.keys():
+            logger.info("Keycloak signing keys: {}", list(keys))
+        self.keys = keys
+        return True
+
+    async def run(self) -> None:
+        """Refresh loop, retries sooner while no key could be loaded."""
+        while True:
+            await asyncio.sleep(self.refresh_interval if self.keys else self.min_refresh_interval)
+            await self.refresh()
+
+    def request_refresh(self) -> None:
+        """Refresh the keys in the background, at most once every `min_refresh_interval`."""
+        if self.session is None or (self.refreshing is not None and not self.refreshing.done()):
+            return
+        if time.monotonic() - self.last_refresh < self.min_refresh_interval:
+            return
+        self.refreshing = asyncio.create_task(self.refresh(), name="jwks-refresh")
+
+    def key_for(self, token: str) -> jwk.JWK:
+        """Get the key a token was signed with.
+
+        Args:
+            token (str): _description_
+
+        Raises:
+            UnknownSigningKeyError: If the key is unknown, a refresh is started for the next requests.
+
+        Returns:
+            jwk.JWK: _description_
+        """
+        kid = token_kid(token)
+        key = self.keys.get(kid) if kid is not None else None
+        if key is None:
+            self.request_refresh()
+            raise UnknownSigningKeyError(f"Unknown signing key: {kid}")
+        return key
+
+    def decode(self, token: str, leeway: int = 60) -> dict[str, Any]:
+        """Verify the signature and expiry of a token and return its claims.
+
+        Args:
+            token (str): _description_
+            leeway (int, optional): Seconds of clock skew allowed. Defaults to 60.
+
+        Raises:
+            UnknownSigningKeyError: If the key is unknown.
+            jwcrypto.common.JWException: If the token is invalid or expired.
+
+        Returns:
+            dict[str, Any]: _description_
+        """
+        full_jwt = jwt.JWT(jwt=token)
+        full_jwt.leeway = leeway
+        full_jwt.validate(self.key_for(token))
+        return json.loads(full_jwt.claims)
+
+
+# Initialize the JwksManager
+jwks_manager = JwksManager()
@@ -71,3 +71,14 @@ class AuthUserToken(BaseModel):
     given_name: str
     family_name: str
     email: str
+
+
+class TokenCacheStats(BaseModel):
+    """Counters of the verified token cache."""
+
+    size: int = Field(title="Size", description="Number of tokens cached.")
+    max_size: int = Field(title="Max Size")
+    hits: int = Field(title="Hits")
+    misses: int = Field(title="Misses", description="Unknown or expired tokens, verified with Keycloak's key.")
+    evictions: int = Field(title="Evictions", description="Tokens dropped to stay under the max size.")
+    hit_rate: float | None = Field(default=None, title="Hit Rate")
@@ -0,0 +1,112 @@
+"""In-process cache of verified auth tokens.
+
+The same cookies arrive with every request of a session, verifying their signatures again each time is wasted CPU.
+Once verified, tokens are kept by digest until they expire so that a request only costs one hash and one lookup.
+"""
+
+import hashlib
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+
+from loguru import logger
+
+from py_event_planning.features.auth.schemas import AuthUserToken, TokenCacheStats
+
+
+class CachedToken(NamedTuple):
+    """A verified token and when it stops being valid."""
+
+    user: AuthUserToken
+    expires_at: float
+
+
+class VerifiedTokenCache:
+    """Bounded LRU cache from token digest to the decoded user token."""
+
+    def __init__(self, max_size: int = 10_000) -> None:
+        self.entries: OrderedDict[bytes, CachedToken] = OrderedDict()
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def init(self, max_size: int) -> None:
+        """Resize the cache, 0 disables it.
+
+        Args:
+            max_size (int): Maximum number of tokens kept.
+        """
+        self.max_size = max_size
+        self.clear()
+        logger.debug("VerifiedTokenCache initialized with max_size={}", max_size)
+
+    @staticmethod
+    def digest(*tokens: str | None) -> bytes:
+        """Key of a set of tokens, the raw tokens are never kept.
+
+        Returns:
+            bytes: _description_
+        """
+        return hashlib.sha256("\0".join(token or "" for token in tokens).encode()).digest()
+
+    def get(self, key: bytes) -> AuthUserToken | None:
+        """Get a verified token.
+
+        Args:
+            key (bytes): The digest of the tokens.
+
+        Returns:
+            AuthUserToken | None: The decoded token, None if it is unknown or expired.
+        """
+        cached = self.entries.get(key)
+        if cached is None:
+            self.misses += 1
+            return None
+        if cached.expires_at <= time.time():
+            del self.entries[key]
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return cached.user
+
+    def put(self, key: bytes, user: AuthUserToken, expires_at: float) -> None:
+        """Keep a verified token until it expires.
+
+        Args:
+            key (bytes): The digest of the tokens.
+            user (AuthUserToken): The decoded token.
+            expires_at (float): Unix time at which the token expires.
+        """
+        if self.max_size <= 0:
+            return
+        self.entries[key] = CachedToken(user, expires_at)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """Forget every token."""
+        self.entries.clear()
+
+    def stats(self) -> TokenCacheStats:
+        """Hit and miss counters of the cache.
+
+        Returns:
+            TokenCacheStats: _description_
+        """
+        lookups = self.hits + self.misses
+        return TokenCacheStats(
+            size=len(self.entries),
+            max_size=self.max_size,
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+            hit_rate=self.hits / lookups if lookups else None,
+        )
+
+
+# Initialize the VerifiedTokenCache
+verified_token_cache = VerifiedTokenCache()
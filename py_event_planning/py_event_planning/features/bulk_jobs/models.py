@@ -0,0 +1,40 @@
+"""SQLAlchemy Table: bulk_job definition."""
+
+import datetime
+import uuid
+from typing import Any
+
+from sqlalchemy import DateTime
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from py_event_planning.database.base_class import EventPlanningSchemaBase
+from py_event_planning.shared.enums import BulkJobStatusEnum
+
+
+class BulkJob(EventPlanningSchemaBase):
+    """SQLAlchemy bulk job model, the state of the background bulk loads is shared by every worker process."""
+
+    __tablename__ = "bulk_job"
+
+    # keys
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True)
+    # fields
+    kind: Mapped[str] = mapped_column(nullable=False)
+    filename: Mapped[str | None] = mapped_column(default=None, nullable=True)
+    status: Mapped[BulkJobStatusEnum] = mapped_column(nullable=False)
+    created_by: Mapped[str] = mapped_column(nullable=False)
+    created_at: Mapped[datetime.datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    started_at: Mapped[datetime.datetime | None] = mapped_column(DateTime(timezone=True), default=None, nullable=True)
+    # finished jobs beyond the history are deleted, the oldest first
+    finished_at: Mapped[datetime.datetime | None] = mapped_column(
+        DateTime(timezone=True), default=None, nullable=True, index=True
+    )
+    rows_processed: Mapped[int] = mapped_column(nullable=False)
+    bytes_total: Mapped[int] = mapped_column(nullable=False)
+    bytes_processed: Mapped[int] = mapped_column(nullable=False)
+    rows_per_second: Mapped[float | None] = mapped_column(default=None, nullable=True)
+    eta_seconds: Mapped[float | None] = mapped_column(default=None, nullable=True)
+    error: Mapped[str | None] = mapped_column(default=None, nullable=True)
+    # the bulk load report (BulkLoadResponse)
+    result: Mapped[dict[str, Any] | None] = mapped_column(default=None, nullable=True)
@@ -0,0 +1,36 @@
+"""Bulk job schemas."""
+
+import datetime
+import uuid
+
+from pydantic import BaseModel, ConfigDict, Field
+
+from py_event_planning.shared.enums import BulkJobStatusEnum
+from py_event_planning.shared.schemas import BulkLoadResponse
+
+
+class BulkJobSchema(BaseModel):
+    """A bulk load running in the background."""
+
+    model_config = ConfigDict(
+        extra="forbid",
+        validate_assignment=True,
+    )
+
+    id: uuid.UUID = Field(title="Job ID")
+    kind: str = Field(title="Kind", description="What is being loaded, e.g. 'spell'.")
+    filename: str | None = Field(default=None, title="Filename")
+    status: BulkJobStatusEnum = Field(default=BulkJobStatusEnum.QUEUED, title="Status")
+    created_by: str = Field(title="Created By")
+    created_at: datetime.datetime = Field(title="Created At")
+    started_at: datetime.datetime | None = Field(default=None, title="Started At")
+    finished_at: datetime.datetime | None = Field(default=None, title="Finished At")
+    rows_processed: int = Field(default=0, title="Rows Processed")
+    bytes_total: int = Field(default=0, title="File Size")
+    bytes_processed: int = Field(default=0, title="Bytes Processed")
+    rows_per_second: float | None = Field(default=None, title="Rate", description="Rows processed per second.")
+    eta_seconds: float | None = Field(
+        default=None, title="ETA", description="Estimated seconds left, from the part of the file read so far."
+    )
+    error: str | None = Field(default=None, title="Error", description="Why the job failed.")
+    result: BulkLoadResponse | None = Field(default=None, title="Result", description="The bulk load report.")
@@ -0,0 +1,285 @@
+"""Background bulk load jobs.
+
+Uploads are spooled to a temporary file and queued, a fixed number of asyncio workers then load them with
+`run_bulk_load`. The number of workers bounds how many master connections bulk loads can hold at once.
+
+The state of the jobs is kept in the `bulk_job` table so that any worker process of the API can report it, the
+upload and the queue stay in the process that received the file. Jobs left queued or running by a process that
+crashed are never updated again.
+"""
+
+import asyncio
+import datetime
+import tempfile
+import time
+import uuid
+from typing import Callable, NamedTuple
+
+from fastapi import HTTPException, UploadFile, status
+from loguru import logger
+from sqlalchemy import delete, select
+
+from py_event_planning.database.session import master_sessionmanager
+from py_event_planning.features.bulk_jobs.models import BulkJob
+from py_event_planning.features.bulk_jobs.schemas import BulkJobSchema
+from py_event_planning.features.core.ingest import (
+    UPLOAD_READ_SIZE,
+    BatchHandler,
+    BulkLoadCheckpoint,
+    check_upload_file_type,
+    run_bulk_load,
+)
+from py_event_planning.shared.enums import BulkJobStatusEnum
+from py_event_planning.shared.schemas import BulkLoadResponse
+
+# seconds between two saves of the progress of a running job
+PROGRESS_SAVE_INTERVAL = 1.0
+
+
+class QueuedBulkJob(NamedTuple):
+    """A bulk job waiting for a worker."""
+
+    job: BulkJobSchema
+    upload: UploadFile
+    make_batch_handler: Callable[[BulkLoadResponse], BatchHandler]
+    batch_size: int
+    all_or_nothing: bool
+    checkpoint: str | None
+
+
+class BulkJobManager:
+    """Queue and worker pool for bulk load jobs (async)."""
+
+    def __init__(self) -> None:
+        self.history = 100
+        self.queue: asyncio.Queue[QueuedBulkJob] | None = None
+        self.workers: list[asyncio.Task] = []
+
+    def start(self, workers: int, max_queued: int, history: int = 100) -> None:
+        """Start the worker pool.
+
+        Args:
+            workers (int): Number of jobs running at the same time.
+            max_queued (int): Number of jobs that can wait for a worker, more are rejected.
+            history (int, optional): Number of finished jobs kept for polling, across all the processes.
+                Defaults to 100.
+        """
+        self.history = history
+        self.queue = asyncio.Queue(maxsize=max_queued)
+        self.workers = [asyncio.create_task(self.work(), name=f"bulk-job-worker-{i}") for i in range(workers)]
+        logger.debug("BulkJobManager started with {} workers", workers)
+
+    async def close(self) -> None:
+        """Stop the worker pool, running and queued jobs are cancelled."""
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+        while self.queue is not None and not self.queue.empty():
+            queued = self.queue.get_nowait()
+            queued.job.status = BulkJobStatusEnum.CANCELLED
+            queued.job.error = "Cancelled before it started"
+            queued.job.finished_at = datetime.datetime.now(tz=datetime.UTC)
+            await queued.upload.close()
+            await self.save(queued.job)
+            logger.warning("Bulk job {} cancelled before it started", queued.job.id)
+        self.queue = None
+
+    async def get(self, job_id: uuid.UUID) -> BulkJobSchema | None:
+        """Get a job, whichever process runs it.
+
+        Args:
+            job_id (uuid.UUID): The job ID.
+
+        Returns:
+            BulkJobSchema | None: The job, None if it is unknown or was dropped from the history.
+        """
+        async with master_sessionmanager.session() as db:
+            job = await db.get(BulkJob, job_id)
+            return BulkJobSchema.model_validate(job, from_attributes=True) if job else None
+
+    async def save(self, job: BulkJobSchema) -> None:
+        """Write the state of a job to the database.
+
+        Args:
+            job (BulkJobSchema): The job.
+        """
+        result = job.result.model_dump(mode="json") if job.result else None
+        async with master_sessionmanager.session() as db:
+            await db.merge(BulkJob(**job.model_dump(exclude={"result"}), result=result))
+            await db.commit()
+
+    async def submit(
+        self,
+        file: UploadFile,
+        *,
+        kind: str,
+        created_by: str,
+        make_batch_handler: Callable[[BulkLoadResponse], BatchHandler],
+        batch_size: int,
+        all_or_nothing: bool = False,
+        checkpoint: str | None = None,
+    ) -> BulkJobSchema:
+        """Queue a bulk load, the upload is copied so that it outlives the request.
+
+        Args:
+            file (UploadFile): The uploaded file.
+            kind (str): What is being loaded, e.g. 'spell'.
+            created_by (str): The user submitting the job.
+            make_batch_handler (Callable[[BulkLoadResponse], BatchHandler]): Builds the batch handler writing to
+                the report of the job.
+            batch_size (int): Rows per batch (and per commit).
+            all_or_nothing (bool, optional): Commit once at the end and only without errors. Defaults to False.
+            checkpoint (str | None, optional): A checkpoint from a previous attempt to resume from. Defaults to None.
+
+        Raises:
+            HTTPException: 400 for unsupported files or checkpoints, 503 if the queue is full or not started.
+
+        Returns:
+            BulkJobSchema: The queued job.
+        """
+        check_upload_file_type(file)
+        if checkpoint:
+            BulkLoadCheckpoint.decode(checkpoint)
+        if self.queue is None or self.queue.full():
+            raise HTTPException(status.HTTP_503_SERVICE_UNAVAILABLE, detail="Too many bulk jobs, try again later")
+
+        upload = UploadFile(file=tempfile.TemporaryFile(), filename=file.filename, headers=file.headers)
+        size = 0
+        while chunk := await file.read(UPLOAD_READ_SIZE):
+            await upload.write(chunk)
+            size += len(chunk)
+        await upload.seek(0)
+
+        job = BulkJobSchema(
+            id=uuid.uuid4(),
+            kind=kind,
+            filename=file.filename,
+            created_by=created_by,
+            created_at=datetime.datetime.now(tz=datetime.UTC),
+            bytes_total=size,
+        )
+        try:
+            # saved before it is queued, a worker may pick it up as soon as it is
+            await self.save(job)
+            self.queue.put_nowait(
+                QueuedBulkJob(job, upload, make_batch_handler, batch_size, all_or_nothing, checkpoint)
+            )
+        except asyncio.QueueFull as e:
+            await upload.close()
+            async with master_sessionmanager.session() as db:
+                await db.execute(delete(BulkJob).where(BulkJob.id == job.id))
+                await db.commit()
+            raise HTTPException(
+                status.HTTP_503_SERVICE_UNAVAILABLE, detail="Too many bulk jobs, try again later"
+            ) from e
+        except BaseException:
+            await upload.close()
+            raise
+        await self.prune()
+        logger.info("Queued bulk job {} ({} bytes)", job.id, size)
+        return job
+
+    async def prune(self) -> None:
+        """Delete the oldest finished jobs beyond `history`."""
+        kept = (
+            select(BulkJob.id)
+            .where(BulkJob.finished_at.is_not(None))
+            .order_by(BulkJob.finished_at.desc())
+            .limit(self.history)
+        )
+        async with master_sessionmanager.session() as db:
+            await db.execute(delete(BulkJob).where(BulkJob.finished_at.is_not(None), BulkJob.id.not_in(kept)))
+            await db.commit()
+
+    async def work(self) -> None:
+        """Worker loop, runs the queued jobs one at a time."""
+        while self.queue is not None:
+            queued = await self.queue.get()
+            try:
+                await self.run(queued)
+            finally:
+                await queued.upload.close()
+                self.queue.task_done()
+
+    async def run(self, queued: QueuedBulkJob) -> None:
+        """Run a bulk job and keep its progress up to date.
+
+        Args:
+            queued (QueuedBulkJob): The job.
+        """
+        job = queued.job
+        response = BulkLoadResponse(filename=job.filename)
+        job.status = BulkJobStatusEnum.RUNNING
+        job.started_at = datetime.datetime.now(tz=datetime.UTC)
+        started = saved = time.monotonic()
+
+        async def on_progress(rows_processed: int) -> None:
+            nonlocal saved
+            now = time.monotonic()
+            elapsed = now - started
+            job.rows_processed = rows_processed
+            job.bytes_processed = min(queued.upload.file.tell(), job.bytes_total)
+            if elapsed > 0:
+                job.rows_per_second = rows_processed / elapsed
+            if job.bytes_processed:
+                job.eta_seconds = elapsed * (job.bytes_total - job.bytes_processed) / job.bytes_processed
+            if now - saved >= PROGRESS_SAVE_INTERVAL:
+                saved = now
+                await self.save(job)
+
+        with logger.contextualize(bulk_job={"id": str(job.id), "kind": job.kind}, user={"sub": job.created_by}):
+            try:
+                logger.info("Running bulk job")
+                await self.save(job)
+                async with master_sessionmanager.session() as db:
+                    await run_bulk_load(
+                        db,
+                        queued.upload,
+                        response,
+                        queued.make_batch_handler(response),
+                        batch_size=queued.batch_size,
+                        all_or_nothing=queued.all_or_nothing,
+                        checkpoint=queued.checkpoint,
+                        on_progress=on_progress,
+                    )
+                response.update_totals()
+                job.result = response
+                # a load that stopped halfway, or an all or nothing load that was not committed, is not a success
+                if response.stopped:
+                    job.error = (
+                        "Stopped on an error, retry the upload with the checkpoint of the result to resume it"
+                        if response.checkpoint
+                        else "Stopped on an error, nothing was committed"
+                    )
+                elif queued.all_or_nothing and response.errors:
+                    job.error = "Rows have errors, nothing was committed"
+                job.status = BulkJobStatusEnum.FAILED if job.error else BulkJobStatusEnum.SUCCEEDED
+            except asyncio.CancelledError:
+                logger.warning("Bulk job cancelled")
+                job.error = "Cancelled, nothing was committed"
+                if response.checkpoint:
+                    job.error = "Cancelled, retry the upload with the checkpoint of the result to resume it"
+                response.update_totals()
+                job.result = response
+                job.status = BulkJobStatusEnum.CANCELLED
+                raise
+            except Exception as e:
+                logger.error("Bulk job failed: {}", str(e))
+                job.error = e.detail if isinstance(e, HTTPException) else "Internal Error"
+                response.update_totals()
+                job.result = response
+                job.status = BulkJobStatusEnum.FAILED
+            finally:
+                job.finished_at = datetime.datetime.now(tz=datetime.UTC)
+                job.eta_seconds = 0 if job.status == BulkJobStatusEnum.SUCCEEDED else None
+                logger.info("Bulk job {} in {:.1f}s", job.status.value, time.monotonic() - started)
+                try:
+                    await self.save(job)
+                except Exception as e:
+                    # the worker keeps going, the job stays as it was last saved
+                    logger.error("Bulk job not saved: {}", str(e))
+
+
+# Initialize the BulkJobManager
+bulk_job_manager = BulkJobManager()
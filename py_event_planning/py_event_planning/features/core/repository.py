@@ -2,19 +2,64 @@
 
 from __future__ import annotations
 
+import base64
+import binascii
+import datetime
+import functools
+import json
 import uuid
 from enum import Enum
-from typing import Any, AsyncIterator, Generic, Sequence, TypeVar
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Generic,
+    Iterable,
+    NamedTuple,
+    Sequence,
+    TypeVar,
+)
 
 import loguru
+from fastapi import HTTPException, status
 from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
-from sqlalchemy import Result, Select, func, or_, select
+from sqlalchemy import (
+    ARRAY,
+    JSON,
+    BigInteger,
+    Column,
+    Result,
+    Select,
+    String,
+    and_,
+    any_,
+    bindparam,
+    cast,
+    column,
+    exists,
+    func,
+    inspect,
+    literal,
+    literal_column,
+    or_,
+    select,
+    table,
+    text,
+    tuple_,
+)
+from sqlalchemy.dialects.postgresql import JSONB, insert
+from sqlalchemy.engine import Row
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased, load_only, noload
 from sqlalchemy.orm.attributes import InstrumentedAttribute
 
 from py_event_planning.database.base_class import EventPlanningSchemaBase
 from py_event_planning.database.exceptions import handle_sqlalchemy_errors_decorator
+from py_event_planning.database.explain import Explain, get_plan_rows
+from py_event_planning.shared.enums import CountStrategyEnum
+from py_event_planning.shared.responses import type_adapter
+from py_event_planning.shared.schemas import partial_schema
 
 ModelType = TypeVar("ModelType", bound=EventPlanningSchemaBase)
 ModelSchemaType = TypeVar("ModelSchemaType", bound=BaseModel)
@@ -23,6 +68,45 @@ CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
 
+class QueryResult(NamedTuple, Generic[ModelSchemaType]):
+    """A page of entities returned by RepositoryBase.query."""
+
+    entities: list[ModelSchemaType]
+    total_count: int | None
+    next_cursor: str | None = None
+    count_strategy: CountStrategyEnum = CountStrategyEnum.EXACT
+    # the schema of the entities, a partial schema when only some fields were asked for
+    schema: Any = None
+
+
+class UpsertResult(NamedTuple):
+    """Conflict keys of the entities handled by RepositoryBase.upsert_many."""
+
+    created: list[Any]
+    updated: list[Any]
+    skipped: list[Any]
+
+
+@functools.lru_cache(maxsize=1024)
+def schema_columns(
+    model: type[EventPlanningSchemaBase], schema: type[BaseModel]
+) -> tuple[InstrumentedAttribute, ...] | None:
+    """Columns of a model that a schema is built from.
+
+    Args:
+        model (type[EventPlanningSchemaBase]): _description_
+        schema (type[BaseModel]): _description_
+
+    Returns:
+        tuple[InstrumentedAttribute, ...] | None: None if the schema reads relationships (or other attributes that
+            are not columns) and has to be built from the ORM entities.
+    """
+    mapper = inspect(model)
+    if any(name not in mapper.column_attrs and hasattr(model, name) for name in schema.model_fields):
+        return None
+    return tuple(getattr(model, name) for name in schema.model_fields if name in mapper.column_attrs)
+
+
 class RepositoryBase(Generic[ModelType, ModelSchemaType, ModelSchemaBaseType, CreateSchemaType, UpdateSchemaType]):
     """Base repositiroy.
 
@@ -30,6 +114,9 @@ class RepositoryBase(Generic[ModelType, ModelSchemaType, ModelSchemaBaseType, Cr
         Generic (_type_): typings for repository.
     """
 
+    estimate_count_threshold: int = 10_000
+    """Below this many (estimated) rows an exact count is cheap enough to always be used."""
+
     def __init__(
         self,
         session: AsyncSession,
@@ -51,6 +138,111 @@ class RepositoryBase(Generic[ModelType, ModelSchemaType, ModelSchemaBaseType, Cr
         self.schema_base = schema_base
         self.logger = logger if logger else loguru.logger
 
+    @property
+    def schema_columns(self) -> tuple[InstrumentedAttribute, ...] | None:
+        """Columns selected to build `schema`, None if it needs the ORM entities (see `schema_columns`)."""
+        return schema_columns(self.model, self.schema)
+
+    def fields_schema(self, fields: frozenset[str] | None = None) -> type[BaseModel]:
+        """The schema returned for a sparse fieldset (see `partial_schema`).
+
+        Args:
+            fields (frozenset[str] | None, optional): The fields to return, None for all of them. Defaults to None.
+
+        Raises:
+            HTTPException: 400 if a field is not a field of `schema`.
+
+        Returns:
+            type[BaseModel]: _description_
+        """
+        try:
+            return partial_schema(self.schema, fields)
+        except ValueError as e:
+            self.logger.debug("Invalid fields {}: {}", fields, e)
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)) from e
+
+    def to_schemas(self, entities: Sequence[ModelType], schema: type[BaseModel] | None = None) -> list[Any]:
+        """Build the schemas of a page of ORM entities in a single validation call.
+
+        Args:
+            entities (Sequence[ModelType]): _description_
+            schema (type[BaseModel] | None, optional): Defaults to `schema`.
+
+        Returns:
+            list[Any]: _description_
+        """
+        return type_adapter(list[schema or self.schema]).validate_python(entities, from_attributes=True)
+
+    def rows_to_schemas(self, rows: Sequence[Row], schema: type[BaseModel] | None = None) -> list[Any]:
+        """Build the schemas of a page of Core rows selected by `select_schema` in a single validation call.
+
+        Validating plain dicts is about twice as fast as reading the attributes of ORM entities or rows,
+        trailing columns (e.g. `total_count`) are left out.
+
+        Args:
+            rows (Sequence[Row]): _description_
+            schema (type[BaseModel] | None, optional): Defaults to `schema`.
+
+        Returns:
+            list[Any]: _description_
+        """
+        schema = schema or self.schema
+        keys = [model_field.key for model_field in schema_columns(self.model, schema) or ()]
+        return type_adapter(list[schema]).validate_python([dict(zip(keys, row)) for row in rows])
+
+    def select_schema(self, schema: type[BaseModel] | None = None) -> Select:
+        """Select what a schema is built from: its plain columns (no ORM identity map) or the ORM entities.
+
+        Args:
+            schema (type[BaseModel] | None, optional): Defaults to `schema`.
+
+        Returns:
+            Select: _description_
+        """
+        schema = schema or self.schema
+        columns = schema_columns(self.model, schema)
+        if columns is not None:
+            return select(*columns)
+        return select(self.model).options(*self.load_options(schema))
+
+    def load_options(self, schema: type[BaseModel], entity: Any | None = None) -> list[Any]:
+        """Loader options of the ORM entities of a partial schema: only its columns, only its relationships.
+
+        Args:
+            schema (type[BaseModel]): _description_
+            entity (Any | None, optional): The model or an alias of it. Defaults to None.
+
+        Returns:
+            list[Any]: _description_
+        """
+        if schema is self.schema:
+            return []
+        if entity is None:
+            entity = self.model
+        mapper = inspect(self.model)
+        return [
+            load_only(*(getattr(entity, name) for name in schema.model_fields if name in mapper.column_attrs)),
+            *(
+                noload(getattr(entity, name))
+                for name in mapper.relationships.keys()
+                if name not in schema.model_fields
+            ),
+        ]
+
+    async def fetch_schemas(self, query: Select, schema: type[BaseModel] | None = None) -> list[Any]:
+        """Run a query built on `select_schema` and build its schemas.
+
+        Args:
+            query (Select): _description_
+            schema (type[BaseModel] | None, optional): Defaults to `schema`.
+
+        Returns:
+            list[Any]: _description_
+        """
+        if schema_columns(self.model, schema or self.schema) is not None:
+            return self.rows_to_schemas((await self.session.execute(query)).all(), schema)
+        return self.to_schemas((await self.session.scalars(query)).all(), schema)
+
     @handle_sqlalchemy_errors_decorator
     async def read_by_id(self, entity_id: int, as_model: bool = False) -> ModelSchemaType | ModelType | None:
         """Get an entity by id.
@@ -99,6 +291,7 @@ class RepositoryBase(Generic[ModelType, ModelSchemaType, ModelSchemaBaseType, Cr
         *,
         offset: int = 0,
         limit: int = 100,
+        cursor: str | None = None,
     ) -> list[ModelSchemaType]:
         # ) -> AsyncIterator[ModelType]:
         """Get multiple entities (pagination optional).
@@ -106,6 +299,7 @@ class RepositoryBase(Generic[ModelType, ModelSchemaType, ModelSchemaBaseType, Cr
         Args:
             offset (int, optional): _description_. Defaults to 0.
             limit (int, optional): _description_. Defaults to 100.
+            cursor (str | None, optional): Keyset cursor from `encode_cursor`, replaces `offset`. Defaults to None.
 
         Returns:
             AsyncIterator[ModelType]: _description_
@@ -114,12 +308,36 @@ class RepositoryBase(Generic[ModelType, ModelSchemaType, ModelSchemaBaseType, Cr
             Iterator[AsyncIterator[ModelType]]: _description_
         """
         self.logger.debug("RepositoryBase::read_multi() called with offset={}, limit={}", offset, limit)
-        stmt = select(self.model).offset(offset).limit(limit)
+        stmt = self.select_schema()
+        if cursor:
+            stmt = self.apply_cursor_to_query(query=stmt, cursor=cursor)
+        else:
+            stmt = stmt.offset(offset)
+        stmt = stmt.limit(limit)
         # stream = await self.session.stream_scalars(stmt.order_by(self.model.id))
         # async for row in stream:
         #     yield row
-        res = await self.session.scalars(stmt.order_by(self.model.id))
-        return [self.schema.model_validate(e) for e in res]
+        return await self.fetch_schemas(stmt.order_by(self.model.id))
+
+    @handle_sqlalchemy_errors_decorator
+    async def read_existing_values(self, key: str, values: Iterable[Any]) -> set[Any]:
+        """Find which of the values already exist in a column, in a single `WHERE key = ANY(...)` query.
+
+        Args:
+            key (str): The model field to look in.
+            values (Iterable[Any]): The values to look for.
+
+        Returns:
+            set[Any]: The values that are already in the database.
+        """
+        model_field: InstrumentedAttribute = getattr(self.model, key)
+        distinct_values = list({value for value in values if value is not None})
+        if not distinct_values:
+            return set()
+        stmt = select(model_field).where(
+            model_field == any_(bindparam(f"{key}_values", distinct_values, type_=ARRAY(model_field.type)))
+        )
+        return set(await self.session.scalars(stmt))
 
     # async def get_multi(self, db: AsyncSession, *, offset: int = 0, limit: int = 100) -> list[ModelType]:
     #     stmt = select(self.model).offset(offset).limit(limit)
@@ -152,6 +370,218 @@ class RepositoryBase(Generic[ModelType, ModelSchemaType, ModelSchemaBaseType, Cr
             return self.schema_base.model_validate(entity)
         return None
 
+    @handle_sqlalchemy_errors_decorator
+    async def bulk_ingest(
+        self, *, models_in: Sequence[CreateSchemaType], key: str | Sequence[str] = "name"
+    ) -> set[Any]:
+        """Insert many entities at once, skipping the ones whose `key` already exists.
+
+        With asyncpg the rows are streamed with `COPY` into a temporary staging table and merged with a single
+        `INSERT ... SELECT ... ON CONFLICT DO NOTHING RETURNING key`, other drivers fall back to the ORM.
+
+        Args:
+            models_in (Sequence[CreateSchemaType]): The entities to insert.
+            key (str | Sequence[str], optional): The natural key used to detect existing entities, a field or the
+                fields of a unique constraint (e.g. `["source_id", "name"]`). Defaults to "name".
+
+        Returns:
+            set[Any]: The keys of the entities that were inserted, tuples of the key fields for a composite key.
+        """
+        if not models_in:
+            return set()
+        connection = await self.session.connection()
+        raw_connection = await connection.get_raw_connection()
+        driver_connection = raw_connection.driver_connection
+        if not hasattr(driver_connection, "copy_records_to_table"):
+            return await self._bulk_ingest_orm(models_in=models_in, key=key)
+
+        dialect = connection.dialect
+        target = self.model.__table__
+        rows = [model_in.model_dump() for model_in in models_in]
+        copy_columns = [
+            target_column
+            for target_column in target.columns
+            if target_column.computed is None
+            and (
+                target_column.key in rows[0]
+                or (target_column.default is not None and not target_column.default.is_clause_element)
+            )
+        ]
+        column_names = [target_column.name for target_column in copy_columns]
+        processors = [
+            target_column.type.dialect_impl(dialect).bind_processor(dialect) for target_column in copy_columns
+        ]
+        records = [
+            (*self._to_copy_values(row, copy_columns, processors), row_number) for row_number, row in enumerate(rows)
+        ]
+
+        staging_name = f"_bulk_ingest_{target.name}_{uuid.uuid4().hex[:12]}"
+        # the first statement goes through SQLAlchemy so the COPY below runs in the session's transaction
+        await connection.execute(
+            text(
+                f"CREATE TEMP TABLE {staging_name} "
+                + f"(LIKE {dialect.identifier_preparer.format_table(target)} INCLUDING DEFAULTS, "
+                + "_ingest_row integer) ON COMMIT DROP"
+            )
+        )
+        await driver_connection.copy_records_to_table(
+            staging_name, records=records, columns=[*column_names, "_ingest_row"]
+        )
+        staging = table(staging_name, *(column(name) for name in column_names), column("_ingest_row"))
+        key_columns = [target.c[field] for field in ([key] if isinstance(key, str) else key)]
+        staging_keys = [staging.c[key_column.name] for key_column in key_columns]
+        # first row wins for keys repeated in the upload, keys already in the table are skipped
+        merge = (
+            insert(target)
+            .from_select(
+                column_names,
+                select(*(staging.c[name] for name in column_names))
+                .distinct(*staging_keys)
+                .where(
+                    ~exists().where(
+                        and_(
+                            *(key_column == staging_key for key_column, staging_key in zip(key_columns, staging_keys))
+                        )
+                    )
+                )
+                .order_by(*staging_keys, staging.c["_ingest_row"]),
+            )
+            .on_conflict_do_nothing()
+            .returning(*key_columns)
+        )
+        result = await connection.execute(merge)
+        created = set(result.scalars()) if isinstance(key, str) else {tuple(row) for row in result}
+        await connection.execute(text(f"DROP TABLE {staging_name}"))
+        self.logger.debug("Bulk ingested {} of {} {} rows", len(created), len(rows), target.name)
+        return created
+
+    @staticmethod
+    def _to_copy_values(
+        row: dict[str, Any], copy_columns: list[Column], processors: list[Callable[[Any], Any] | None]
+    ) -> tuple[Any, ...]:
+        """Turn a dumped entity into COPY values, filling in the python side column defaults.
+
+        Args:
+            row (dict[str, Any]): The dumped entity.
+            copy_columns (list[Column]): The columns being copied.
+            processors (list[Callable[[Any], Any] | None]): The dialect bind processor of every column.
+
+        Returns:
+            tuple[Any, ...]: One value per column.
+        """
+        values = []
+        for copy_column, processor in zip(copy_columns, processors):
+            if copy_column.key in row:
+                value = row[copy_column.key]
+            elif copy_column.default.is_callable:
+                value = copy_column.default.arg(None)
+            else:
+                value = copy_column.default.arg
+            values.append(processor(value) if processor else value)
+        return tuple(values)
+
+    @handle_sqlalchemy_errors_decorator
+    async def upsert_many(
+        self,
+        rows: Sequence[CreateSchemaType | dict[str, Any]],
+        conflict_cols: Sequence[str],
+        update_cols: Sequence[str] | None = None,
+    ) -> UpsertResult:
+        """Insert or update many entities with `INSERT ... ON CONFLICT DO UPDATE`, one statement per chunk.
+
+        A conflicting row is only updated when one of its `update_cols` changed (`json` columns are compared as
+        `jsonb`, `json` has no equality operator), bookkeeping `updated_*` columns are then refreshed as well. `RETURNING (xmax = 0)` tells created rows apart from updated ones, conflicting
+        rows that come back empty were left untouched (skipped).
+
+        Args:
+            rows (Sequence[CreateSchemaType | dict[str, Any]]): The entities to upsert, with distinct conflict keys.
+            conflict_cols (Sequence[str]): Columns of the unique constraint used to detect existing entities.
+            update_cols (Sequence[str] | None, optional): Columns to overwrite on conflict, None means every
+                column except the primary key, `conflict_cols` and the bookkeeping columns. An empty list
+                never updates. Defaults to None.
+
+        Returns:
+            UpsertResult: The `conflict_cols` values of the created, updated and skipped entities.
+        """
+        result = UpsertResult(created=[], updated=[], skipped=[])
+        if not rows:
+            return result
+        values = [row if isinstance(row, dict) else row.model_dump() for row in rows]
+        target = self.model.__table__
+        if update_cols is None:
+            bookkeeping_cols = {"created_at", "created_by", "updated_at", "updated_by"}
+            excluded_cols = {*conflict_cols, *target.primary_key.columns.keys(), *bookkeeping_cols}
+            update_cols = [key for key in values[0] if key in target.c and key not in excluded_cols]
+        touch_cols = [key for key in ("updated_at", "updated_by") if key in values[0] and key not in update_cols]
+
+        def row_key(row: Any) -> Any:
+            return tuple(row[col] for col in conflict_cols) if len(conflict_cols) > 1 else row[conflict_cols[0]]
+
+        def is_changed(col: str, excluded: Any) -> Any:
+            if isinstance(target.c[col].type, JSON) and not isinstance(target.c[col].type, JSONB):
+                return cast(target.c[col], JSONB).is_distinct_from(cast(excluded[col], JSONB))
+            return target.c[col].is_distinct_from(excluded[col])
+
+        # postgres accepts at most 32767 bind parameters per statement
+        chunk_size = max(1, 32767 // len(values[0]))
+        for start in range(0, len(values), chunk_size):
+            chunk = values[start : start + chunk_size]
+            stmt = insert(target).values(chunk)
+            if update_cols:
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=conflict_cols,
+                    set_={col: stmt.excluded[col] for col in [*update_cols, *touch_cols]},
+                    where=or_(*(is_changed(col, stmt.excluded) for col in update_cols)),
+                )
+            else:
+                stmt = stmt.on_conflict_do_nothing(index_elements=conflict_cols)
+            stmt = stmt.returning(
+                *(target.c[col] for col in conflict_cols),
+                (literal_column("xmax") == literal_column("0")).label("is_created"),
+            )
+            returned = (await self.session.execute(stmt)).mappings().all()
+            for row in returned:
+                (result.created if row["is_created"] else result.updated).append(row_key(row))
+            touched = {row_key(row) for row in returned}
+            result.skipped.extend(key for key in map(row_key, chunk) if key not in touched)
+        self.logger.debug(
+            "Upserted {} rows: {} created, {} updated, {} skipped",
+            len(values),
+            len(result.created),
+            len(result.updated),
+            len(result.skipped),
+        )
+        return result
+
+    async def _bulk_ingest_orm(self, *, models_in: Sequence[CreateSchemaType], key: str | Sequence[str]) -> set[Any]:
+        """Insert many entities through the ORM, see `bulk_ingest`.
+
+        Args:
+            models_in (Sequence[CreateSchemaType]): The entities to insert.
+            key (str | Sequence[str]): The natural key used to detect existing entities.
+
+        Returns:
+            set[Any]: The keys of the entities that were inserted.
+        """
+        if isinstance(key, str):
+            values = [getattr(model_in, key) for model_in in models_in]
+            existing = await self.read_existing_values(key, values)
+        else:
+            values = [tuple(getattr(model_in, field) for field in key) for model_in in models_in]
+            key_fields = [getattr(self.model, field) for field in key]
+            existing = {
+                tuple(row)
+                for row in await self.session.execute(select(*key_fields).where(tuple_(*key_fields).in_(set(values))))
+            }
+        created: set[Any] = set()
+        for model_in, value in zip(models_in, values):
+            if value in existing or value in created:
+                continue
+            created.add(value)
+            self.session.add(self.model(**model_in.model_dump()))
+        await self.session.flush()
+        return created
+
     # async def create(self, db: AsyncSession, *, obj_in: CreateSchemaType) -> ModelType:
     #     obj_in_data = jsonable_encoder(obj_in)
     #     db_obj = self.model(**obj_in_data)
@@ -227,46 +657,269 @@ class RepositoryBase(Generic[ModelType, ModelSchemaType, ModelSchemaBaseType, Cr
         self,
         params: dict[str, list[Any] | str | None],
         *,
-        order_by: Any | None = None,
+        order_by: InstrumentedAttribute | None = None,
         limit: int | None = 100,
         offset: int | None = 0,
+        cursor: str | None = None,
         exact: bool = False,
-    ) -> tuple[Sequence[ModelType], int]:
+        count_strategy: CountStrategyEnum | None = None,
+        fields: frozenset[str] | None = None,
+    ) -> QueryResult[ModelSchemaType]:
         """Query a list of Type[ModelType] with filters.
 
+        Results are always ordered by `order_by` then `id` so that pages are stable. When `cursor` is set the
+        page starts right after the row it points to (keyset pagination) and `offset` is ignored.
+
+        The total count is fetched in the same round trip as the page: `exact` adds a `count(*) OVER ()` window
+        to the statement, `estimate` asks the planner instead of counting (falling back to `exact` for small
+        tables) and `none` skips counting altogether. The count is `exact` by default, `estimate` with a cursor:
+        counting every filtered row would make the pages deep into the results as slow as offsets.
+
+        Schemas without relationships are built from plain column rows (see `select_schema`), the whole page is
+        converted in a single call. With `fields` only those columns (and relationships) are loaded and the
+        entities are partial schemas (see `fields_schema`).
+
         Args:
             db (Session): A SQLAlchemy Session.
             params (dict[str, list[Any] | str | None]): A dict of fields from Type[ModelType] to query.
-            order_by (Any, None, optional): SQL 'ORDER BY' input. Defaults to None.
+            order_by (InstrumentedAttribute, None, optional): Model column for SQL 'ORDER BY'. Defaults to None.
             limit (int | None, optional): SQL 'LIMIT'. Defaults to 100.
             offset (int | None, optional): SQL 'OFFSET'. Defaults to 0.
+            cursor (str | None, optional): A `next_cursor` from a previous page. Defaults to None.
+            count_strategy (CountStrategyEnum | None, optional): How to get the total count, None for EXACT
+                (ESTIMATE with a cursor). Defaults to None.
+            fields (frozenset[str] | None, optional): Fields of the schema to return, None for all of them.
+                Defaults to None.
 
         Returns:
-            tuple[Sequence[ModelType], int]: A tuple of the entities and the total_count.
+            QueryResult[ModelSchemaType]: The entities, the total_count, the cursor of the next page and the schema.
         """
         total_count: int | None = None
-        query: Select = select(self.model)
+        if count_strategy is None:
+            count_strategy = CountStrategyEnum.ESTIMATE if cursor else CountStrategyEnum.EXACT
+        if fields is not None:
+            # the cursor of the next page is read from the last entity
+            fields = fields | {column.key for column in self._keyset_columns(order_by)}
+        schema = self.fields_schema(fields)
+        columns = schema_columns(self.model, schema)
+        query: Select = self.select_schema(schema)
         if params:
             query = self.apply_param_filters_to_query(query=query, params=params, exact=exact)
-        # get count before limit/offset are applied
-        if limit != 0 or offset != 0:
-            query_count: Select = select(func.count()).select_from(query)
-            query_count_result: Result = await self.session.execute(query_count)
-            total_count = int(query_count_result.scalar_one())
-        # apply limit/offset/order_by
-        if order_by is not None:
-            query = query.order_by(order_by)
-        if offset:
+        filtered_query = query
+        paginated = bool(limit or offset or cursor)
+        if paginated and count_strategy == CountStrategyEnum.ESTIMATE:
+            total_count = await self.estimate_count(filtered_query, filtered=bool(params))
+            if total_count is None:
+                count_strategy = CountStrategyEnum.EXACT
+        with_count_window = paginated and count_strategy == CountStrategyEnum.EXACT
+        entity: Any = self.model
+        if with_count_window and cursor:
+            # the count has to be taken before the cursor narrows down the rows
+            subquery = query.add_columns(func.count().over().label("total_count")).subquery()
+            if columns is not None:
+                entity = subquery.c
+                query = select(*subquery.c)
+            else:
+                entity = aliased(self.model, subquery)
+                query = select(entity, subquery.c.total_count).options(*self.load_options(schema, entity))
+        elif with_count_window:
+            query = query.add_columns(func.count().over().label("total_count"))
+        # apply cursor/limit/offset/order_by
+        if cursor:
+            query = self.apply_cursor_to_query(query=query, cursor=cursor, order_by=order_by, entity=entity)
+        elif offset:
             query = query.offset(offset)
+        query = query.order_by(*self._keyset_columns(order_by, entity=entity))
         if limit:
             query = query.limit(limit)
         result: Result = await self.session.execute(query)
+        if with_count_window:
+            rows = result.all()
+            if columns is not None:
+                entities = self.rows_to_schemas(rows, schema)
+            else:
+                entities = self.to_schemas([row[0] for row in rows], schema)
+            if rows:
+                total_count = int(rows[0].total_count)
+            else:
+                # the window has nothing to count on when the page is past the last row
+                total_count = await self.count(filtered_query)
+        else:
+            entities = (
+                self.rows_to_schemas(result.all(), schema)
+                if columns is not None
+                else self.to_schemas(result.scalars().all(), schema)
+            )
         # if no limit/offset assume count is lenght of result
-        entities = [self.schema.model_validate(e) for e in result.scalars().all()]
-        if total_count is None:
+        if not paginated:
             self.logger.debug("No limit/offset set, assuming total_count = len(result)")
             total_count = len(entities)
-        return entities, total_count
+            count_strategy = CountStrategyEnum.EXACT
+        next_cursor = None
+        if limit and len(entities) == limit:
+            next_cursor = self.encode_cursor(entities[-1], order_by=order_by)
+        return QueryResult(
+            entities=entities,
+            total_count=total_count,
+            next_cursor=next_cursor,
+            count_strategy=count_strategy,
+            schema=schema,
+        )
+
+    @handle_sqlalchemy_errors_decorator
+    async def count(self, query: Select) -> int:
+        """Count the rows of a query.
+
+        Args:
+            query (Select): The query to count.
+
+        Returns:
+            int: The number of rows.
+        """
+        query_count: Select = select(func.count()).select_from(query.subquery())
+        query_count_result: Result = await self.session.execute(query_count)
+        return int(query_count_result.scalar_one())
+
+    @handle_sqlalchemy_errors_decorator
+    async def estimate_count(self, query: Select, filtered: bool = True) -> int | None:
+        """Estimate the rows of a query without counting them.
+
+        Unfiltered queries read the table statistics from `pg_class`, filtered ones use the planner's row
+        estimate from `EXPLAIN`. Estimates below `estimate_count_threshold` are not worth the inaccuracy.
+
+        Args:
+            query (Select): The (filtered) query to estimate.
+            filtered (bool, optional): Whether the query has filters applied. Defaults to True.
+
+        Returns:
+            int | None: The estimate, None when an exact count should be used instead.
+        """
+        if self.session.bind is None or self.session.bind.dialect.name != "postgresql":
+            return None
+        if filtered:
+            plan = await self.session.scalar(Explain(query))
+            estimate = get_plan_rows(plan)
+        else:
+            table_name = f"{self.model.__table__.schema}.{self.model.__table__.name}"
+            estimate = await self.session.scalar(
+                select(cast(literal_column("reltuples"), BigInteger))
+                .select_from(table("pg_class"))
+                .where(literal_column("oid") == func.to_regclass(table_name))
+            )
+        if estimate is None or estimate < self.estimate_count_threshold:
+            return None
+        return int(estimate)
+
+    def _keyset_columns(
+        self, order_by: InstrumentedAttribute | None = None, entity: Any | None = None
+    ) -> list[InstrumentedAttribute]:
+        """Columns that uniquely order a query, `id` is always the tie breaker.
+
+        Args:
+            order_by (InstrumentedAttribute | None, optional): The primary sort column. Defaults to None.
+            entity (Any | None, optional): The model or an alias of it to take the columns from. Defaults to None.
+
+        Raises:
+            ValueError: If `order_by` is nullable, NULLs can't be compared to a cursor.
+
+        Returns:
+            list[InstrumentedAttribute]: The sort columns.
+        """
+        if entity is None:
+            entity = self.model
+        if order_by is None or order_by.key == "id":
+            return [entity.id]
+        if getattr(self.model, order_by.key).expression.nullable:
+            # `(column, id) > (cursor values)` is never true for a NULL, those rows would be skipped
+            raise ValueError(f"Can't sort pages on the nullable column {order_by.key}")
+        return [getattr(entity, order_by.key), entity.id]
+
+    def encode_cursor(self, entity: Any, order_by: InstrumentedAttribute | None = None) -> str:
+        """Build an opaque cursor pointing right after `entity`.
+
+        Args:
+            entity (Any): The last entity (model or schema) of a page.
+            order_by (InstrumentedAttribute | None, optional): The sort column of the page. Defaults to None.
+
+        Returns:
+            str: A url safe cursor.
+        """
+        values = [getattr(entity, keyset_column.key) for keyset_column in self._keyset_columns(order_by)]
+        raw = json.dumps(jsonable_encoder(values), separators=(",", ":"))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+    def decode_cursor(self, cursor: str, order_by: InstrumentedAttribute | None = None) -> list[Any]:
+        """Decode a cursor built by `encode_cursor` back into typed column values.
+
+        Args:
+            cursor (str): The cursor.
+            order_by (InstrumentedAttribute | None, optional): The sort column of the page. Defaults to None.
+
+        Raises:
+            HTTPException: 400 if the cursor is malformed or was built for another sort order.
+
+        Returns:
+            list[Any]: One value per keyset column.
+        """
+        columns = self._keyset_columns(order_by)
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+            if not isinstance(values, list) or len(values) != len(columns):
+                raise ValueError("cursor does not match the sort columns")
+            return [self._coerce_cursor_value(model_field, value) for model_field, value in zip(columns, values)]
+        except (ValueError, TypeError, binascii.Error) as e:
+            self.logger.debug("Invalid cursor {}: {}", cursor, e)
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor") from e
+
+    @staticmethod
+    def _coerce_cursor_value(model_field: InstrumentedAttribute, value: Any) -> Any:
+        """Turn a json value back into the python type of `model_field`.
+
+        Args:
+            model_field (InstrumentedAttribute): The column the value belongs to.
+            value (Any): The decoded json value.
+
+        Returns:
+            Any: The typed value.
+        """
+        if value is None:
+            return None
+        try:
+            python_type = model_field.type.python_type
+        except NotImplementedError:
+            return value
+        if isinstance(value, python_type):
+            return value
+        if python_type is datetime.datetime:
+            return datetime.datetime.fromisoformat(value)
+        if python_type is datetime.date:
+            return datetime.date.fromisoformat(value)
+        return python_type(value)
+
+    def apply_cursor_to_query(
+        self,
+        query: Select,
+        cursor: str,
+        order_by: InstrumentedAttribute | None = None,
+        entity: Any | None = None,
+    ) -> Select:
+        """Only select the rows that come after the cursor (keyset pagination).
+
+        Args:
+            query (Select): The query to apply the cursor to.
+            cursor (str): The cursor.
+            order_by (InstrumentedAttribute | None, optional): The sort column of the page. Defaults to None.
+            entity (Any | None, optional): The model or an alias of it selected by the query. Defaults to None.
+
+        Returns:
+            Select: The query with the keyset condition applied.
+        """
+        columns = self._keyset_columns(order_by, entity=entity)
+        values = self.decode_cursor(cursor, order_by=order_by)
+        if len(columns) == 1:
+            return query.where(columns[0] > values[0])
+        bound = [literal(value, type_=model_field.type) for model_field, value in zip(columns, values)]
+        return query.where(tuple_(*columns) > tuple_(*bound))
 
     def apply_param_filters_to_query(
         self, query: Select, params: dict[str, Any | list[Any]] | None = None, exact: bool = False
@@ -292,12 +945,23 @@ class RepositoryBase(Generic[ModelType, ModelSchemaType, ModelSchemaBaseType, Cr
     def _get_filter_list(
         self, key: str, value: list[Any] | Any | None, model: Any | None = None, exact: bool = False
     ) -> list[Any]:
-        """Gets filters based on the param's value type.
+        """Gets index friendly filters based on the column type and the param's value.
+
+        Values separated by commas (or lists) match any of the values.
+
+        * enum, number, boolean and uuid columns: `=` / `IN` (btree indexes)
+        * text columns with `exact`: `=` / `= ANY(array)`
+        * other text columns: `ILIKE '%value%'` (pg_trgm GIN indexes), `ILIKE 'value%'` for values ending with `*`,
+          several values are a single `ILIKE ANY(array)` instead of a chain of `OR`s
 
         Args:
             key (str): The param dict key.
             value (list[Any] | Any | None, optional): The param dict value.
             model (Any | None, optional): The model that will be filtered. Defaults to None.
+            exact (bool, optional): Match text columns exactly. Defaults to False.
+
+        Raises:
+            HTTPException: 400 if a value does not fit the column type.
 
         Returns:
             list[Any]: A list of filters.
@@ -305,23 +969,81 @@ class RepositoryBase(Generic[ModelType, ModelSchemaType, ModelSchemaBaseType, Cr
         if not model:
             model = self.model
         key = str(key).split(".")[-1]
-        filters = []
         model_field: InstrumentedAttribute = getattr(model, key)
-        if value:
-            if isinstance(value, str) and "," in value:
-                value = value.split(",")
-            if isinstance(value, list):
-                conditions = [model_field.ilike(f"%{v}%") for v in value]
-                list_query = or_(*conditions)
-                filters.append(list_query)
-                # filters.append(model_field.in_(value))
-            elif isinstance(value, (int, Enum)):
-                filters.append(model_field == value)
-            elif isinstance(value, uuid.UUID):
-                filters.append(model_field == value)
-            else:
-                if exact:
-                    filters.append(model_field.like(f"{value}"))
-                else:
-                    filters.append(model_field.ilike(f"%{value}%"))
-        return filters
+        # `False` is a valid filter value
+        if value is None or value == "" or value == []:
+            return []
+        if isinstance(value, str) and "," in value:
+            value = [v.strip() for v in value.split(",") if v.strip()]
+        values = value if isinstance(value, list) else [value]
+        if not values:
+            return []
+
+        try:
+            is_text = model_field.type.python_type is str
+        except NotImplementedError:
+            is_text = False
+        if not is_text:
+            try:
+                values = [self._coerce_filter_value(model_field, v) for v in values]
+            except (ValueError, TypeError, KeyError) as e:
+                self.logger.debug("Invalid {} filter {}: {}", key, value, e)
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid {key}") from e
+            return [model_field == values[0] if len(values) == 1 else model_field.in_(values)]
+
+        values = [str(v) for v in values]
+        if exact:
+            if len(values) == 1:
+                return [model_field == values[0]]
+            return [model_field == any_(bindparam(f"{key}_values", values, type_=ARRAY(String), unique=True))]
+        patterns = [self._like_pattern(v) for v in values]
+        if len(patterns) == 1:
+            return [model_field.ilike(patterns[0])]
+        return [model_field.ilike(any_(bindparam(f"{key}_patterns", patterns, type_=ARRAY(String), unique=True)))]
+
+    @staticmethod
+    def _coerce_filter_value(model_field: InstrumentedAttribute, value: Any) -> Any:
+        """Turn a query string value into the python type of `model_field`.
+
+        Enums match their value or name (case insensitive), booleans "true"/"false".
+
+        Args:
+            model_field (InstrumentedAttribute): The column the value is compared to.
+            value (Any): The filter value.
+
+        Raises:
+            ValueError: If the value does not fit the column type.
+
+        Returns:
+            Any: The typed value.
+        """
+        try:
+            python_type = model_field.type.python_type
+        except NotImplementedError:
+            return value
+        if not isinstance(value, str) or python_type is str:
+            return RepositoryBase._coerce_cursor_value(model_field, value)
+        if issubclass(python_type, Enum):
+            for member in python_type:
+                if value.lower() in (str(member.value).lower(), member.name.lower()):
+                    return member
+            raise ValueError(f"{value} is not a valid {python_type.__name__}")
+        if python_type is bool:
+            if value.lower() not in ("true", "false"):
+                raise ValueError(f"{value} is not a boolean")
+            return value.lower() == "true"
+        return RepositoryBase._coerce_cursor_value(model_field, value)
+
+    @staticmethod
+    def _like_pattern(value: str) -> str:
+        """Turn a filter value into an `ILIKE` pattern, `%` and `_` in the value are matched literally.
+
+        Args:
+            value (str): A substring, or a prefix when it ends with `*`.
+
+        Returns:
+            str: The pattern.
+        """
+        prefix = value.endswith("*")
+        escaped = value.rstrip("*").replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        return f"{escaped}%" if prefix else f"%{escaped}%"
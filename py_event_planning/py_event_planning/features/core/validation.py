@@ -0,0 +1,156 @@
+"""Bulk upload row validation, offloaded to worker processes for large batches.
+
+Building pydantic schemas out of raw rows is pure CPU work, running it on the event loop stalls every other request
+of the worker. Large batches are split over a process pool, the processes only send back compact tuples of field
+values that are turned into schemas again without a second validation.
+"""
+
+import asyncio
+import functools
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, TypeVar
+
+from loguru import logger
+from pydantic import BaseModel
+
+from py_event_planning.features.core.ingest import UploadRow
+from py_event_planning.shared.schemas import BulkLoadResponse
+
+CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
+
+# (row index, field values in schema order, error)
+ValidatedRow = tuple[int, tuple[Any, ...] | None, str | None]
+
+
+# cleans up a batch of rows before they are built, see the `transforms` module of the features
+Normalizer = Callable[[list[dict[str, Any]]], list[dict[str, Any]]]
+
+
+def validate_rows(
+    build: Callable[[dict[str, Any], str], BaseModel],
+    rows: list[UploadRow],
+    user_sub: str,
+    normalize: Normalizer | None = None,
+) -> list[ValidatedRow]:
+    """Build a schema for every row, runs in the worker processes.
+
+    Args:
+        build (Callable[[dict[str, Any], str], BaseModel]): Builds a schema out of a row and the user's id, it has
+            to be a module level function so that it can be pickled.
+        rows (list[UploadRow]): The rows.
+        user_sub (str): The id of the user loading the rows.
+        normalize (Normalizer | None, optional): Cleans up all the rows at once before they are built, it has to
+            be a module level function as well. Defaults to None.
+
+    Returns:
+        list[ValidatedRow]: The field values or the error of every row.
+    """
+    records = [fields for _, fields in rows]
+    if normalize is not None:
+        records = normalize(records)
+    validated: list[ValidatedRow] = []
+    for (index, _), fields in zip(rows, records):
+        try:
+            model = build(fields, user_sub)
+            validated.append((index, tuple(getattr(model, name) for name in type(model).model_fields), None))
+        except Exception as e:
+            validated.append((index, None, str(e)))
+    return validated
+
+
+class ValidationPool:
+    """Process pool validating the rows of large bulk uploads."""
+
+    def __init__(self) -> None:
+        self.executor: ProcessPoolExecutor | None = None
+        self.processes = 0
+        self.min_rows = 500
+
+    def init(self, processes: int | None = None, min_rows: int = 500) -> None:
+        """Start the worker processes.
+
+        Args:
+            processes (int | None, optional): Number of processes, None for one per CPU and 0 to validate on
+                the event loop. Defaults to None.
+            min_rows (int, optional): Smaller batches are validated on the event loop. Defaults to 500.
+        """
+        self.processes = (os.cpu_count() or 1) if processes is None else processes
+        self.min_rows = min_rows
+        if self.processes > 0:
+            self.start_executor()
+        logger.debug("ValidationPool initialized with {} processes", self.processes)
+
+    def start_executor(self) -> None:
+        """(Re)create the process pool."""
+        # spawn: forking a process running an event loop and logging threads is not safe
+        self.executor = ProcessPoolExecutor(self.processes, mp_context=multiprocessing.get_context("spawn"))
+
+    def close(self) -> None:
+        """Stop the worker processes."""
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+        self.executor = None
+
+    async def validate(
+        self,
+        response: BulkLoadResponse,
+        rows: list[UploadRow],
+        build: Callable[[dict[str, Any], str], CreateSchemaType],
+        schema: type[CreateSchemaType],
+        user_sub: str,
+        label: str = "name",
+        normalize: Normalizer | None = None,
+    ) -> list[tuple[int, CreateSchemaType]]:
+        """Validate a batch of rows, errors are added to the bulk loading report.
+
+        Args:
+            response (BulkLoadResponse): The bulk loading report.
+            rows (list[UploadRow]): The rows.
+            build (Callable[[dict[str, Any], str], CreateSchemaType]): Builds a schema out of a row and the user's
+                id, it has to be a module level function so that it can be pickled.
+            schema (type[CreateSchemaType]): The schema `build` returns.
+            user_sub (str): The id of the user loading the rows.
+            label (str, optional): Field naming the row in error messages. Defaults to "name".
+            normalize (Normalizer | None, optional): Cleans up the rows before they are built. Defaults to None.
+
+        Returns:
+            list[tuple[int, CreateSchemaType]]: The valid rows with their index.
+        """
+        validated: list[ValidatedRow] | None = None
+        if self.executor is not None and len(rows) >= self.min_rows:
+            chunk_size = -(-len(rows) // self.processes)
+            loop = asyncio.get_running_loop()
+            try:
+                chunks = await asyncio.gather(
+                    *(
+                        loop.run_in_executor(
+                            self.executor,
+                            functools.partial(validate_rows, build, rows[i : i + chunk_size], user_sub, normalize),
+                        )
+                        for i in range(0, len(rows), chunk_size)
+                    )
+                )
+                validated = [row for chunk in chunks for row in chunk]
+            except BrokenProcessPool as e:
+                logger.error("Validation processes died, validating on the event loop: {}", str(e))
+                self.close()
+                self.start_executor()
+        if validated is None:
+            validated = validate_rows(build, rows, user_sub, normalize)
+
+        labels = {index: fields.get(label) for index, fields in rows}
+        entities: list[tuple[int, CreateSchemaType]] = []
+        for index, values, error in validated:
+            if values is None:
+                response.errors.append(f"row {index} [{labels[index]}]: {error}")
+                continue
+            # the values were validated by `build` already
+            entities.append((index, schema.model_construct(**dict(zip(schema.model_fields, values)))))
+        return entities
+
+
+# Initialize the ValidationPool
+validation_pool = ValidationPool()
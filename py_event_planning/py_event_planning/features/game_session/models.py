@@ -6,7 +6,7 @@ import datetime
 import uuid
 from typing import TYPE_CHECKING
 
-from sqlalchemy import DateTime, ForeignKey
+from sqlalchemy import DateTime, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -52,3 +52,19 @@ class GameSession(MixinBookeeping, EventPlanningSchemaBase):
     image_url_description: Mapped[str | None] = mapped_column(nullable=True)
     is_public: Mapped[bool] = mapped_column(default=False, nullable=False)
     # constraints
+    __table_args__: tuple | dict = (
+        # pg_trgm indexes for the `ILIKE '%...%'` filters
+        Index(
+            "ix_event_planning_game_session_title_trgm",
+            "title",
+            postgresql_using="gin",
+            postgresql_ops={"title": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_event_planning_game_session_description_trgm",
+            "description",
+            postgresql_using="gin",
+            postgresql_ops={"description": "gin_trgm_ops"},
+        ),
+        EventPlanningSchemaBase.__table_args__,  # this dict has to be last
+    )
@@ -1,45 +1,49 @@
 """Game Session route definitions."""
 
-import asyncio
 import datetime
-import math
 import uuid
 from collections.abc import Hashable
-from io import BytesIO
 
-import pandas as pd
 from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
 from loguru import logger
-from pandas.core.series import Series
 
+from py_event_planning.core.config import Settings, get_settings
 from py_event_planning.database.db import (
     AsyncMasterSessionDependency,
     AsyncReplicaSessionDependency,
 )
-from py_event_planning.features.auth.schemas import AuthUserToken
 from py_event_planning.features.auth.service import UserAuth, UserAuthOptional
+from py_event_planning.features.bulk_jobs.schemas import BulkJobSchema
+from py_event_planning.features.bulk_jobs.service import bulk_job_manager
+from py_event_planning.features.core.ingest import BatchHandler, UploadRow
 from py_event_planning.features.core.unit_of_work import (
     SqlAlchemyUnitOfWork,
     sqlalchemy_uow,
 )
+from py_event_planning.features.core.validation import validation_pool
 from py_event_planning.features.game_session.schemas import (
     GameSessionCreate,
     GameSessionCreateInput,
     GameSessionQuery,
     GameSessionSchema,
 )
+from py_event_planning.features.game_session.service import build_game_session
+from py_event_planning.features.game_session.transforms import (
+    normalize_game_session_records,
+)
+from py_event_planning.shared.responses import PydanticResponse
 from py_event_planning.shared.schemas import BulkLoadResponse, GenericListResponse
 
 router = APIRouter()
 
 
-@router.get("")
+@router.get("", response_model=list[GameSessionSchema])
 async def read_game_sessions(
     current_user: UserAuthOptional,
     db: AsyncReplicaSessionDependency,
     offset: int = 0,
     limit: int = 100,
-) -> list[GameSessionSchema]:
+) -> PydanticResponse:
     """Retrieve game_sessions."""
     try:
         user = {}
@@ -49,7 +53,7 @@ async def read_game_sessions(
             async with sqlalchemy_uow(db, None) as uow:
                 # entities = [entity async for entity in uow.game_session_repo.read_multi(offset=offset, limit=limit)]
                 entities = await uow.game_session_repo.read_multi(offset=offset, limit=limit)
-            return entities
+            return PydanticResponse(entities, list[GameSessionSchema])
     except HTTPException:
         # assume that the error was already logged
         raise
@@ -58,24 +62,40 @@ async def read_game_sessions(
         raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, "Internal Error") from e
 
 
-@router.get("/{entity_id}")
-async def read_game_session(
-    entity_id: uuid.UUID,
+@router.get("/query", response_model=GenericListResponse[GameSessionSchema])
+async def query_game_sessions(
     current_user: UserAuthOptional,
     db: AsyncReplicaSessionDependency,
-    # offset: int = 0,
-    # limit: int = 100,
-) -> GameSessionSchema | None:
-    """Retrieve game_session."""
+    params: GameSessionQuery = Depends(),
+) -> PydanticResponse:
+    """Retrieve game_sessions."""
     try:
         user = {}
         if current_user:
             user = {"sub": current_user.sub, "preferred_username": current_user.preferred_username}
         with logger.contextualize(user=user, log_threads=True):
+            # user_logger = logger.bind(user_id=random.randint(0,99), user_username=random_name)
+            filters = params.to_filters()
             async with sqlalchemy_uow(db, None) as uow:
-                # entities = [entity async for entity in uow.game_session_repo.read_multi(offset=offset, limit=limit)]
-                entitity = await uow.game_session_repo.read_by_id(entity_id=entity_id)
-            return entitity
+                result = await uow.game_session_repo.query(
+                    params=filters,
+                    offset=params.offset,
+                    limit=params.limit,
+                    cursor=params.cursor,
+                    count_strategy=params.count_strategy,
+                    fields=params.selected_fields(),
+                )
+            return PydanticResponse(
+                GenericListResponse[result.schema](
+                    entities=result.entities,
+                    total_entities_count=result.total_count,
+                    limit=params.limit,
+                    offset=params.offset,
+                    filters=filters,
+                    next_cursor=result.next_cursor,
+                    count_strategy=result.count_strategy,
+                )
+            )
     except HTTPException:
         # assume that the error was already logged
         raise
@@ -84,31 +104,24 @@ async def read_game_session(
         raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, "Internal Error") from e
 
 
-@router.get("/query")
-async def query_game_sessions(
+@router.get("/{entity_id}")
+async def read_game_session(
+    entity_id: uuid.UUID,
     current_user: UserAuthOptional,
     db: AsyncReplicaSessionDependency,
-    params: GameSessionQuery = Depends(),
-) -> GenericListResponse[GameSessionSchema]:
-    """Retrieve game_sessions."""
+    # offset: int = 0,
+    # limit: int = 100,
+) -> GameSessionSchema | None:
+    """Retrieve game_session."""
     try:
         user = {}
         if current_user:
             user = {"sub": current_user.sub, "preferred_username": current_user.preferred_username}
         with logger.contextualize(user=user, log_threads=True):
-            # user_logger = logger.bind(user_id=random.randint(0,99), user_username=random_name)
-            filters = params.model_dump(exclude_none=True, exclude={"limit", "offset"})
             async with sqlalchemy_uow(db, None) as uow:
-                entities, total_entities_count = await uow.game_session_repo.query(
-                    params=filters, offset=params.offset, limit=params.limit
-                )
-            return GenericListResponse[GameSessionSchema](
-                entities=entities,
-                total_entities_count=total_entities_count,
-                limit=params.limit,
-                offset=params.offset,
-                filters=filters,
-            )
+                # entities = [entity async for entity in uow.game_session_repo.read_multi(offset=offset, limit=limit)]
+                entitity = await uow.game_session_repo.read_by_id(entity_id=entity_id)
+            return entitity
     except HTTPException:
         # assume that the error was already logged
         raise
@@ -120,50 +133,34 @@ async def query_game_sessions(
 async def upsert_and_mutate_report(
     uow: SqlAlchemyUnitOfWork,
     response: BulkLoadResponse,
-    df_entity: tuple[Hashable, Series],
-    name_index: int,
-    current_user: AuthUserToken,
+    entities: list[tuple[Hashable, GameSessionCreate]],
 ) -> None:
-    """Adds a game_session and updates a bulk loading report.
+    """Adds the game_sessions that do not exist yet and updates a bulk loading report.
+
+    Existing titles are fetched with one query for the whole batch, duplicates are then checked in memory.
 
     Args:
         uow (SqlAlchemyUnitOfWork): _description_
         response (BulkLoadResponse): _description_
-        df_entity (tuple[Hashable, Series]): _description_
+        entities (list[tuple[Hashable, GameSessionCreate]]): The valid game_sessions with their row index.
     """
-    index, json_entity = df_entity
-    entity: GameSessionSchema | None = None
-    try:
-        if not json_entity.get("source_page") or math.isnan(json_entity.get("source_page")):
-            json_entity["source_page"] = None
-        if not json_entity.get("difficulty_class_saving_throw_override") or math.isnan(
-            json_entity.get("difficulty_class_saving_throw_override")
-        ):
-            json_entity["difficulty_class_saving_throw_override"] = None
-        else:
-            json_entity["difficulty_class_saving_throw_override"] = int(
-                json_entity.get("difficulty_class_saving_throw_override")
-            )
-        if json_entity.get("difficulty_class_saving_throw"):
-            json_entity["difficulty_class_saving_throw"] = str(json_entity["difficulty_class_saving_throw"])
-        # TODO: stat_blocks should be handled as a json object (list of stat blocks)
-        json_entity["stat_blocks"] = None
-        time_now = datetime.datetime.now(tz=datetime.UTC)
-        entity = GameSessionCreate(
-            **json_entity,
-            created_at=time_now,
-            created_by=current_user.sub,
-            updated_at=time_now,
-            updated_by=current_user.sub,
-        )
-        _, total_count = await uow.game_session_repo.query(params={"name": entity.name}, limit=1, exact=True)
-        if total_count > 0:
-            response.warnings.append(f"Game Session with name '{entity.name}' already exists, skipping.")
-        else:
+    existing_titles = await uow.game_session_repo.read_existing_values(
+        "title", (entity.title for _, entity in entities)
+    )
+    seen_titles: set[str] = set()
+    for index, entity in entities:
+        if entity.title in existing_titles:
+            response.warnings.append(f"Game Session with name '{entity.title}' already exists, skipping.")
+            continue
+        if entity.title in seen_titles:
+            response.warnings.append(f"Game Session with name '{entity.title}' is duplicated in the file, skipping.")
+            continue
+        seen_titles.add(entity.title)
+        try:
             await uow.game_session_repo.create(model_in=entity, return_model=False)
-            response.created.append(entity.name)
-    except Exception as e:
-        response.errors.append(f"row {index} [{entity.name if entity else json_entity.iloc[name_index]}]: {str(e)}")
+            response.created.append(entity.title)
+        except Exception as e:
+            response.errors.append(f"row {index} [{entity.title}]: {str(e)}")
 
 
 @router.post("")
@@ -222,47 +219,49 @@ async def delete_game_session(
         raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, "Internal Error") from e
 
 
-@router.post("/bulk")
+@router.post("/bulk", status_code=status.HTTP_202_ACCEPTED)
 async def bulk_create(
     current_user: UserAuth,
     *,
-    db: AsyncMasterSessionDependency,
     file: UploadFile = File(description='Files of type: ["text/csv", "application/json"]'),
-) -> BulkLoadResponse:
-    """Bulk load in a list of game_session objects from a file.
+    all_or_nothing: bool = False,
+    checkpoint: str | None = None,
+    settings: Settings = Depends(get_settings),
+) -> BulkJobSchema:
+    """Queue a bulk load of a list of game_session objects from a file.
+
+    The file is loaded in the background, poll `GET /bulk-jobs/{id}` for the progress and the final report.
+    It is streamed and every batch of `BULK_LOAD_BATCH_SIZE` rows is committed on its own, unless
+    `all_or_nothing` is set. Pass the `checkpoint` of a failed load to resume the same file after its last commit.
 
-    Supports file types: [application/json]
+    Supports file types: [text/csv, application/json]
     """
     try:
-        allowed_file_types = ["text/csv", "application/json"]
-        if file.content_type == "text/csv":
-            contents = await file.read()
-            df = pd.read_csv(BytesIO(contents))
-        elif file.content_type == "application/json":
-            contents = await file.read()
-            df = pd.read_json(BytesIO(contents))
-        else:
-            # pylint: disable=W0707 (raise-missing-from)
-            raise HTTPException(
-                400,
-                detail=f"Invalid document type. Expected on of: {[allowed_file_types]}, Received: {file.content_type}",
-            )
-
-        response = BulkLoadResponse(filename=file.filename)
 
-        async with sqlalchemy_uow(db, None) as uow:
-            tasks = [
-                upsert_and_mutate_report(uow, response, entity, [*df.keys()].index("name"), current_user)
-                for entity in df.iterrows()
-            ]
-            await asyncio.gather(*tasks)
+        def make_batch_handler(response: BulkLoadResponse) -> BatchHandler:
+            async def handle_batch(uow: SqlAlchemyUnitOfWork, batch: list[UploadRow]) -> None:
+                entities = await validation_pool.validate(
+                    response,
+                    batch,
+                    build_game_session,
+                    GameSessionCreate,
+                    current_user.sub,
+                    label="title",
+                    normalize=normalize_game_session_records,
+                )
+                await upsert_and_mutate_report(uow, response, entities)
 
-            if not response.errors:
-                await uow.db_session.flush()
-                await uow.commit()
+            return handle_batch
 
-        response.update_totals()
-        return response
+        return await bulk_job_manager.submit(
+            file,
+            kind="game_session",
+            created_by=current_user.sub,
+            make_batch_handler=make_batch_handler,
+            batch_size=settings.BULK_LOAD_BATCH_SIZE,
+            all_or_nothing=all_or_nothing,
+            checkpoint=checkpoint,
+        )
     except HTTPException:
         # assume that the error was already logged
         raise
@@ -1 +1,28 @@
 """Game Session service."""
+
+import datetime
+from typing import Any
+
+from py_event_planning.features.game_session.schemas import GameSessionCreate
+
+
+def build_game_session(fields: dict[str, Any], user_sub: str) -> GameSessionCreate:
+    """Builds a game_session from a bulk loading row cleaned up by `normalize_game_session_records`.
+
+    Runs in the bulk validation processes (see `validation_pool`), keep it free of I/O.
+
+    Args:
+        fields (dict[str, Any]): The row.
+        user_sub (str): The id of the user loading the row.
+
+    Returns:
+        GameSessionCreate: The game_session.
+    """
+    time_now = datetime.datetime.now(tz=datetime.UTC)
+    return GameSessionCreate(
+        **fields,
+        created_at=time_now,
+        created_by=user_sub,
+        updated_at=time_now,
+        updated_by=user_sub,
+    )
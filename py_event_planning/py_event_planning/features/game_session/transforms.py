@@ -1 +1,17 @@
 """Game Session traansforms."""
+
+from typing import Any
+
+from py_event_planning.features.core.transforms import normalize_records
+
+
+def normalize_game_session_records(records: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Clean up a batch of bulk loading game_session rows.
+
+    Args:
+        records (list[dict[str, Any]]): The rows.
+
+    Returns:
+        list[dict[str, Any]]: The rows ready for `build_game_session`.
+    """
+    return normalize_records(records, drop=["created_by", "updated_by"])
@@ -1,44 +1,43 @@
 """Game Session route definitions."""
 
-import asyncio
 import datetime
 import uuid
-from collections.abc import Hashable
-from io import BytesIO
 
-import pandas as pd
 from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
 from loguru import logger
-from pandas.core.series import Series
 
+from py_event_planning.core.config import Settings, get_settings
 from py_event_planning.database.db import (
     AsyncMasterSessionDependency,
     AsyncReplicaSessionDependency,
 )
-from py_event_planning.features.auth.schemas import AuthUserToken
 from py_event_planning.features.auth.service import UserAuth, UserAuthOptional
+from py_event_planning.features.core.ingest import UploadRow, run_bulk_load
 from py_event_planning.features.core.unit_of_work import (
     SqlAlchemyUnitOfWork,
     sqlalchemy_uow,
 )
+from py_event_planning.features.core.validation import validation_pool
 from py_event_planning.features.game_system.schemas import (
     GameSystemCreate,
     GameSystemCreateInput,
     GameSystemQuery,
     GameSystemSchema,
 )
+from py_event_planning.features.game_system.service import build_game_system
+from py_event_planning.shared.responses import PydanticResponse
 from py_event_planning.shared.schemas import BulkLoadResponse, GenericListResponse
 
 router = APIRouter()
 
 
-@router.get("")
+@router.get("", response_model=list[GameSystemSchema])
 async def read_game_systems(
     current_user: UserAuthOptional,
     db: AsyncReplicaSessionDependency,
     offset: int = 0,
     limit: int = 100,
-) -> list[GameSystemSchema]:
+) -> PydanticResponse:
     """Retrieve game_systems."""
     try:
         user = {}
@@ -48,7 +47,7 @@ async def read_game_systems(
             logger.info("Fetching game systems")
             async with sqlalchemy_uow(db, None) as uow:
                 entities = await uow.game_system_repo.read_multi(offset=offset, limit=limit)
-            return entities
+            return PydanticResponse(entities, list[GameSystemSchema])
     except HTTPException:
         # assume that the error was already logged
         raise
@@ -57,24 +56,41 @@ async def read_game_systems(
         raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, "Internal Error") from e
 
 
-@router.get("/{entity_id}")
-async def read_game_session(
-    entity_id: uuid.UUID,
+@router.get("/query", response_model=GenericListResponse[GameSystemSchema])
+async def query_game_systems(
     current_user: UserAuthOptional,
     db: AsyncReplicaSessionDependency,
-    # offset: int = 0,
-    # limit: int = 100,
-) -> GameSystemSchema | None:
-    """Retrieve game_session."""
+    params: GameSystemQuery = Depends(),
+) -> PydanticResponse:
+    """Retrieve game_systems."""
     try:
         user = {}
         if current_user:
             user = {"sub": current_user.sub, "preferred_username": current_user.preferred_username}
-        with logger.contextualize(user=user, log_threads=True):
+        with logger.contextualize(user=user, params=params.model_dump(), log_threads=True):
+            logger.info("Querying game systems")
+            # user_logger = logger.bind(user_id=random.randint(0,99), user_username=random_name)
+            filters = params.to_filters()
             async with sqlalchemy_uow(db, None) as uow:
-                # entities = [entity async for entity in uow.game_session_repo.read_multi(offset=offset, limit=limit)]
-                entitity = await uow.game_system_repo.read_by_id(entity_id=entity_id)
-            return entitity
+                result = await uow.game_system_repo.query(
+                    params=filters,
+                    offset=params.offset,
+                    limit=params.limit,
+                    cursor=params.cursor,
+                    count_strategy=params.count_strategy,
+                    fields=params.selected_fields(),
+                )
+            return PydanticResponse(
+                GenericListResponse[result.schema](
+                    entities=result.entities,
+                    total_entities_count=result.total_count,
+                    limit=params.limit,
+                    offset=params.offset,
+                    filters=filters,
+                    next_cursor=result.next_cursor,
+                    count_strategy=result.count_strategy,
+                )
+            )
     except HTTPException:
         # assume that the error was already logged
         raise
@@ -83,32 +99,24 @@ async def read_game_session(
         raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, "Internal Error") from e
 
 
-@router.get("/query")
-async def query_game_systems(
+@router.get("/{entity_id}")
+async def read_game_session(
+    entity_id: uuid.UUID,
     current_user: UserAuthOptional,
     db: AsyncReplicaSessionDependency,
-    params: GameSystemQuery = Depends(),
-) -> GenericListResponse[GameSystemSchema]:
-    """Retrieve game_systems."""
+    # offset: int = 0,
+    # limit: int = 100,
+) -> GameSystemSchema | None:
+    """Retrieve game_session."""
     try:
         user = {}
         if current_user:
             user = {"sub": current_user.sub, "preferred_username": current_user.preferred_username}
-        with logger.contextualize(user=user, params=params.model_dump(), log_threads=True):
-            logger.info("Querying game systems")
-            # user_logger = logger.bind(user_id=random.randint(0,99), user_username=random_name)
-            filters = params.model_dump(exclude_none=True, exclude={"limit", "offset"})
+        with logger.contextualize(user=user, log_threads=True):
             async with sqlalchemy_uow(db, None) as uow:
-                entities, total_entities_count = await uow.game_system_repo.query(
-                    params=filters, offset=params.offset, limit=params.limit
-                )
-            return GenericListResponse[GameSystemSchema](
-                entities=entities,
-                total_entities_count=total_entities_count,
-                limit=params.limit,
-                offset=params.offset,
-                filters=filters,
-            )
+                # entities = [entity async for entity in uow.game_session_repo.read_multi(offset=offset, limit=limit)]
+                entitity = await uow.game_system_repo.read_by_id(entity_id=entity_id)
+            return entitity
     except HTTPException:
         # assume that the error was already logged
         raise
@@ -120,40 +128,36 @@ async def query_game_systems(
 async def upsert_and_mutate_report(
     uow: SqlAlchemyUnitOfWork,
     response: BulkLoadResponse,
-    df_entity: tuple[Hashable, Series],
-    name_index: int,
-    current_user: AuthUserToken,
+    entities: list[GameSystemCreate],
+    update_existing: bool = False,
 ) -> None:
-    """Adds a game_system and updates a bulk loading report.
+    """Adds the game_systems that do not exist yet and updates a bulk loading report.
+
+    All game_systems are sent in a single `INSERT ... ON CONFLICT` on (name, version, release_year), existing ones
+    are skipped unless `update_existing` is set.
 
     Args:
         uow (SqlAlchemyUnitOfWork): _description_
         response (BulkLoadResponse): _description_
-        df_entity (tuple[Hashable, Series]): _description_
+        entities (list[GameSystemCreate]): The valid game_systems.
+        update_existing (bool, optional): Update game_systems that already exist. Defaults to False.
     """
-    index, json_entity = df_entity
-    entity: GameSystemCreate | None = None
-    try:
-        time_now = datetime.datetime.now(tz=datetime.UTC)
-        entity = GameSystemCreate(
-            **json_entity,
-            created_at=time_now,
-            created_by=current_user.sub,
-            updated_at=time_now,
-            updated_by=current_user.sub,
-        )
-        _, total_count = await uow.game_system_repo.query(
-            params={"name": entity.name, "version": entity.version, "release_year": entity.release_year},
-            limit=1,
-            exact=True,
-        )
-        if total_count > 0:
-            response.warnings.append(f"Game System with name '{entity.name}' already exists, skipping.")
-        else:
-            await uow.game_system_repo.create(model_in=entity, return_model=False)
-            response.created.append(entity.name)
-    except Exception as e:
-        response.errors.append(f"row {index} [{entity.name if entity else json_entity.iloc[name_index]}]: {str(e)}")
+    unique_entities: dict[tuple[str, str, int], GameSystemCreate] = {}
+    for entity in entities:
+        key = (entity.name, entity.version, entity.release_year)
+        if key in unique_entities:
+            response.warnings.append(f"Game System with name '{entity.name}' is duplicated in the file, skipping.")
+            continue
+        unique_entities[key] = entity
+    result = await uow.game_system_repo.upsert_many(
+        list(unique_entities.values()),
+        conflict_cols=["name", "version", "release_year"],
+        update_cols=None if update_existing else [],
+    )
+    response.created.extend(name for name, _, _ in result.created)
+    response.updated.extend(name for name, _, _ in result.updated)
+    reason = "is unchanged" if update_existing else "already exists"
+    response.warnings.extend(f"Game System with name '{name}' {reason}, skipping." for name, _, _ in result.skipped)
 
 
 @router.post("")
@@ -219,42 +223,39 @@ async def bulk_create(
     current_user: UserAuth,
     db: AsyncMasterSessionDependency,
     file: UploadFile = File(description='Files of type: ["text/csv", "application/json"]'),
+    update_existing: bool = False,
+    all_or_nothing: bool = False,
+    checkpoint: str | None = None,
+    settings: Settings = Depends(get_settings),
 ) -> BulkLoadResponse:
     """Bulk load in a list of game_system objects from a file.
 
-    Supports file types: [application/json]
+    The file is streamed and every batch of `BULK_LOAD_BATCH_SIZE` rows is committed on its own, unless
+    `all_or_nothing` is set. Pass the `checkpoint` of a failed load to resume the same file after its last commit.
+
+    Supports file types: [text/csv, application/json]
     """
     user = {"sub": current_user.sub, "preferred_username": current_user.preferred_username}
     with logger.contextualize(user=user, log_threads=True):
         try:
-            allowed_file_types = ["text/csv", "application/json"]
-            if file.content_type == "text/csv":
-                contents = await file.read()
-                df = pd.read_csv(BytesIO(contents))
-            elif file.content_type == "application/json":
-                contents = await file.read()
-                df = pd.read_json(BytesIO(contents))
-            else:
-                # pylint: disable=W0707 (raise-missing-from)
-                raise HTTPException(
-                    400,
-                    detail=(
-                        f"Invalid document type. Expected on of: {[allowed_file_types]}"
-                        + f", Received: {file.content_type}"
-                    ),
-                )
-
             response = BulkLoadResponse(filename=file.filename)
-            async with sqlalchemy_uow(db, None) as uow:
-                tasks = [
-                    upsert_and_mutate_report(uow, response, entity, [*df.keys()].index("name"), current_user)
-                    for entity in df.iterrows()
-                ]
-                await asyncio.gather(*tasks)
 
-                if not response.errors:
-                    await uow.db_session.flush()
-                    await uow.commit()
+            async def handle_batch(uow: SqlAlchemyUnitOfWork, batch: list[UploadRow]) -> None:
+                validated = await validation_pool.validate(
+                    response, batch, build_game_system, GameSystemCreate, current_user.sub
+                )
+                entities = [entity for _, entity in validated]
+                await upsert_and_mutate_report(uow, response, entities, update_existing=update_existing)
+
+            await run_bulk_load(
+                db,
+                file,
+                response,
+                handle_batch,
+                batch_size=settings.BULK_LOAD_BATCH_SIZE,
+                all_or_nothing=all_or_nothing,
+                checkpoint=checkpoint,
+            )
 
             response.update_totals()
             return response
@@ -0,0 +1,28 @@
+"""Game System service."""
+
+import datetime
+from typing import Any
+
+from py_event_planning.features.game_system.schemas import GameSystemCreate
+
+
+def build_game_system(fields: dict[str, Any], user_sub: str) -> GameSystemCreate:
+    """Builds a game_system from a bulk loading row.
+
+    Runs in the bulk validation processes (see `validation_pool`), keep it free of I/O.
+
+    Args:
+        fields (dict[str, Any]): The row.
+        user_sub (str): The id of the user loading the row.
+
+    Returns:
+        GameSystemCreate: The game_system.
+    """
+    time_now = datetime.datetime.now(tz=datetime.UTC)
+    return GameSystemCreate(
+        **fields,
+        created_at=time_now,
+        created_by=user_sub,
+        updated_at=time_now,
+        updated_by=user_sub,
+    )
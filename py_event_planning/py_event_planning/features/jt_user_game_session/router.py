@@ -49,7 +49,9 @@ async def join_game_session(
                     logger.error("Game session does not exist!")
                     raise HTTPException(status.HTTP_404_NOT_FOUND, "Game session does not exist!")
                 jt_entities: list[JtUserGameSessionSchema]
-                jt_entities, _ = await uow.jt_user_game_system_repo.query(params={"game_session_id": game_session_id})
+                jt_entities = (
+                    await uow.jt_user_game_system_repo.query(params={"game_session_id": game_session_id})
+                ).entities
                 if len(jt_entities) >= (game_session_entity.max_players if game_session_entity.max_players else 0):
                     error_message = (
                         f"Game Session '{game_session_id}' is already at capacity!"
@@ -85,9 +87,11 @@ async def leave_game_session(
                 model_in.user_id = uuid.UUID(current_user.sub)
                 logger.info("Leaving game session", extra={"game_session_id": str(game_session_id)})
                 entities: list[JtUserGameSessionSchema]
-                entities, _ = await uow.jt_user_game_system_repo.query(
-                    params={"user_id": uuid.UUID(current_user.sub), "game_session_id": game_session_id}
-                )
+                entities = (
+                    await uow.jt_user_game_system_repo.query(
+                        params={"user_id": uuid.UUID(current_user.sub), "game_session_id": game_session_id}
+                    )
+                ).entities
                 entities_for_user = [e for e in entities if str(e.user_id) == str(model_in.user_id)]
                 if not entities_for_user:
                     error_message = "Could not find game session to leave"
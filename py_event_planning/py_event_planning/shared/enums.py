@@ -7,3 +7,21 @@ class DbSchemaEnum(str, Enum):
     """Database Schema Options."""
 
     EVENT_PLANNING = "event_planning"
+
+
+class CountStrategyEnum(str, Enum):
+    """How the total count of a paginated query is computed."""
+
+    EXACT = "exact"
+    ESTIMATE = "estimate"
+    NONE = "none"
+
+
+class BulkJobStatusEnum(str, Enum):
+    """Bulk load job states."""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
@@ -1,9 +1,12 @@
 """Shared schemas."""
 
 import datetime
+import functools
 from typing import Annotated, Any, Generic, TypeVar
 
-from pydantic import BaseModel, Field, model_validator
+from pydantic import BaseModel, Field, create_model, model_validator
+
+from py_event_planning.shared.enums import CountStrategyEnum
 
 T = TypeVar("T", bound=BaseModel)
 
@@ -54,6 +57,69 @@ class QueryBase(BaseModel):
         title="Limit",
     )
     offset: int | None = Field(default=0, title="Offset")
+    cursor: str | None = Field(
+        default=None,
+        title="Cursor",
+        description="The `next_cursor` of a previous page, when set `offset` is ignored (keyset pagination).",
+    )
+    count_strategy: CountStrategyEnum | None = Field(
+        default=None,
+        title="Count Strategy",
+        description="How `total_entities_count` is computed: exact, a planner estimate for large tables, or none."
+        + " Defaults to exact, to estimate when `cursor` is set.",
+    )
+    fields: str | None = Field(
+        default=None,
+        title="Fields",
+        description='Only return these fields of the entities (separated by commas ","), `id` is always returned.',
+    )
+
+    def selected_fields(self) -> frozenset[str] | None:
+        """The fields to return.
+
+        Returns:
+            frozenset[str] | None: None for every field.
+        """
+        if not self.fields:
+            return None
+        return frozenset({"id", *(field.strip() for field in self.fields.split(",") if field.strip())})
+
+    def to_filters(self) -> dict[str, Any]:
+        """Dump the entity filters, leaving out the pagination options defined on QueryBase.
+
+        Returns:
+            dict[str, Any]: The filters that are set.
+        """
+        return self.model_dump(exclude_none=True, exclude=set(QueryBase.model_fields))
+
+
+@functools.lru_cache(maxsize=256)
+def partial_schema(schema: type[T], fields: frozenset[str] | None = None) -> type[T]:
+    """A copy of a schema with only some of its fields (sparse fieldsets), built once per set of fields.
+
+    The validators of the schema are not copied, partial schemas are only used to read entities.
+
+    Args:
+        schema (type[T]): _description_
+        fields (frozenset[str] | None, optional): Fields of the schema to keep, None for the schema itself.
+            Defaults to None.
+
+    Raises:
+        ValueError: If a field is not a field of the schema.
+
+    Returns:
+        type[T]: _description_
+    """
+    if fields is None:
+        return schema
+    unknown = fields - schema.model_fields.keys()
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return create_model(  # type: ignore[call-overload]
+        f"{schema.__name__}Fields",
+        __config__=schema.model_config,
+        **{name: (field.annotation, field) for name, field in schema.model_fields.items() if name in fields},
+    )
 
 
 class GenericListResponse(BaseModel, Generic[T]):
@@ -80,6 +146,16 @@ class GenericListResponse(BaseModel, Generic[T]):
     entities: list[T] | None = Field(
         default_factory=list, title="Entities", description="Entites returned based on given filters."
     )
+    next_cursor: str | None = Field(
+        default=None,
+        title="Next Cursor",
+        description="Pass as `cursor` to fetch the next page, null when this is the last page.",
+    )
+    count_strategy: CountStrategyEnum | None = Field(
+        default=None,
+        title="Count Strategy",
+        description="How `total_entities_count` was computed, it is null when the strategy is `none`.",
+    )
 
     @model_validator(mode="after")
     @classmethod
@@ -94,8 +170,10 @@ class GenericListResponse(BaseModel, Generic[T]):
         """
         if not data.entities_count:
             data.entities_count = len(data.entities)
+        if data.count_strategy == CountStrategyEnum.NONE:
+            data.total_entities_count = None
         # If not provided, assume we're returning everything
-        if not data.total_entities_count:
+        elif not data.total_entities_count:
             data.total_entities_count = len(data.entities)
         return data
 
@@ -107,17 +185,24 @@ class BulkLoadResponse(BaseModel):
         """Summary report for bulk loading."""
 
         created: int | None = 0
+        updated: int | None = 0
         errored: int | None = 0
         warning: int | None = 0
 
     filename: str
     totals: BulkLoadResponseTotals = BulkLoadResponseTotals()
     created: list[str] = Field(default_factory=list)
+    updated: list[str] = Field(default_factory=list)
     errors: list[str] = Field(default_factory=list)
     warnings: list[str] = Field(default_factory=list)
+    # resumes a retried upload of the same file after the last committed chunk
+    checkpoint: str | None = None
+    # the load stopped on an error before the end of the file, the rows after `checkpoint` were not loaded
+    stopped: bool = False
 
     def update_totals(self) -> None:
         """Updates totals based on current array lengths."""
         self.totals.created = len(self.created if self.created else [])
+        self.totals.updated = len(self.updated if self.updated else [])
         self.totals.errored = len(self.errors if self.errors else [])
         self.totals.warning = len(self.warnings if self.warnings else [])
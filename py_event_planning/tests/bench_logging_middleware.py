@@ -0,0 +1,114 @@
+"""Benchmark of the LoggingMiddleware overhead.
+
+Calls the ASGI app directly (no server, no HTTP client) so that only the middleware stack is measured, and compares
+no middleware, the former `BaseHTTPMiddleware` implementation and the current plain ASGI one.
+
+Usage:
+    python -m tests.bench_logging_middleware --requests 20000
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+from typing import Awaitable, Callable
+
+from loguru import logger
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+from starlette.types import ASGIApp, Message
+
+from py_event_planning.middleware.logging_middleware import LoggingMiddleware
+
+
+class BaseHTTPLoggingMiddleware(BaseHTTPMiddleware):
+    """The former implementation, kept here for comparison."""
+
+    async def dispatch(self, request: Request, call_next: Callable[[Request], Awaitable[Response]]) -> Response:
+        request_id = request.headers.get("X-Request-ID") or str(uuid.uuid4())
+        with logger.contextualize(request_id=request_id):
+            start_time = time.perf_counter()
+            logger.trace("Start handling request: {} {}", request.method, request.url)
+            request.state.request_id = request_id
+            response = await call_next(request)
+            process_time = time.perf_counter() - start_time
+            logger.trace(
+                "Completed handling request: {} {} Status: {} Elapsed time: {} seconds",
+                request.method,
+                request.url,
+                response.status_code,
+                process_time,
+            )
+            response.headers.append("X-Request-ID", request_id)
+            return response
+
+
+async def endpoint(request: Request) -> JSONResponse:
+    """Small JSON response."""
+    return JSONResponse({"request_id": request.state.request_id})
+
+
+def build_app(middleware: type | None) -> ASGIApp:
+    """App with a single route and the given middleware."""
+    return Starlette(
+        routes=[Route("/", endpoint)],
+        middleware=[Middleware(middleware)] if middleware is not None else [],
+    )
+
+
+async def call(app: ASGIApp) -> None:
+    """Send one GET / through the app."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/",
+        "raw_path": b"/",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"testserver")],
+        "client": ("127.0.0.1", 1234),
+        "server": ("testserver", 80),
+        "state": {"request_id": None},
+    }
+
+    async def receive() -> Message:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(_message: Message) -> None:
+        return None
+
+    await app(scope, receive, send)
+
+
+async def bench(app: ASGIApp, requests: int) -> float:
+    """Requests per second through the app."""
+    for _ in range(min(requests, 500)):
+        await call(app)
+    started = time.perf_counter()
+    for _ in range(requests):
+        await call(app)
+    return requests / (time.perf_counter() - started)
+
+
+async def main(requests: int) -> None:
+    """Run the benchmark."""
+    logger.remove()
+    baseline = await bench(build_app(None), requests)
+    print(f"{'no middleware':<24} {baseline:>10.0f} req/s")
+    for name, middleware in (("BaseHTTPMiddleware", BaseHTTPLoggingMiddleware), ("ASGI", LoggingMiddleware)):
+        rate = await bench(build_app(middleware), requests)
+        overhead = (1 / rate - 1 / baseline) * 1e6
+        print(f"{name:<24} {rate:>10.0f} req/s  overhead {overhead:6.1f} us/request")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    asyncio.run(main(parser.parse_args().requests))
@@ -0,0 +1,251 @@
+"""Local fake of the Keycloak endpoints the API uses, for tests and benchmarks.
+
+Implements the token (password and refresh_token grants), logout and certs endpoints of any realm and the user
+administration endpoints, tokens are signed with a key generated at startup. An artificial latency can be added to
+every response to mimic a remote Keycloak.
+
+Usage:
+    python -m tests.fake_keycloak --port 8080 --latency 0.02
+    # then run the API with KEYCLOAK_SERVER_URL=http://127.0.0.1:8080/
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+from typing import Any
+
+from aiohttp import web
+from jwcrypto import jwk, jwt
+
+
+class FakeKeycloak:
+    """In-memory Keycloak: users, sessions and a signing key."""
+
+    def __init__(
+        self,
+        client_id: str = "admin-cli",
+        admin_username: str = "admin",
+        admin_password: str = "admin",
+        latency: float = 0.0,
+        token_lifespan: int = 300,
+    ) -> None:
+        self.client_id = client_id
+        self.latency = latency
+        self.token_lifespan = token_lifespan
+        self.key = jwk.JWK.generate(kty="RSA", size=2048, kid=uuid.uuid4().hex, use="sig", alg="RS256")
+        # realm -> username -> user representation (with its password)
+        self.users: dict[str, dict[str, dict[str, Any]]] = {
+            "master": {admin_username: {"id": str(uuid.uuid4()), "username": admin_username}}
+        }
+        self.passwords: dict[str, str] = {admin_username: admin_password}
+        # refresh token -> (realm, username)
+        self.sessions: dict[str, tuple[str, str]] = {}
+        self.requests = 0
+
+    def add_user(self, realm: str, username: str, password: str, **fields: Any) -> str:
+        """Add a user to a realm.
+
+        Args:
+            realm (str): _description_
+            username (str): _description_
+            password (str): _description_
+
+        Returns:
+            str: The id of the user.
+        """
+        user = {
+            "id": str(uuid.uuid4()),
+            "username": username,
+            "email": fields.get("email", f"{username}@example.com"),
+            "firstName": fields.get("firstName", username),
+            "lastName": fields.get("lastName", username),
+            "enabled": True,
+        }
+        self.users.setdefault(realm, {})[username] = user
+        self.passwords[username] = password
+        return user["id"]
+
+    def sign(self, claims: dict[str, Any]) -> str:
+        """Sign a token with the realm key.
+
+        Args:
+            claims (dict[str, Any]): _description_
+
+        Returns:
+            str: _description_
+        """
+        token = jwt.JWT(header={"alg": "RS256", "kid": self.key.kid, "typ": "JWT"}, claims=claims)
+        token.make_signed_token(self.key)
+        return token.serialize()
+
+    def issue_tokens(self, request: web.Request, realm: str, username: str) -> dict[str, Any]:
+        """Build a token response for a user.
+
+        Args:
+            request (web.Request): _description_
+            realm (str): _description_
+            username (str): _description_
+
+        Returns:
+            dict[str, Any]: _description_
+        """
+        user = self.users[realm][username]
+        now = int(time.time())
+        session_state = str(uuid.uuid4())
+        common = {
+            "exp": now + self.token_lifespan,
+            "iat": now,
+            "iss": f"{request.url.origin()}/realms/{realm}",
+            "sub": user["id"],
+            "azp": self.client_id,
+            "sid": session_state,
+            "acr": "1",
+        }
+        access_token = self.sign({**common, "jti": str(uuid.uuid4()), "typ": "Bearer", "scope": "openid"})
+        id_token = self.sign(
+            {
+                **common,
+                "jti": str(uuid.uuid4()),
+                "typ": "ID",
+                "aud": self.client_id,
+                "at_hash": uuid.uuid4().hex[:22],
+                "email_verified": True,
+                "name": f"{user.get('firstName', '')} {user.get('lastName', '')}".strip(),
+                "preferred_username": username,
+                "given_name": user.get("firstName", ""),
+                "family_name": user.get("lastName", ""),
+                "email": user.get("email", ""),
+            }
+        )
+        refresh_token = self.sign({**common, "jti": str(uuid.uuid4()), "typ": "Refresh"})
+        self.sessions[refresh_token] = (realm, username)
+        return {
+            "access_token": access_token,
+            "expires_in": self.token_lifespan,
+            "refresh_expires_in": self.token_lifespan * 6,
+            "refresh_token": refresh_token,
+            "token_type": "Bearer",
+            "id_token": id_token,
+            "not-before-policy": 0,
+            "session_state": session_state,
+            "scope": "openid profile email",
+        }
+
+    def check_admin(self, request: web.Request) -> None:
+        """Reject admin requests without a token of the master realm.
+
+        Args:
+            request (web.Request): _description_
+
+        Raises:
+            web.HTTPUnauthorized: _description_
+        """
+        header = request.headers.get("Authorization", "")
+        try:
+            token = jwt.JWT(jwt=header.removeprefix("Bearer "), key=self.key)
+            if not jwt.json_decode(token.claims)["iss"].endswith("/realms/master"):
+                raise ValueError("not an admin token")
+        except Exception as e:
+            raise web.HTTPUnauthorized(
+                text='{"error":"HTTP 401 Unauthorized"}', content_type="application/json"
+            ) from e
+
+    @web.middleware
+    async def middleware(self, request: web.Request, handler: Any) -> web.StreamResponse:
+        """Count the requests and add the artificial latency."""
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return await handler(request)
+
+    async def token(self, request: web.Request) -> web.Response:
+        """Token endpoint."""
+        realm = request.match_info["realm"]
+        form = await request.post()
+        if form.get("grant_type") == "password":
+            username = str(form.get("username"))
+            if username not in self.users.get(realm, {}) or self.passwords.get(username) != form.get("password"):
+                return web.json_response(
+                    {"error": "invalid_grant", "error_description": "Invalid user credentials"}, status=401
+                )
+            return web.json_response(self.issue_tokens(request, realm, username))
+        if form.get("grant_type") == "refresh_token":
+            session = self.sessions.pop(str(form.get("refresh_token")), None)
+            if session is None or session[0] != realm:
+                return web.json_response(
+                    {"error": "invalid_grant", "error_description": "Invalid refresh token"}, status=400
+                )
+            return web.json_response(self.issue_tokens(request, realm, session[1]))
+        return web.json_response({"error": "unsupported_grant_type"}, status=400)
+
+    async def logout(self, request: web.Request) -> web.Response:
+        """Logout endpoint."""
+        form = await request.post()
+        if self.sessions.pop(str(form.get("refresh_token")), None) is None:
+            return web.json_response({"error": "invalid_grant"}, status=400)
+        return web.Response(status=204)
+
+    async def certs(self, _request: web.Request) -> web.Response:
+        """JWKS endpoint."""
+        return web.json_response({"keys": [self.key.export_public(as_dict=True)]})
+
+    async def create_user(self, request: web.Request) -> web.Response:
+        """User creation endpoint."""
+        self.check_admin(request)
+        realm = request.match_info["realm"]
+        payload = await request.json()
+        if payload["username"] in self.users.get(realm, {}):
+            return web.json_response({"errorMessage": "User exists with same username"}, status=409)
+        password = next((c["value"] for c in payload.get("credentials", []) if c.get("type") == "password"), "")
+        fields = {k: v for k, v in payload.items() if k in ("email", "firstName", "lastName")}
+        user_id = self.add_user(realm, payload["username"], password, **fields)
+        return web.Response(status=201, headers={"Location": f"{request.url}/{user_id}"})
+
+    async def get_users(self, request: web.Request) -> web.Response:
+        """User search endpoint."""
+        self.check_admin(request)
+        username = request.query.get("username", "")
+        exact = request.query.get("exact") == "true"
+        users = [
+            user
+            for name, user in self.users.get(request.match_info["realm"], {}).items()
+            if (name == username if exact else username in name)
+        ]
+        return web.json_response(users)
+
+    async def delete_user(self, request: web.Request) -> web.Response:
+        """User deletion endpoint."""
+        self.check_admin(request)
+        users = self.users.get(request.match_info["realm"], {})
+        for name, user in list(users.items()):
+            if user["id"] == request.match_info["user_id"]:
+                del users[name]
+                return web.Response(status=204)
+        return web.json_response({"error": "User not found"}, status=404)
+
+    def app(self) -> web.Application:
+        """Build the aiohttp application.
+
+        Returns:
+            web.Application: _description_
+        """
+        app = web.Application(middlewares=[self.middleware])
+        openid = "/realms/{realm}/protocol/openid-connect"
+        app.router.add_post(f"{openid}/token", self.token)
+        app.router.add_post(f"{openid}/logout", self.logout)
+        app.router.add_get(f"{openid}/certs", self.certs)
+        app.router.add_post("/admin/realms/{realm}/users", self.create_user)
+        app.router.add_get("/admin/realms/{realm}/users", self.get_users)
+        app.router.add_delete("/admin/realms/{realm}/users/{user_id}", self.delete_user)
+        return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response.")
+    parser.add_argument("--client-id", default="admin-cli")
+    args = parser.parse_args()
+    web.run_app(FakeKeycloak(client_id=args.client_id, latency=args.latency).app(), host=args.host, port=args.port)
@@ -0,0 +1,136 @@
+"""Encoding negotiation, compression and static caching of `CompressionMiddleware`."""
+
+import asyncio
+import gzip
+import json
+from typing import Any
+
+import brotli
+import pytest
+import zstandard
+
+from py_event_planning.middleware.compression_middleware import (
+    CODECS,
+    CompressionMiddleware,
+    negotiate_encoding,
+)
+
+BODY = json.dumps(
+    [{"id": f"session-{i}", "title": f"Session {i}", "max_players": i % 10} for i in range(500)]
+).encode()
+DECOMPRESS = {
+    "gzip": gzip.decompress,
+    "br": brotli.decompress,
+    "zstd": lambda body: zstandard.ZstdDecompressor().decompressobj().decompress(body),
+}
+
+
+async def json_app(scope: dict[str, Any], receive: Any, send: Any) -> None:
+    """Answer every request with BODY."""
+    headers = [(b"content-type", b"application/json"), (b"content-length", str(len(BODY)).encode())]
+    await send({"type": "http.response.start", "status": 200, "headers": headers})
+    await send({"type": "http.response.body", "body": BODY})
+
+
+async def streaming_app(scope: dict[str, Any], receive: Any, send: Any) -> None:
+    """Answer every request with BODY in chunks."""
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+    for start in range(0, len(BODY), 4096):
+        await send({"type": "http.response.body", "body": BODY[start : start + 4096], "more_body": True})
+    await send({"type": "http.response.body", "body": b""})
+
+
+def request(
+    middleware: CompressionMiddleware, accept_encoding: str, path: str = "/game-session", query_string: bytes = b""
+) -> tuple[dict[str, str], bytes]:
+    """Run a GET through the middleware, returns the response headers and body."""
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": path,
+        "query_string": query_string,
+        "headers": [(b"accept-encoding", accept_encoding.encode())],
+    }
+    messages: list[dict[str, Any]] = []
+
+    async def receive() -> dict[str, Any]:
+        return {"type": "http.request", "body": b""}
+
+    async def send(message: dict[str, Any]) -> None:
+        messages.append(message)
+
+    asyncio.run(middleware(scope, receive, send))
+    headers = {key.decode().lower(): value.decode() for key, value in messages[0]["headers"]}
+    return headers, b"".join(message.get("body", b"") for message in messages[1:])
+
+
+def test_all_codecs_available() -> None:
+    """brotli and zstandard are dependencies, every encoding is offered."""
+    assert set(CODECS) == {"gzip", "br", "zstd"}
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, expected",
+    [
+        ("gzip, deflate, br, zstd", "zstd"),
+        ("gzip, br", "br"),
+        ("gzip", "gzip"),
+        ("br;q=0.5, gzip", "gzip"),
+        ("zstd;q=0, *", "br"),
+        ("identity", None),
+        ("", None),
+    ],
+)
+def test_negotiate_encoding(accept_encoding: str, expected: str | None) -> None:
+    """The highest weight wins, ties go to zstd, then br, then gzip."""
+    assert negotiate_encoding(accept_encoding) == expected
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "br", "zstd"])
+@pytest.mark.parametrize("app", [json_app, streaming_app])
+def test_compress(encoding: str, app: Any) -> None:
+    """Whole and streamed responses are compressed with the negotiated encoding."""
+    headers, body = request(CompressionMiddleware(app), encoding)
+    assert headers["content-encoding"] == encoding
+    assert headers["vary"] == "Accept-Encoding"
+    assert DECOMPRESS[encoding](body) == BODY
+    if app is json_app:
+        assert headers["content-length"] == str(len(body))
+
+
+def test_small_responses_are_not_compressed() -> None:
+    """Bodies under the minimum size are sent as they are."""
+    headers, body = request(CompressionMiddleware(json_app, minimum_size=len(BODY) + 1), "br")
+    assert "content-encoding" not in headers
+    assert body == BODY
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "br", "zstd"])
+def test_static_paths_are_cached(encoding: str) -> None:
+    """A static path without query string is compressed once per encoding."""
+    middleware = CompressionMiddleware(json_app, static_paths=("/openapi.json",))
+    _, first = request(middleware, encoding, path="/openapi.json")
+    _, second = request(middleware, encoding, path="/openapi.json")
+    assert first == second
+    assert DECOMPRESS[encoding](second) == BODY
+    assert [key[:2] for key in middleware.cache] == [("/openapi.json", encoding)]
+
+
+def test_query_strings_are_not_cached() -> None:
+    """Variants of a static path (pages, filters) are compressed like any other response."""
+    middleware = CompressionMiddleware(json_app, static_paths=("/openapi.json", "/game-session"))
+    for offset in range(3):
+        _, body = request(middleware, "zstd", path="/game-session", query_string=f"offset={offset}".encode())
+        assert DECOMPRESS["zstd"](body) == BODY
+    assert not middleware.cache
+
+
+async def body_first_app(scope: dict[str, Any], receive: Any, send: Any) -> None:
+    """Send a body without starting the response."""
+    await send({"type": "http.response.body", "body": BODY})
+
+
+def test_body_before_start_is_an_error() -> None:
+    """A body sent before the response start is an error of the app, not an empty response."""
+    with pytest.raises(RuntimeError, match="before http.response.start"):
+        request(CompressionMiddleware(body_first_app), "gzip")
@@ -0,0 +1,56 @@
+"""Streaming CSV parsing of bulk uploads, compared to `csv.DictReader` on the whole file."""
+
+import asyncio
+import csv
+import io
+from typing import Any, AsyncIterator
+
+import pytest
+
+from py_event_planning.features.core.ingest import iter_csv_rows
+
+
+async def iter_chunks(text: str, size: int) -> AsyncIterator[str]:
+    """Cut a text into chunks of `size` characters."""
+    for start in range(0, len(text), size):
+        yield text[start : start + size]
+
+
+def parse(text: str, size: int) -> list[dict[str, Any]]:
+    """Parse a CSV text read `size` characters at a time."""
+
+    async def collect() -> list[dict[str, Any]]:
+        return [row async for row in iter_csv_rows(iter_chunks(text, size))]
+
+    return asyncio.run(collect())
+
+
+def expected(text: str) -> list[dict[str, Any]]:
+    """Parse a CSV text with the standard library, empty cells as None."""
+    return [
+        {key: value or None for key, value in row.items()} for row in csv.DictReader(io.StringIO(text, newline=""))
+    ]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64 * 1024])
+@pytest.mark.parametrize(
+    "text",
+    [
+        "name,description\nShield,page\x0cbreak\n",
+        "name,description\r\nShield,a\x0bb\x1cc\x1dd\x1ee\x85f g h\r\n",
+        'name,description\n"Fire ""Bolt""","line one\nline two\r\nline three"\nShield,\n',
+        "name,description\rShield,old mac\rFireball,big\r",
+        "name,description\nShield,no line break at the end",
+        'name,description\n"Wish","\n\n"\n',
+    ],
+)
+def test_iter_csv_rows_matches_dict_reader(text: str, size: int) -> None:
+    """Records only end on \\n, \\r\\n or \\r outside of quotes, however the text is chunked."""
+    assert parse(text, size) == expected(text)
+
+
+def test_iter_csv_rows_long_quoted_cell() -> None:
+    """A quoted cell spanning many lines and chunks is one record."""
+    description = "\n".join(f'line "{i}"' for i in range(10_000)).replace('"', '""')
+    text = f'name,description\nWish,"{description}"\nShield,small\n'
+    assert parse(text, 4096) == expected(text)
@@ -0,0 +1,37 @@
+"""spell name trigram index.
+
+Revision ID: 4f1d2b7c9e63
+Revises: e83f691bca53
+Create Date: 2026-10-18 06:02:15.874120
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "4f1d2b7c9e63"
+down_revision: Union[str, None] = "e83f691bca53"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Spell name trigram index upgrade."""
+    # gin_trgm_ops and similarity(), the extension is left installed on downgrade
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index(
+        "ix_dnd_spell_name_trgm",
+        "spell",
+        ["name"],
+        unique=False,
+        schema="dnd",
+        postgresql_using="gin",
+        postgresql_ops={"name": "gin_trgm_ops"},
+    )
+
+
+def downgrade() -> None:
+    """Spell name trigram index downgrade."""
+    op.drop_index("ix_dnd_spell_name_trgm", table_name="spell", schema="dnd", postgresql_using="gin")
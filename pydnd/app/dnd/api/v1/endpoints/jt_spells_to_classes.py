@@ -1,15 +1,37 @@
 """API /spell-to-class endpoint."""
 
 import json
-from typing import Any, List
+from typing import Any, List, Tuple
 
-from dnd import repository, schemas
+from dnd import models, repository, schemas
 from dnd.api.deps import get_db
 from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
 from sqlalchemy.orm import Session
 
 router = APIRouter()
 
+# a spell name that is not found is linked to the most similar spell name when it is this similar (trigrams) ...
+FUZZY_LINK_MIN_SCORE = 0.5
+# ... and this much more similar than the next closest name
+FUZZY_LINK_MIN_MARGIN = 0.1
+
+
+def closest_spell(candidates: List[Tuple[models.spell.Spell, float]]) -> models.spell.Spell | None:
+    """Pick the spell a misspelled name refers to, if it is clearly the closest.
+
+    Args:
+        candidates (List[Tuple[models.spell.Spell, float]]): See `repository.spell.fuzzy_query`.
+
+    Returns:
+        models.spell.Spell | None: None if no candidate is close enough or several are about as close.
+    """
+    if not candidates:
+        return None
+    (spell, score), *others = candidates
+    if score < FUZZY_LINK_MIN_SCORE or (others and score - others[0][1] < FUZZY_LINK_MIN_MARGIN):
+        return None
+    return spell
+
 
 @router.get(
     "",
@@ -132,16 +154,29 @@ def create_upload_file(  # noqa: C901 <- ignore code complexity (12 > 9)
             dnd_class = dnd_classes[0]
 
         if still_legal and source:  # pylint: disable=E0606 possibly-used-before-assignment
-            for _, jd_spell_list in jd.get("spells", {}).items():
+            for jd_spell_level, jd_spell_list in jd.get("spells", {}).items():
                 for jd_spell_name in jd_spell_list:
                     try:
                         spells_by_name = repository.spell.query(
                             db, params={"name": jd_spell_name, "source_id": source.id}
                         )
+                        candidates = []
+                        if len(spells_by_name) == 0:
+                            # typos and missing punctuation, e.g. "melfs acid arrow"
+                            candidates = repository.spell.fuzzy_query(db, jd_spell_name, source_id=source.id)
+                            fuzzy_spell = closest_spell(candidates)
+                            if fuzzy_spell is not None:
+                                spells_by_name = [fuzzy_spell]
+                                response.warnings.append(
+                                    f"Spell with name '{jd_spell_name}' not found, linking '{fuzzy_spell.name}' "
+                                    + f"(similarity {candidates[0][1]:.2f})."
+                                )
                         if len(spells_by_name) == 0:
+                            suggestions = ", ".join(f"'{spell.name}'" for spell, _ in candidates)
                             response.errors.append(
                                 f"Spell with name '{jd_spell_name}' not found! "
-                                + "(class_id={dnd_class.id}, source_id={source.id}, level={jd_spell_level})"
+                                + f"(class_id={dnd_class.id}, source_id={source.id}, level={jd_spell_level})"
+                                + (f" Did you mean: {suggestions}?" if suggestions else "")
                             )
                         else:
                             spell = spells_by_name[0]
@@ -156,8 +191,8 @@ def create_upload_file(  # noqa: C901 <- ignore code complexity (12 > 9)
                             if len(existing_spells_to_classes) > 0:
                                 response.warnings.append(
                                     f"Link source '{source.name}', "
-                                    + "class '{dnd_class.name}' "
-                                    + "spell '{spell.name}' "
+                                    + f"class '{dnd_class.name}' "
+                                    + f"spell '{spell.name}' "
                                     + "already exists, skipping."
                                 )
                             else:
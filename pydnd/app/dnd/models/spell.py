@@ -4,7 +4,7 @@ import datetime
 
 from dnd.database.base_class import DbBase
 from dnd.schemas.enums import DbSchemaEnum, SpellSchoolEnum
-from sqlalchemy import ARRAY, Column, ForeignKey, String, UniqueConstraint, func
+from sqlalchemy import ARRAY, Column, ForeignKey, Index, String, UniqueConstraint, func
 from sqlalchemy.ext.mutable import MutableList
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -40,3 +40,8 @@ class Spell(DbBase):
     source = relationship("Source")
     # constraints
     UniqueConstraint("source_id", "name", name="ux_spell")
+    # pg_trgm index of the fuzzy name lookups (see `RepositorySpell.fuzzy_query`)
+    __table_args__ = (
+        Index("ix_dnd_spell_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+        DbBase.__table_args__,
+    )
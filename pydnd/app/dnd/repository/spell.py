@@ -6,6 +6,7 @@ from dnd import models
 from dnd.models.spell import Spell
 from dnd.repository.base import RepositoryBase
 from dnd.schemas.spell import SpellCreate, SpellUpdate
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 
@@ -61,5 +62,36 @@ class RepositorySpell(RepositoryBase[Spell, SpellCreate, SpellUpdate]):
         spells = spells.all()
         return spells, total_count
 
+    def fuzzy_query(
+        self,
+        db: Session,
+        name: str,
+        *,
+        source_id: int | None = None,
+        limit: int = 5,
+    ) -> List[Tuple[models.spell.Spell, float]]:
+        """Find the spells with the names most similar to a (misspelled) name, e.g. "firebal" or "melfs acid arrow".
+
+        Uses the trigram similarity of the pg_trgm extension: the `%` operator (trigram GIN index) keeps the names
+        at least `pg_trgm.similarity_threshold` (0.3 by default) similar, they are ordered by `similarity()`, then by
+        name.
+
+        Args:
+            db (Session): A SQLAlchemy Session.
+            name (str): The name to look up.
+            source_id (int | None, optional): Only spells of this source. Defaults to None.
+            limit (int, optional): At most this many spells. Defaults to 5.
+
+        Returns:
+            List[Tuple[models.spell.Spell, float]]: Spells and their similarity (0 to 1), the most similar first.
+        """
+        score = func.similarity(self.model.name, name)
+        spells = db.query(self.model, score).filter(self.model.name.op("%")(name))
+        if source_id is not None:
+            spells = spells.filter(self.model.source_id == source_id)
+        # the name breaks ties, the suggestions of equally similar names are always in the same order
+        spells = spells.order_by(score.desc(), self.model.name).limit(limit)
+        return [(spell, float(spell_score)) for spell, spell_score in spells]
+
 
 spell = RepositorySpell(Spell)
@@ -1,9 +1,12 @@
 """Integration Testing Endpoint: /spell-to-class."""
 
+import json
 import random
+from typing import List
 
 import pytest
 from dnd import models, schemas
+from dnd.api.v1.endpoints.jt_spells_to_classes import closest_spell
 from dnd.core import uncached_settings
 from dnd.tests.integration import helpers
 from fastapi import status
@@ -11,6 +14,8 @@ from fastapi.encoders import jsonable_encoder
 from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
 
+XANATHARS = "xanathar's guide to everything"
+
 
 # TODO: re-evaluate scope?
 @pytest.fixture(scope="module")
@@ -277,6 +282,99 @@ def test_post_bulk_bad_filetype(client: TestClient, test_data_directory: str) ->
     assert "foo/bar" in response_json.get("detail")
 
 
+def post_bulk_spells(
+    client: TestClient, class_name: str, spell_names: List[str]
+) -> schemas.responses.BulkLoadResponse:
+    """Bulk link xanathar's spells (level 1) to a class."""
+    json_data = [{"source_name": XANATHARS, "class_name": class_name, "spells": {"1": spell_names}}]
+    files = {"upload_file": ("spell_to_class.json", json.dumps(json_data).encode(), "application/json")}
+    response = client.post(
+        f"{uncached_settings.API_V1_STR}/spell-to-class/bulk",
+        files=files,
+        headers={"accept": "application/json"},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    return schemas.responses.BulkLoadResponse(**response.json())
+
+
+@pytest.mark.parametrize(
+    "scores, expected",
+    [
+        ([], None),
+        ([0.64], 0),
+        ([0.49], None),
+        ([0.64, 0.12], 0),
+        ([0.5, 0.35], 0),
+        ([0.68, 0.67, 0.63], None),
+        ([0.5, 0.44], None),
+    ],
+)
+def test_closest_spell(scores: List[float], expected: int | None) -> None:
+    """Test closest_spell: at least 0.5 similar and 0.1 more similar than the next closest spell."""
+    spells = [models.Spell(name=f"spell {i}") for i in range(len(scores))]
+    closest = closest_spell(list(zip(spells, scores)))
+    assert closest is (None if expected is None else spells[expected])
+
+
+@pytest.mark.parametrize(
+    "spell_name, expected_name, expected_score",
+    [
+        ("melfs minute meteor", "melf's minute meteors", "0.64"),
+        ("toll the dad", "toll the dead", "0.67"),
+        ("snillocs snowball swarm", "snilloc's snowball swarm", "0.83"),
+    ],
+)
+def test_post_bulk_fuzzy_spell_name(
+    client: TestClient, spell_name: str, expected_name: str, expected_score: str
+) -> None:
+    """Test /bulk post: a misspelled spell name is linked to the clearly closest spell name."""
+    bulk_load_response = post_bulk_spells(client, "barbarian", [spell_name])
+    assert bulk_load_response.errors == []
+    assert bulk_load_response.warnings == [
+        f"Spell with name '{spell_name}' not found, linking '{expected_name}' (similarity {expected_score})."
+    ]
+    assert bulk_load_response.created == [f"Linked source '{XANATHARS}', class 'barbarian' spell '{expected_name}'"]
+
+
+def test_post_bulk_existing_link(client: TestClient) -> None:
+    """Test /bulk post: links that already exist are skipped with a warning naming them."""
+    bulk_load_response = post_bulk_spells(client, "barbarian", ["toll the dead"])
+    assert bulk_load_response.errors == []
+    assert bulk_load_response.created == []
+    assert bulk_load_response.warnings == [
+        f"Link source '{XANATHARS}', class 'barbarian' spell 'toll the dead' already exists, skipping."
+    ]
+
+
+@pytest.mark.parametrize(
+    "spell_name, suggestions",
+    [
+        # several investitures are about as similar
+        ("investiture of fire", "'investiture of ice', 'investiture of flame', 'investiture of wind'"),
+        # similar enough (0.5) but not 0.1 more than 'wall of water' (0.44)
+        ("wall of stone", "'wall of sand', 'wall of water', 'wall of light'"),
+    ],
+)
+def test_post_bulk_ambiguous_spell_name(client: TestClient, spell_name: str, suggestions: str) -> None:
+    """Test /bulk post: a misspelled spell name close to several spell names is not linked, they are suggested."""
+    bulk_load_response = post_bulk_spells(client, "barbarian", [spell_name])
+    assert bulk_load_response.created == []
+    assert bulk_load_response.warnings == []
+    assert len(bulk_load_response.errors) == 1
+    error = bulk_load_response.errors[0]
+    assert error.startswith(f"Spell with name '{spell_name}' not found! (class_id=0, source_id=1, level=1)")
+    assert f" Did you mean: {suggestions}" in error
+
+
+def test_post_bulk_unknown_spell_name(client: TestClient) -> None:
+    """Test /bulk post: no suggestion for a spell name not similar to any spell name."""
+    bulk_load_response = post_bulk_spells(client, "barbarian", ["SOME INVALID SPELL NAME"])
+    assert bulk_load_response.created == []
+    assert bulk_load_response.errors == [
+        "Spell with name 'SOME INVALID SPELL NAME' not found! (class_id=0, source_id=1, level=1)"
+    ]
+
+
 # def test_post_bulk_bad_json_data(client: TestClient, test_data_directory: str) -> None:
 #     """Test /bulk post: illegal data set -> list with empty dict."""
 #     files = {